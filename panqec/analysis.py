@@ -19,6 +19,7 @@ from scipy.interpolate import interp1d
 from scipy.optimize import curve_fit, fsolve
 from scipy.signal import argrelextrema
 from .config import SHORT_NAMES, LONG_NAMES
+from .timing import DecoderTimer, SIMULATION_STAGES
 from .utils import (
     fmt_uncertainty, identity,
     rescale_prob, fmt_confidence_interval,
@@ -457,6 +458,16 @@ class Analysis:
             'wall_time', 'n_trials'
         ]].sum()
 
+        # Time spent in each stage of the simulation, which is missing
+        # from results files saved by older versions.
+        stage_columns = [
+            f'{stage}_time' for stage in SIMULATION_STAGES
+            if f'{stage}_time' in self.raw.columns
+        ]
+        if stage_columns:
+            stage_times = grouped_df[stage_columns].sum(min_count=1)
+            added_columns = pd.concat([added_columns, stage_times], axis=1)
+
         # Columns for which grouped entries are to be concantenated np arrays.
         concat_columns = grouped_df[[
             'effective_error', 'success', 'codespace'
@@ -469,10 +480,19 @@ class Analysis:
             ['code', 'error_model', 'decoder', 'method']
         ].first()
 
+        # Histograms of decoding times, for simulations run with timing.
+        timing_columns = []
+        if 'decoder_timing' in self.raw.columns:
+            timing_columns.append(
+                grouped_df[['decoder_timing']].aggregate(
+                    merge_decoder_timings
+                )
+            )
+
         # Stack the columns together side by side to form a big table.
         self._results = pd.concat([
             added_columns, concat_columns, list_columns,
-            remaining_columns
+            remaining_columns, *timing_columns
         ], axis=1).reset_index()
 
         # Count the number of fails, later used for error bars.
@@ -480,6 +500,17 @@ class Analysis:
             self._results['n_trials'] - self._results['success'].apply(sum)
         )
 
+        # Number of shots per second, and fraction of the time spent
+        # decoding, to tell whether a sweep is limited by the decoder.
+        self._results['throughput'] = (
+            self._results['n_trials'] / self._results['wall_time']
+        )
+        if 'decode_time' in stage_columns:
+            self._results['decode_fraction'] = (
+                self._results['decode_time']
+                / self._results[stage_columns].sum(axis=1, min_count=1)
+            )
+
         self._results.drop(
             ['code_str', 'decoder_str', 'error_model_str', 'method_str'],
             axis=1, inplace=True
@@ -525,6 +556,37 @@ class Analysis:
 
         self._results = self._results[ordered_columns]
 
+    def get_decoder_timing(self) -> pd.DataFrame:
+        """Summary of the decoding times recorded by the simulations run
+        with timing enabled.
+
+        Returns
+        -------
+        timing : pd.DataFrame
+            One row per simulation and stage of decoding, with the number
+            of calls, and the total, mean, median, 90th and 99th
+            percentiles and maximum duration in seconds. Empty if no
+            simulation was timed.
+        """
+        columns = [
+            'code', 'n', 'decoder', 'error_model', 'bias', 'error_rate',
+            'stage', 'count', 'total', 'mean', 'p50', 'p90', 'p99', 'max'
+        ]
+        if 'decoder_timing' not in self._results.columns:
+            return pd.DataFrame(columns=columns)
+
+        rows = []
+        for _, entry in self._results.iterrows():
+            timer = DecoderTimer.from_dict(entry['decoder_timing'])
+            for stage, summary in timer.summary().items():
+                rows.append({
+                    **{key: entry[key] for key in columns[:6]},
+                    'stage': stage,
+                    **summary
+                })
+
+        return pd.DataFrame(rows, columns=columns)
+
     def calculate_total_error_rates(self):
         """Calculate the total error rate.
 
@@ -1679,6 +1741,25 @@ def count_fails(
     return n_fails
 
 
+def merge_decoder_timings(timings: Iterable) -> Optional[dict]:
+    """Merge the histograms of decoding times saved by several results
+    files, as given by `DecoderTimer.to_dict`.
+
+    Returns None if none of the results were timed.
+    """
+    timings = [
+        timing for timing in timings if isinstance(timing, dict)
+    ]
+    if len(timings) == 0:
+        return None
+
+    timer = DecoderTimer()
+    for timing in timings:
+        timer.merge(DecoderTimer.from_dict(timing))
+
+    return timer.to_dict()
+
+
 def shorten(long_name):
     if long_name in SHORT_NAMES:
         return SHORT_NAMES[long_name]
@@ -2562,6 +2643,10 @@ def read_entry(
             entry['effective_error'], dtype=np.uint8
         )
 
+        # Flatten the time spent in each stage into separate columns.
+        for stage, duration in entry.pop('stage_times', {}).items():
+            entry[f'{stage}_time'] = duration
+
         # Record the path of the results file if given.
         if results_file:
             entry['results_file'] = results_file
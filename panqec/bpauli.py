@@ -9,7 +9,7 @@ routines are useful specifically for dealing with the 3D code.
 """
 from typing import Union, List
 import numpy as np
-from . import bsparse
+from . import bsparse, gf2
 from scipy.sparse import csr_matrix
 
 
@@ -108,37 +108,85 @@ def pauli_to_bsf(error_pauli):
     return error
 
 
-def pauli_string_to_bvector(pauli_string: str) -> np.ndarray:
-    X_block = []
-    Z_block = []
-    for character in pauli_string:
-        if character == 'I':
-            X_block.append(0)
-            Z_block.append(0)
-        elif character == 'X':
-            X_block.append(1)
-            Z_block.append(0)
-        elif character == 'Y':
-            X_block.append(1)
-            Z_block.append(1)
-        elif character == 'Z':
-            X_block.append(0)
-            Z_block.append(1)
-    bvector = np.concatenate([X_block, Z_block]).astype(np.uint)
-    return bvector
-
-
-def bvector_to_pauli_string(bvector: np.ndarray) -> str:
-    n = int(bvector.shape[0]/2)
-    pauli_string = ''
-    for i in range(n):
-        pauli_string += {
-            (0, 0): 'I',
-            (1, 0): 'X',
-            (1, 1): 'Y',
-            (0, 1): 'Z'
-        }[(bvector[i], bvector[i + n])]
-    return pauli_string
+# Lookup tables from ASCII codes of Pauli characters to their X and Z bits,
+# with 2 marking invalid characters.
+_X_BITS = np.full(256, 2, dtype=np.uint8)
+_Z_BITS = np.full(256, 2, dtype=np.uint8)
+for _character, _x, _z in [('I', 0, 0), ('X', 1, 0), ('Y', 1, 1), ('Z', 0, 1)]:
+    _X_BITS[ord(_character)] = _x
+    _Z_BITS[ord(_character)] = _z
+
+# Pauli character of x + 2z.
+_PAULI_CHARACTERS = np.frombuffer(b'IXZY', dtype=np.uint8)
+
+
+def pauli_string_to_bvector(
+    pauli_string: Union[str, List[str]]
+) -> np.ndarray:
+    """Convert Pauli strings such as 'IXYZ' to the binary symplectic format.
+
+    Parameters
+    ----------
+    pauli_string : str or List[str]
+        Pauli string, or list of Pauli strings of the same length.
+
+    Returns
+    -------
+    bvector : np.ndarray
+        Array of size 2n, or of shape (n_strings, 2n) for a list of strings.
+    """
+    if isinstance(pauli_string, str):
+        return pauli_string_to_bvector([pauli_string])[0]
+
+    n = len(pauli_string[0]) if len(pauli_string) > 0 else 0
+    if any(len(string) != n for string in pauli_string):
+        raise ValueError('Pauli strings must all have the same length')
+    characters = np.frombuffer(
+        ''.join(pauli_string).encode('ascii'), dtype=np.uint8
+    ).reshape(len(pauli_string), n)
+
+    bvector = np.hstack([_X_BITS[characters], _Z_BITS[characters]])
+    if np.any(bvector == 2):
+        raise ValueError(
+            f'Pauli strings {pauli_string} contain characters '
+            'other than I, X, Y and Z'
+        )
+    return bvector.astype(np.uint)
+
+
+def _pauli_codes_to_strings(codes: np.ndarray) -> List[str]:
+    """Pauli strings of rows of x + 2z codes."""
+    n_rows, n = codes.shape
+    characters = np.ascontiguousarray(_PAULI_CHARACTERS[codes])
+    return [
+        string.decode('ascii')
+        for string in characters.view(f'S{n}').reshape(n_rows)
+    ] if n > 0 else ['' for _ in range(n_rows)]
+
+
+def bvector_to_pauli_string(bvector: np.ndarray) -> Union[str, List[str]]:
+    """Convert Paulis in the binary symplectic format to Pauli strings.
+
+    Parameters
+    ----------
+    bvector : np.ndarray
+        Array of size 2n, or of shape (n_paulis, 2n).
+
+    Returns
+    -------
+    pauli_string : str or List[str]
+        Pauli string such as 'IXYZ', or list of Pauli strings if several
+        Paulis are given.
+    """
+    bvector = np.asarray(bvector)
+    n = bvector.shape[-1] // 2
+    codes = np.atleast_2d(
+        (bvector[..., :n] % 2) + 2*(bvector[..., n:] % 2)
+    ).astype(np.uint8)
+    strings = _pauli_codes_to_strings(codes)
+    if bvector.ndim == 1:
+        return strings[0]
+    return strings
 
 
 def get_effective_error(
@@ -167,18 +215,13 @@ def get_effective_error(
     if num_total_errors == 1:
         final_shape = (2*n_logical, )
 
-    effective_Z = bs_prod(logicals_x, total_error)
-    effective_X = bs_prod(logicals_z, total_error)
-
-    if num_total_errors == 1:
-        effective = np.concatenate([effective_X, effective_Z])
-    elif n_logical == 1:
-        effective = np.array([effective_X, effective_Z]).T
-    else:
-        effective = np.array([
-            np.concatenate([effective_X[:, i], effective_Z[:, i]])
-            for i in range(num_total_errors)
-        ])
+    effective_Z = np.reshape(
+        bs_prod(logicals_x, total_error), (n_logical, num_total_errors)
+    )
+    effective_X = np.reshape(
+        bs_prod(logicals_z, total_error), (n_logical, num_total_errors)
+    )
+    effective = np.vstack([effective_X, effective_Z]).T
 
     # Flatten the array if only one total error is given.
     effective = effective.reshape(final_shape)
@@ -186,31 +229,46 @@ def get_effective_error(
 
 
 def bvector_to_int(bvector: np.ndarray) -> int:
-    """Convert bvector to integer for effecient storage."""
-    return int(''.join(map(str, bvector)), 2)
+    """Convert bvector to integer for effecient storage.
+
+    The first bit of the bvector is the most significant bit.
+    """
+    bvector = np.asarray(bvector, dtype=np.uint8)
+    padding = -len(bvector) % 8
+    return int.from_bytes(np.packbits(bvector).tobytes(), 'big') >> padding
 
 
 def int_to_bvector(int_rep: int, n: int) -> np.ndarray:
     """Convert integer representation to n-qubit Pauli bvector."""
-    binary_string = ('{:0%db}' % (2*n)).format(int_rep)
-    bvector = np.array(tuple(binary_string), dtype=np.uint)
-    return bvector
+    return ints_to_bvectors([int_rep], n)[0]
 
 
-def bvectors_to_ints(bvector_list: list) -> list:
+def bvectors_to_ints(bvector_list) -> list:
     """List of bvectors to integers for efficient storage."""
-    return list(map(
-        bvector_to_int,
-        bvector_list
-    ))
+    bvectors = np.atleast_2d(np.asarray(bvector_list, dtype=np.uint8))
+    if len(bvector_list) == 0:
+        return []
+    padding = -bvectors.shape[1] % 8
+    packed = np.packbits(bvectors, axis=1)
+    return [
+        int.from_bytes(row.tobytes(), 'big') >> padding for row in packed
+    ]
 
 
 def ints_to_bvectors(int_list: list, n: int) -> list:
     """Convert list of integers back to bvectors."""
-    bvectors = []
-    for int_rep in int_list:
-        bvectors.append(int_to_bvector(int_rep, n))
-    return bvectors
+    if len(int_list) == 0:
+        return []
+    n_bytes = max(
+        (2*n + 7) // 8,
+        max((int(int_rep).bit_length() + 7) // 8 for int_rep in int_list)
+    )
+    packed = np.frombuffer(
+        b''.join(int(i).to_bytes(n_bytes, 'big') for i in int_list),
+        dtype=np.uint8
+    ).reshape(len(int_list), n_bytes)
+    bvectors = np.unpackbits(packed, axis=1)[:, -2*n:].astype(np.uint)
+    return list(bvectors)
 
 
 def gf2_rank(rows):
@@ -232,12 +290,62 @@ def gf2_rank(rows):
 
 def brank(matrix):
     """Rank of a binary matrix."""
+    return gf2.rank(matrix)
+
+
+def symplectic_gram_schmidt(vectors: np.ndarray):
+    """Symplectic basis of the span of Paulis in the binary symplectic
+    format.
+
+    The vectors are paired up into (x_i, z_i) such that x_i anticommutes
+    with z_i and commutes with all the other vectors of the basis.
+
+    Parameters
+    ----------
+    vectors : np.ndarray
+        Array of shape (m, 2n) spanning a space on which the symplectic
+        form is non-degenerate, such as representatives of the logical
+        operators of a code modulo its stabilizers.
+
+    Returns
+    -------
+    basis_x : np.ndarray
+        Array of shape (k, 2n) with the first vector of each pair.
+    basis_z : np.ndarray
+        Array of shape (k, 2n) with the second vector of each pair.
+
+    Raises
+    ------
+    ValueError
+        If some vector commutes with all the others, so that the
+        symplectic form is degenerate.
+    """
+    remaining = np.array(vectors, dtype='uint8') % 2
+    basis_x = []
+    basis_z = []
+    while len(remaining) > 0:
+        first = remaining[0]
+        commutators = bs_prod(remaining, first)
+        partners = np.flatnonzero(commutators)
+        if len(partners) == 0:
+            raise ValueError(
+                'Symplectic form is degenerate on the span of the vectors'
+            )
+        second = remaining[partners[0]]
 
-    matrix = bsparse.to_array(matrix)
+        rest = np.delete(remaining, [0, partners[0]], axis=0)
+        rest ^= np.outer(bs_prod(rest, second), first).astype('uint8')
+        rest ^= np.outer(bs_prod(rest, first), second).astype('uint8')
 
-    # Convert to list of binary numbers.
-    rows = [int(''.join(map(str, row)), 2) for row in matrix.astype(int)]
-    return gf2_rank(rows)
+        basis_x.append(first)
+        basis_z.append(second)
+        remaining = rest
+
+    n_cols = np.shape(vectors)[1]
+    return (
+        np.array(basis_x, dtype='uint8').reshape(-1, n_cols),
+        np.array(basis_z, dtype='uint8').reshape(-1, n_cols)
+    )
 
 
 def apply_deformation(
@@ -245,34 +353,17 @@ def apply_deformation(
 ) -> np.ndarray:
     """Return Hadamard-deformed bsf at given indices."""
     n = len(deformation_indices)
-    deformed = np.zeros_like(bsf)
-    if len(bsf.shape) == 1:
-        if bsf.shape[0] != 2*n:
-            raise ValueError(
-                f'Deformation index length {n} does not match '
-                f'bsf shape {bsf.shape}, which should be {(2*n,)}'
-            )
-        for i, deform in enumerate(deformation_indices):
-            if deform:
-                deformed[i] = bsf[i + n]
-                deformed[i + n] = bsf[i]
-            else:
-                deformed[i] = bsf[i]
-                deformed[i + n] = bsf[i + n]
-    else:
-        if bsf.shape[1] != 2*n:
-            raise ValueError(
-                f'Deformation index length {n} does not match '
-                f'bsf shape {bsf.shape}, which should be '
-                f'{(bsf.shape[0], 2*n)}.'
-            )
-        for i, deform in enumerate(deformation_indices):
-            if deform:
-                deformed[:, i] = bsf[:, i + n]
-                deformed[:, i + n] = bsf[:, i]
-            else:
-                deformed[:, i] = bsf[:, i]
-                deformed[:, i + n] = bsf[:, i + n]
+    if bsf.shape[-1] != 2*n:
+        expected_shape = (2*n,) if len(bsf.shape) == 1 else (bsf.shape[0], 2*n)
+        raise ValueError(
+            f'Deformation index length {n} does not match '
+            f'bsf shape {bsf.shape}, which should be {expected_shape}'
+        )
+
+    deformed = bsf.copy()
+    deformed_qubits = np.flatnonzero(deformation_indices)
+    deformed[..., deformed_qubits] = bsf[..., deformed_qubits + n]
+    deformed[..., deformed_qubits + n] = bsf[..., deformed_qubits]
     return deformed
 
 
@@ -287,7 +378,10 @@ def bsf_wt(bsf):
     if isinstance(bsf, np.ndarray):
         assert np.array_equal(bsf % 2, bsf), \
                 'BSF {} is not in binary form'.format(bsf)
-        return np.count_nonzero(sum(np.hsplit(bsf, 2)))
+        n = bsf.shape[-1] // 2
+        return np.count_nonzero(
+            np.logical_or(bsf[..., :n], bsf[..., n:])
+        )
 
     elif isinstance(bsf, csr_matrix):
         assert np.all(bsf.data == 1), \
@@ -321,31 +415,199 @@ def bsf_to_pauli(bsf):
         assert np.array_equal(bsf % 2, bsf), \
                 'BSF {} is not in binary form'.format(bsf)
 
-        def _to_pauli(b, t=str.maketrans('0123', 'IXZY')):  # noqa: B008,E501 (deliberately reuse t)
-            xs, zs = np.hsplit(b, 2)
-            ps = (xs + zs * 2).astype(str)  # 0=I, 1=X, 2=Z, 3=Y
-            return ''.join(ps).translate(t)
-
-        if bsf.ndim == 1:
-            return _to_pauli(bsf)
-        else:
-            return [_to_pauli(b) for b in bsf]
+        return bvector_to_pauli_string(bsf)
     else:
         assert np.all(bsf.data == 1), \
                 'BSF {} is not in binary form'.format(bsf)
 
-        def _to_pauli(b):  # type:ignore
-            n = bsf.shape[1] // 2
-            pauli_string = ['I' for _ in range(n)]
-            for i in b.indices:
-                if i < n:
-                    pauli_string[i] = 'X'
-                elif i >= n:
-                    if pauli_string[i - n] == 'X':
-                        pauli_string[i - n] = 'Y'
-                    else:
-                        pauli_string[i - n] = 'Z'
-
-            return ''.join(pauli_string)
-
-        return [_to_pauli(b) for b in bsf]
+        bsf = csr_matrix(bsf)
+        n = bsf.shape[1] // 2
+        rows = np.repeat(np.arange(bsf.shape[0]), np.diff(bsf.indptr))
+
+        # 0=I, 1=X, 2=Z, 3=Y
+        codes = np.zeros((bsf.shape[0], n), dtype=np.uint8)
+        np.bitwise_or.at(
+            codes, (rows, bsf.indices % n),
+            np.where(bsf.indices < n, 1, 2).astype(np.uint8)
+        )
+
+        return _pauli_codes_to_strings(codes)
+
+
+# Number of set bits of each byte value.
+_POPCOUNT_TABLE = np.array(
+    [bin(byte).count('1') for byte in range(256)], dtype=np.uint8
+)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Number of set bits of uint64 words, summed over the last axis."""
+    words = np.ascontiguousarray(words, dtype='<u8')
+    counts = _POPCOUNT_TABLE[words.view(np.uint8)]
+    return counts.reshape(*words.shape[:-1], -1).sum(axis=-1, dtype=int)
+
+
+def parity(words: np.ndarray) -> np.ndarray:
+    """Parity of the number of set bits of uint64 words, over the last
+    axis."""
+    folded = np.bitwise_xor.reduce(words, axis=-1)
+    for shift in [32, 16, 8, 4, 2, 1]:
+        folded = folded ^ (folded >> np.uint64(shift))
+    return (folded & np.uint64(1)).astype(np.uint8)
+
+
+class PauliBatch:
+    """Batch of n-qubit Pauli operators (up to phase) with bit-packed
+    X and Z parts.
+
+    Each part is stored as an array of shape (n_paulis, ceil(n / 64)) of
+    uint64 words, as in `panqec.gf2`, which takes 8 times less memory than
+    uint8 arrays in the binary symplectic format, and 64 times less than
+    arrays of `np.uint`.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Packed X part, of shape (n_paulis, ceil(n / 64)).
+    z : np.ndarray
+        Packed Z part, of same shape.
+    n : int
+        Number of qubits.
+
+    Examples
+    --------
+    >>> paulis = PauliBatch.from_bsf(pauli_to_bsf('XYZI'))
+    >>> (paulis ^ PauliBatch.from_bsf(pauli_to_bsf('XXII'))).to_bsf()
+    array([[0, 0, 0, 0, 0, 1, 1, 0]], dtype=uint8)
+    >>> paulis.weight()
+    array([3])
+    """
+
+    def __init__(self, x: np.ndarray, z: np.ndarray, n: int):
+        x = np.atleast_2d(np.asarray(x, dtype=np.uint64))
+        z = np.atleast_2d(np.asarray(z, dtype=np.uint64))
+        if x.shape != z.shape or x.shape[1] != gf2.n_words(n):
+            raise ValueError(
+                f'Packed X and Z parts of shapes {x.shape} and {z.shape} '
+                f'do not match {n} qubits'
+            )
+        self.x = x
+        self.z = z
+        self.n = n
+
+    @classmethod
+    def from_bsf(cls, bsf) -> 'PauliBatch':
+        """Pack Paulis in the binary symplectic format.
+
+        Parameters
+        ----------
+        bsf : np.ndarray or scipy.sparse.spmatrix
+            Array of size 2n or of shape (n_paulis, 2n).
+        """
+        if len(bsf.shape) == 1:
+            bsf = np.reshape(bsf, (1, -1))
+        if bsf.shape[1] % 2 != 0:
+            raise ValueError(
+                f'Length {bsf.shape[1]} binary vector not of even length.'
+            )
+        n = bsf.shape[1] // 2
+        if bsparse.is_sparse(bsf):
+            bsf = csr_matrix(bsf)
+        return cls(gf2.pack(bsf[:, :n]), gf2.pack(bsf[:, n:]), n)
+
+    @classmethod
+    def zeros(cls, n_paulis: int, n: int) -> 'PauliBatch':
+        """Batch of identities."""
+        shape = (n_paulis, gf2.n_words(n))
+        return cls(np.zeros(shape, np.uint64), np.zeros(shape, np.uint64), n)
+
+    def to_bsf(self) -> np.ndarray:
+        """Unpack into an array of shape (n_paulis, 2n) and dtype uint8 in
+        the binary symplectic format."""
+        return np.hstack([
+            gf2.unpack(self.x, self.n), gf2.unpack(self.z, self.n)
+        ])
+
+    def __len__(self) -> int:
+        return self.x.shape[0]
+
+    def __getitem__(self, index) -> 'PauliBatch':
+        return PauliBatch(
+            self.x[index].reshape(-1, self.x.shape[1]),
+            self.z[index].reshape(-1, self.z.shape[1]),
+            self.n
+        )
+
+    def __xor__(self, other: 'PauliBatch') -> 'PauliBatch':
+        """Product of the Paulis (up to phase), broadcast against a single
+        Pauli if needed."""
+        if self.n != other.n:
+            raise ValueError(
+                f'Cannot compose {self.n}-qubit and {other.n}-qubit Paulis'
+            )
+        return PauliBatch(self.x ^ other.x, self.z ^ other.z, self.n)
+
+    def __ixor__(self, other: 'PauliBatch') -> 'PauliBatch':
+        if self.n != other.n:
+            raise ValueError(
+                f'Cannot compose {self.n}-qubit and {other.n}-qubit Paulis'
+            )
+        self.x ^= other.x
+        self.z ^= other.z
+        return self
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, PauliBatch)
+            and self.n == other.n
+            and np.array_equal(self.x, other.x)
+            and np.array_equal(self.z, other.z)
+        )
+
+    def weight(self) -> np.ndarray:
+        """Number of qubits in the support of each Pauli."""
+        return popcount(self.x | self.z)
+
+    def symplectic_product(
+        self, other: 'PauliBatch', max_bytes: int = 2**26
+    ) -> np.ndarray:
+        """Array of 0 for commutes and 1 for anticommutes, like `bs_prod`.
+
+        Parameters
+        ----------
+        other : PauliBatch
+            Paulis to compare against, such as the packed stabilizers or
+            logicals of a code.
+        max_bytes : int
+            Bound on the size of the intermediate arrays of words, 64 MiB
+            by default. Both batches are split into chunks such that the
+            words of a chunk of `self` against a chunk of `other` fit in
+            it (except for single Paulis larger than the bound).
+
+        Returns
+        -------
+        commutators : np.ndarray
+            Array of shape (len(self), len(other)) and dtype uint8.
+        """
+        if self.n != other.n:
+            raise ValueError(
+                f'Length {2*self.n} bvector cannot be '
+                f'composed with length {2*other.n}'
+            )
+        commutators = np.zeros((len(self), len(other)), dtype=np.uint8)
+
+        # Number of Paulis of each chunk, filling the bound with the Paulis
+        # of `other` first.
+        pauli_bytes = self.x.itemsize * self.x.shape[1]
+        n_cols = max(1, min(len(other), max_bytes // pauli_bytes))
+        n_rows = max(1, max_bytes // (pauli_bytes * n_cols))
+
+        for row in range(0, len(self), n_rows):
+            x = self.x[row:row + n_rows, None, :]
+            z = self.z[row:row + n_rows, None, :]
+            for col in range(0, len(other), n_cols):
+                commutators[row:row + n_rows, col:col + n_cols] = parity(
+                    (x & other.z[None, col:col + n_cols])
+                    ^ (z & other.x[None, col:col + n_cols])
+                )
+        return commutators
@@ -6,6 +6,7 @@ It is mostly a wrapper around scipy.sparse, making sure that everything is in
 the correct format and is done as efficiently as possible.
 """
 
+from typing import List, Iterable, Set
 from scipy import sparse
 from scipy.sparse import csr_matrix
 import numpy as np
@@ -67,14 +68,22 @@ def insert_mod2(index: int, row_matrix):
         raise ValueError("The input should be a row matrix,"
                          f"not a {row_matrix.shape}-matrix")
 
+    # Keep the indices sorted, so that the position of index is found by
+    # binary search. To insert many ones, use BinaryMatrixBuilder instead.
+    row_matrix.sort_indices()
+    indices = row_matrix.indices
+    position = np.searchsorted(indices, index)
+
     # If matrix[index] is not zero, put it to zero
-    if index in row_matrix.indices:
-        row_matrix.indices = np.setdiff1d(row_matrix.indices, [index])
+    if position < len(indices) and indices[position] == index:
+        indices = np.delete(indices, position)
     else:
-        row_matrix.indices = np.append(row_matrix.indices, [index])
+        indices = np.insert(indices, position, index)
 
-    row_matrix.data = np.ones(len(row_matrix.indices), dtype='uint8')
-    row_matrix.indptr = np.array([0, len(row_matrix.indices)])
+    row_matrix.indices = indices.astype(row_matrix.indptr.dtype)
+    row_matrix.data = np.ones(len(indices), dtype='uint8')
+    row_matrix.indptr = np.array([0, len(indices)])
+    row_matrix.has_sorted_indices = True
 
 
 def vstack(matrices):
@@ -136,12 +145,121 @@ def dot(a, b):
         raise ValueError(f"Dimensions {a.shape} and {b.shape} don't agree"
                          "for dot product")
 
-    n_common_ones = len(np.intersect1d(a.indices, b.indices))
-    dot_product = int(n_common_ones % 2)
+    dot_product = int(a.dot(b.T).sum() % 2)
 
     return dot_product
 
 
+def batch_dot(a, b) -> np.ndarray:
+    """Dot products mod 2 between all the rows of a and all the rows of b
+
+    Parameters
+    ----------
+    a : csr_matrix or np.ndarray
+        Binary matrix of shape (m_a, n).
+    b : csr_matrix or np.ndarray
+        Binary matrix of shape (m_b, n).
+
+    Returns
+    -------
+    products : np.ndarray
+        Array of shape (m_a, m_b) and dtype uint8.
+    """
+    if not is_sparse(a):
+        a = from_array(np.atleast_2d(a))
+    if not is_sparse(b):
+        b = from_array(np.atleast_2d(b))
+
+    if a.shape[1] != b.shape[1]:
+        raise ValueError(f"Dimensions {a.shape} and {b.shape} don't agree"
+                         "for dot product")
+
+    # Count the common ones with integers to avoid uint8 overflow issues.
+    products = a.astype(int).dot(b.astype(int).T)
+    return (products.toarray() % 2).astype('uint8')
+
+
+class BinaryMatrixBuilder:
+    """Mutable sparse binary matrix, built by toggling entries one at a time.
+
+    Each row is stored as the set of the columns of its ones, so that
+    toggling an entry (adding 1 modulo 2) takes O(1) amortized time,
+    instead of reallocating the whole row as `insert_mod2` does.
+    Once built, `freeze` converts it to a csr matrix in one step.
+
+    Parameters
+    ----------
+    n_cols : int
+        Number of columns.
+    n_rows : int
+        Initial number of zero rows.
+
+    Examples
+    --------
+    >>> builder = BinaryMatrixBuilder(4, n_rows=2)
+    >>> builder.toggle(0, 3)
+    >>> builder.toggle(1, 1)
+    >>> builder.toggle(1, 1)
+    >>> builder.add_row([0, 2])
+    2
+    >>> builder.freeze().toarray()
+    array([[0, 0, 0, 1],
+           [0, 0, 0, 0],
+           [1, 0, 1, 0]], dtype=uint8)
+    """
+
+    def __init__(self, n_cols: int, n_rows: int = 0):
+        self.n_cols = n_cols
+        self._rows: List[Set[int]] = [set() for _ in range(n_rows)]
+
+    @property
+    def shape(self):
+        return (len(self._rows), self.n_cols)
+
+    def add_row(self, indices: Iterable[int] = ()) -> int:
+        """Append a row with ones at the given columns (toggled if repeated)
+        and return its index."""
+        self._rows.append(set())
+        row = len(self._rows) - 1
+        self.toggle_many(row, indices)
+        return row
+
+    def toggle(self, row: int, col: int):
+        """Add 1 modulo 2 at (row, col)."""
+        if not (0 <= col < self.n_cols):
+            raise ValueError(
+                f'Column {col} out of range for {self.n_cols} columns'
+            )
+        ones = self._rows[row]
+        if col in ones:
+            ones.remove(col)
+        else:
+            ones.add(col)
+
+    def toggle_many(self, row: int, cols: Iterable[int]):
+        """Add 1 modulo 2 at each column of cols in the given row."""
+        for col in cols:
+            self.toggle(row, col)
+
+    def is_one(self, row: int, col: int) -> bool:
+        """Return True if the entry (row, col) is nonzero."""
+        return col in self._rows[row]
+
+    def freeze(self) -> csr_matrix:
+        """Convert to a csr matrix with sorted indices."""
+        row_lengths = [len(row) for row in self._rows]
+        indptr = np.concatenate([[0], np.cumsum(row_lengths)]).astype(int)
+        indices = np.fromiter(
+            (col for row in self._rows for col in sorted(row)),
+            dtype=int, count=indptr[-1]
+        )
+        data = np.ones(len(indices), dtype='uint8')
+
+        return csr_matrix(
+            (data, indices, indptr), shape=self.shape, dtype='uint8'
+        )
+
+
 def equal(a, b):
     """Test if two matrices are equal, or if a matrix equal a unique
     number everywhere"""
@@ -287,6 +287,15 @@ def analyze(paths, overrides, plot_dir):
     analysis.make_plots(plot_dir)
     analysis.save(os.path.join(plot_dir, 'analysis.json.gz'))
 
+    # Summary of the decoding times, for simulations run with timing.
+    timing = analysis.get_decoder_timing()
+    if len(timing) > 0:
+        print('Decoding time (s)')
+        print(timing.to_string(index=False))
+        timing.to_csv(
+            os.path.join(plot_dir, 'decoder_timing.csv'), index=False
+        )
+
 
 @click.command()
 @click.argument('log_file', type=str, required=True)
@@ -380,9 +389,10 @@ def monitor_usage(log_file: str, interval: float = 10):
 @click.option(
     '-m', '--method', default='direct',
     show_default=True,
-    type=click.Choice(['direct', 'splitting']),
+    type=click.Choice(['direct', 'splitting', 'stratified']),
     help='Simulation method, between "direct" (simple Monte-Carlo simulation)'
-    'and "splitting" (Metropolis-Hastings for low error rates)'
+    ', "splitting" (Metropolis-Hastings for low error rates)'
+    ' and "stratified" (sampling at fixed error weights for low error rates)'
 )
 @click.option(
     '-l', '--label', default=None,
@@ -3,6 +3,10 @@ List of all stabilizer codes
 """
 
 from .base._stabilizer_code import StabilizerCode  # noqa
+from .base._sparse_syndrome import (  # noqa
+    Syndrome, SparseSyndrome, to_dense_syndrome, to_sparse_syndrome,
+    is_trivial_syndrome
+)
 from .surface_2d._toric_2d_code import Toric2DCode  # noqa
 from .surface_2d._planar_2d_code import Planar2DCode  # noqa
 from .surface_2d._rotated_planar_2d_code import RotatedPlanar2DCode  # noqa
@@ -23,6 +27,11 @@ from .color_3d._color_3d_code import Color3DCode  # noqa
 
 __all__ = [
     "StabilizerCode",
+    "Syndrome",
+    "SparseSyndrome",
+    "to_dense_syndrome",
+    "to_sparse_syndrome",
+    "is_trivial_syndrome",
     "Toric2DCode",
     "Planar2DCode",
     "RotatedPlanar2DCode",
@@ -1,5 +1,14 @@
 from ._stabilizer_code import StabilizerCode
+from ._sparse_syndrome import (
+    Syndrome, SparseSyndrome, to_dense_syndrome, to_sparse_syndrome,
+    is_trivial_syndrome
+)
 
 __all__ = [
     'StabilizerCode',
+    'Syndrome',
+    'SparseSyndrome',
+    'to_dense_syndrome',
+    'to_sparse_syndrome',
+    'is_trivial_syndrome',
 ]
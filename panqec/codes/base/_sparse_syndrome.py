@@ -0,0 +1,127 @@
+from typing import Union
+import numpy as np
+
+
+class SparseSyndrome:
+    """Syndrome stored as the sorted indices of the violated stabilizers
+    (the defects).
+
+    At low error rates, only a handful of the m stabilizers are violated,
+    so storing and iterating over the defects is much cheaper than over
+    a dense array of size m.
+    It can be passed to `BaseDecoder.decode` in place of a dense syndrome,
+    and converted back with `to_dense` or `np.asarray`.
+
+    Parameters
+    ----------
+    defects : array_like
+        Indices of the violated stabilizers. They are sorted and
+        duplicates are removed.
+    n_stabilizers : int
+        Total number of stabilizers m.
+
+    Examples
+    --------
+    >>> syndrome = SparseSyndrome([4, 1], 6)
+    >>> syndrome.defects
+    array([1, 4])
+    >>> syndrome.to_dense()
+    array([0, 1, 0, 0, 1, 0], dtype=uint8)
+    >>> SparseSyndrome.from_dense([0, 0, 1]).defects
+    array([2])
+    """
+
+    def __init__(self, defects, n_stabilizers: int):
+        self.defects = np.unique(np.asarray(defects, dtype=int))
+        self.n_stabilizers = int(n_stabilizers)
+
+        if len(self.defects) > 0 and (
+            self.defects[0] < 0 or self.defects[-1] >= self.n_stabilizers
+        ):
+            raise ValueError(
+                f'Defect indices must be between 0 and {self.n_stabilizers-1}'
+            )
+
+    @classmethod
+    def from_dense(cls, syndrome) -> 'SparseSyndrome':
+        """Sparse syndrome from a dense array of size m."""
+        syndrome = np.asarray(syndrome)
+
+        # The nonzero indices are already sorted, unique and in range.
+        sparse_syndrome = cls.__new__(cls)
+        sparse_syndrome.defects = np.flatnonzero(syndrome % 2)
+        sparse_syndrome.n_stabilizers = int(syndrome.shape[0])
+        return sparse_syndrome
+
+    def to_dense(self, dtype='uint8') -> np.ndarray:
+        """Dense syndrome as an array of size m."""
+        syndrome = np.zeros(self.n_stabilizers, dtype=dtype)
+        syndrome[self.defects] = 1
+        return syndrome
+
+    @property
+    def n_defects(self) -> int:
+        """Number of violated stabilizers."""
+        return len(self.defects)
+
+    @property
+    def is_trivial(self) -> bool:
+        """Whether no stabilizer is violated."""
+        return len(self.defects) == 0
+
+    @property
+    def shape(self):
+        return (self.n_stabilizers,)
+
+    def __len__(self) -> int:
+        return self.n_stabilizers
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        return self.to_dense(dtype='uint8' if dtype is None else dtype)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SparseSyndrome):
+            return NotImplemented
+        return (
+            self.n_stabilizers == other.n_stabilizers
+            and np.array_equal(self.defects, other.defects)
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f'SparseSyndrome({self.defects.tolist()}, {self.n_stabilizers})'
+        )
+
+
+# Syndrome accepted by the decoders, either dense or sparse.
+Syndrome = Union[np.ndarray, SparseSyndrome]
+
+
+def to_dense_syndrome(syndrome: Syndrome) -> np.ndarray:
+    """Dense syndrome array from a dense or sparse syndrome."""
+    if isinstance(syndrome, SparseSyndrome):
+        return syndrome.to_dense()
+    return np.asarray(syndrome)
+
+
+def to_sparse_syndrome(syndrome: Syndrome) -> SparseSyndrome:
+    """Sparse syndrome from a dense or sparse syndrome."""
+    if isinstance(syndrome, SparseSyndrome):
+        return syndrome
+    return SparseSyndrome.from_dense(syndrome)
+
+
+def is_trivial_syndrome(syndrome: Syndrome) -> bool:
+    """Whether no stabilizer is violated, without converting a dense
+    syndrome to a sparse one.
+
+    Examples
+    --------
+    >>> is_trivial_syndrome(np.zeros(4, dtype='uint8'))
+    True
+    >>> is_trivial_syndrome(SparseSyndrome([2], 4))
+    False
+    """
+    if isinstance(syndrome, SparseSyndrome):
+        return syndrome.is_trivial
+    return not np.any(syndrome)
@@ -3,18 +3,123 @@ from types import MethodType
 from copy import copy
 import os
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import json
-from scipy.sparse import csr_matrix, dok_matrix
+from scipy.sparse import csr_matrix
 
 import panqec
-from panqec.bpauli import bs_prod, get_effective_error
-from panqec import bsparse
+from panqec.bpauli import (
+    bs_prod, get_effective_error, symplectic_gram_schmidt, PauliBatch
+)
+from panqec import bsparse, gf2
+from ._sparse_syndrome import Syndrome, SparseSyndrome, to_dense_syndrome
 
 os.environ['PANQEC_ROOT_DIR'] = os.path.dirname(panqec.__file__)
 
 Operator = Dict[Tuple, str]  # Coordinate to pauli ('X', 'Y' or 'Z')
 
+# Whether an error Pauli (I, X, Z, Y coded as x + 2z) anticommutes with a
+# stabilizer Pauli (I, X, Y, Z labelled 0, 1, 2, 3 in the Tanner graph).
+_ANTICOMMUTATION_TABLE = np.array([
+    [False, False, False, False],
+    [False, False, True, True],
+    [False, True, True, False],
+    [False, True, False, True],
+])
+
+
+def _random_information_sets(
+    generators: csr_matrix,
+    checks: np.ndarray,
+    n_qubits: int,
+    n_iter: int,
+    seed: int,
+    target: int = 0
+) -> Tuple[int, Optional[np.ndarray]]:
+    """Search for low-weight logical operators with random information sets.
+
+    At each iteration, the qubits are randomly permuted and the generators
+    of the normalizer are put in reduced row echelon form, which gives
+    operators that are zero on a random set of pivot columns. The lightest
+    one that is not a stabilizer is kept. The elimination is done on
+    bit-packed rows with `gf2.row_reduce_packed`, without converting the
+    generators to a dense matrix.
+
+    Parameters
+    ----------
+    generators : csr_matrix
+        Sparse matrix whose rows span the normalizer, with n_qubits columns
+        (one sector of a CSS code) or 2 n_qubits columns (binary symplectic
+        format).
+    checks : np.ndarray
+        Matrix C such that an operator v of the normalizer is a nontrivial
+        logical operator if and only if C v != 0.
+    n_qubits : int
+        Number of qubits.
+    n_iter : int
+        Number of random information sets.
+    seed : int
+        Seed of the random number generator.
+    target : int
+        Stop as soon as a logical operator of weight at most target
+        is found.
+
+    Returns
+    -------
+    weight : int
+        Smallest weight found, or n_qubits + 1 if none was found.
+    logical : np.ndarray or None
+        Logical operator with that weight.
+    """
+    rng = np.random.default_rng(seed)
+    n_cols = generators.shape[1]
+    group_size = n_cols // n_qubits
+
+    best_weight = n_qubits + 1
+    best_logical = None
+    for _ in range(n_iter):
+        # Keep the X and Z columns of each qubit together, as adjacent
+        # bits of the same word.
+        qubit_order = rng.permutation(n_qubits)
+        columns = (
+            qubit_order[:, None] + n_qubits*np.arange(group_size)
+        ).ravel()
+        reduced = gf2.pack(generators[:, columns])
+        reduced = reduced[:len(gf2.row_reduce_packed(reduced, n_cols))]
+
+        # Parity of the overlap of each operator with each check.
+        nontrivial = np.zeros(len(reduced), dtype=bool)
+        for check in gf2.pack(checks[:, columns]):
+            nontrivial ^= gf2.popcount(reduced & check) % 2 == 1
+        if not np.any(nontrivial):
+            continue
+
+        support = reduced
+        if group_size == 2:
+            support = (reduced | (reduced >> np.uint64(1))) & np.uint64(
+                0x5555555555555555
+            )
+        weights = gf2.popcount(support)
+        weights[~nontrivial] = n_qubits + 1
+        i_min = int(np.argmin(weights))
+        if weights[i_min] < best_weight:
+            best_weight = int(weights[i_min])
+            best_logical = np.zeros(n_cols, dtype='uint8')
+            best_logical[columns] = gf2.unpack(reduced[i_min], n_cols)[0]
+            if best_weight <= target:
+                break
+
+    return best_weight, best_logical
+
+
+def _distance_cache_file() -> str:
+    """File storing the distance estimates of the codes, in the panqec
+    data directory."""
+    # Imported here as the config imports all the codes.
+    from panqec.config import PANQEC_DIR
+    return os.path.join(PANQEC_DIR, 'codes', 'distances.json')
+
 
 class StabilizerCode(metaclass=ABCMeta):
     """Abstract class for generic stabilizer codes (CSS or not)
@@ -82,10 +187,17 @@ class StabilizerCode(metaclass=ABCMeta):
         self._Hz = bsparse.empty_row(self.n)
         self._logicals_x: Optional[np.ndarray] = None
         self._logicals_z: Optional[np.ndarray] = None
+        self._computed_logicals: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._packed_stabilizers: Optional[PauliBatch] = None
+        self._classifier_matrix: Optional[csr_matrix] = None
+        self._stabilizer_adjacency: Optional[Tuple] = None
+        self._qubit_adjacency: Optional[Tuple] = None
+        self._packed_logicals: Optional[Tuple[PauliBatch, PauliBatch]] = None
         self._is_css: Optional[bool] = None
         self._x_indices: Optional[np.ndarray] = None
         self._z_indices: Optional[np.ndarray] = None
         self._d: Optional[int] = None
+        self._estimated_distance: Optional[int] = None
         self._stabilizer_types: Optional[List[str]] = None
         self.is_deformed: bool = False
         self.deformation_name: Optional[str] = None
@@ -142,7 +254,8 @@ class StabilizerCode(metaclass=ABCMeta):
 
     @property
     def d(self) -> int:
-        """Distance of the code"""
+        """Distance of the code, given by the minimum weight of the
+        logical operators (see `estimated_distance` for a tighter bound)"""
         if self._d is None:
             weights_z = np.sum(
                 np.logical_or(
@@ -162,6 +275,189 @@ class StabilizerCode(metaclass=ABCMeta):
 
         return self._d
 
+    @property
+    def estimated_distance(self) -> Optional[int]:
+        """Upper bound on the distance found by `estimate_distance`, or by
+        a previous estimate of the same code stored on disk, and None if
+        the distance has not been estimated yet."""
+        if self._estimated_distance is None:
+            estimate = self._load_distance_estimate()
+            if estimate is not None:
+                self._estimated_distance = estimate['distance']
+
+        return self._estimated_distance
+
+    def estimate_distance(
+        self,
+        n_iter: int = 100,
+        n_jobs: int = 1,
+        target: int = 0,
+        rng=None,
+        cache: bool = True
+    ) -> int:
+        """Upper bound on the distance of the code by randomized
+        information-set decoding.
+
+        Each iteration row-reduces the generators of the normalizer with a
+        random order of the qubits, and keeps the lightest nontrivial
+        logical operator among the rows. The bound is exact with high
+        probability when the number of iterations is large compared to the
+        number of minimum-weight logical operators it has to find.
+
+        The result is then given by `estimated_distance`, and stored in
+        the file 'codes/distances.json' of the panqec data directory,
+        together with the number of iterations. Later estimates of the
+        same code reuse it if it was obtained with at least as many
+        iterations, or if it already reaches the target.
+
+        Parameters
+        ----------
+        n_iter : int
+            Number of random information sets per sector of the code.
+        n_jobs : int
+            Number of worker processes used to share the iterations.
+        target : int
+            Stop early as soon as a logical operator of weight at most
+            `target` is found, for instance a known lower bound.
+        rng : numpy.random.Generator, optional
+            Random number generator (default=None resolves to
+            numpy.random.default_rng())
+        cache : bool
+            Set False to neither read nor write the estimate on disk.
+
+        Returns
+        -------
+        distance : int
+            Smallest weight of a logical operator found, which is never
+            larger than the weight of the logical operators of the code.
+        """
+        if self.k == 0:
+            raise ValueError('The code has no logical operators')
+
+        target = max(target, 0)
+        previous = self._load_distance_estimate() if cache else None
+        if previous is not None and (
+            previous['n_iter'] >= n_iter or previous['distance'] <= target
+        ):
+            self._estimated_distance = previous['distance']
+            return self._estimated_distance
+
+        rng = np.random.default_rng() if rng is None else rng
+        n = self.n
+        H = csr_matrix(self.stabilizer_matrix, dtype='uint8')
+        logicals = np.vstack([self.logicals_x, self.logicals_z]) % 2
+
+        # Generators of the normalizer, and checks detecting nontrivial
+        # logical operators by their commutation with the logicals.
+        if self.is_css:
+            sectors = [
+                (
+                    bsparse.vstack([
+                        H[self.x_indices, :n],
+                        bsparse.from_array(logicals[:, :n])
+                    ]),
+                    logicals[:, n:]
+                ),
+                (
+                    bsparse.vstack([
+                        H[self.z_indices, n:],
+                        bsparse.from_array(logicals[:, n:])
+                    ]),
+                    logicals[:, :n]
+                ),
+            ]
+        else:
+            sectors = [(
+                bsparse.vstack([H, bsparse.from_array(logicals)]),
+                np.hstack([logicals[:, n:], logicals[:, :n]])
+            )]
+
+        distance = int(self.d)
+        if previous is not None:
+            distance = min(distance, previous['distance'])
+        if n_jobs > 1 and distance > target:
+            n_chunks = 4 * n_jobs
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [
+                    executor.submit(
+                        _random_information_sets, generators, checks, n,
+                        len(chunk), int(seed), target
+                    )
+                    for generators, checks in sectors
+                    for chunk, seed in zip(
+                        np.array_split(np.arange(n_iter), n_chunks),
+                        rng.integers(2**63, size=n_chunks)
+                    )
+                    if len(chunk) > 0
+                ]
+                for future in as_completed(futures):
+                    distance = min(distance, future.result()[0])
+                    if distance <= target:
+                        for pending in futures:
+                            pending.cancel()
+                        break
+        else:
+            for generators, checks in sectors:
+                if distance <= target:
+                    break
+                weight, _ = _random_information_sets(
+                    generators, checks, n, n_iter,
+                    int(rng.integers(2**63)), target
+                )
+                distance = min(distance, weight)
+
+        self._estimated_distance = distance
+        if cache:
+            # A search stopped at the target only counts for later
+            # estimates with a target at least as large.
+            self._save_distance_estimate(
+                distance, n_iter if distance > target else 0
+            )
+
+        return distance
+
+    @property
+    def _distance_cache_key(self) -> str:
+        return json.dumps({
+            'name': self.id,
+            'parameters': self.params,
+            'deformation': self.deformation_name,
+            'deformation_parameters': self.deformation_kwargs,
+        }, sort_keys=True, default=str)
+
+    def _load_distance_estimate(self) -> Optional[dict]:
+        """Distance estimate of the code stored on disk, if any."""
+        cache_file = _distance_cache_file()
+        if not os.path.isfile(cache_file):
+            return None
+        with open(cache_file) as f:
+            return json.load(f).get(self._distance_cache_key)
+
+    def _save_distance_estimate(self, distance: int, n_iter: int):
+        """Store a distance estimate on disk, keeping the best of the
+        stored and new estimates."""
+        cache_file = _distance_cache_file()
+        estimates = {}
+        if os.path.isfile(cache_file):
+            with open(cache_file) as f:
+                estimates = json.load(f)
+        else:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+
+        previous = estimates.get(self._distance_cache_key)
+        if previous is not None:
+            distance = min(distance, previous['distance'])
+            n_iter = max(n_iter, previous['n_iter'])
+        estimates[self._distance_cache_key] = {
+            'distance': int(distance), 'n_iter': int(n_iter)
+        }
+
+        # Replace the file at once, as several processes may use it.
+        temp_file = f'{cache_file}.{os.getpid()}.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(estimates, f, indent=2)
+        os.replace(temp_file, cache_file)
+
     @property
     def qubit_coordinates(self) -> List[Tuple]:
         """List of all the coordinates that contain a qubit"""
@@ -239,6 +535,158 @@ class StabilizerCode(metaclass=ABCMeta):
 
         return self._logicals_z
 
+    @property
+    def packed_stabilizers(self) -> PauliBatch:
+        """Stabilizer generators as a bit-packed `PauliBatch`"""
+        if self._packed_stabilizers is None:
+            self._packed_stabilizers = PauliBatch.from_bsf(
+                self.stabilizer_matrix
+            )
+
+        return self._packed_stabilizers
+
+    @property
+    def packed_logicals(self) -> Tuple[PauliBatch, PauliBatch]:
+        """Logical X and Z operators as bit-packed `PauliBatch` objects"""
+        if self._packed_logicals is None:
+            self._packed_logicals = (
+                PauliBatch.from_bsf(self.logicals_x),
+                PauliBatch.from_bsf(self.logicals_z)
+            )
+
+        return self._packed_logicals
+
+    def compute_logicals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Derive a basis of logical operators from the stabilizer matrix.
+
+        Logical operators are the Paulis that commute with all the
+        stabilizers without being stabilizers themselves. Representatives
+        are found with GF(2) elimination on bit-packed rows, paired into a
+        symplectic basis (logical X_i anticommutes with logical Z_j if and
+        only if i = j), and then greedily multiplied by stabilizers to
+        reduce their weight. For CSS codes, logical X operators only
+        contain X and logical Z operators only contain Z.
+
+        This is used by default when a code does not override
+        `get_logicals_x` and `get_logicals_z`.
+
+        Returns
+        -------
+        logicals_x : np.ndarray
+            Logical X operators, as a k x 2n matrix in the binary
+            symplectic format.
+        logicals_z : np.ndarray
+            Logical Z operators, as a k x 2n matrix in the binary
+            symplectic format.
+        """
+        if self._computed_logicals is None:
+            n = self.n
+            if self.is_css:
+                x_part = self._logical_representatives(self.Hx, self.Hz)
+                z_part = self._logical_representatives(self.Hz, self.Hx)
+
+                # Change the basis of logical Z so that it is dual to the
+                # basis of logical X.
+                k = x_part.shape[0]
+                pairing = x_part.astype(int).dot(z_part.T.astype(int)) % 2
+                z_part = gf2.solve(pairing, np.eye(k, dtype='uint8')).astype(
+                    int
+                ).dot(z_part) % 2
+
+                logicals_x = np.zeros((k, 2*n), dtype='uint8')
+                logicals_z = np.zeros((k, 2*n), dtype='uint8')
+                logicals_x[:, :n] = x_part
+                logicals_z[:, n:] = z_part
+            else:
+                H = self.stabilizer_matrix
+                logicals_x, logicals_z = symplectic_gram_schmidt(
+                    self._logical_representatives(
+                        H, bsparse.hstack([H[:, n:], H[:, :n]])
+                    )
+                )
+
+            self._computed_logicals = (
+                self._reduce_logical_weight(logicals_x),
+                self._reduce_logical_weight(logicals_z)
+            )
+
+        return self._computed_logicals
+
+    def _logical_representatives(self, stabilizers, checks) -> np.ndarray:
+        """Vectors in the kernel of `checks` that are independent modulo
+        the row space of `stabilizers`.
+
+        Any vector can be reduced modulo the stabilizers to a vector
+        vanishing on their pivot columns, so the representatives are given
+        by the kernel of `checks` restricted to the other columns.
+        """
+        n_cols = checks.shape[1]
+        pivots = gf2.pivot_columns(stabilizers)
+        complement = np.setdiff1d(np.arange(n_cols), pivots)
+
+        representatives = np.zeros((0, n_cols), dtype='uint8')
+        if len(complement) > 0:
+            kernel = gf2.kernel(csr_matrix(checks)[:, complement])
+            representatives = np.zeros((len(kernel), n_cols), dtype='uint8')
+            representatives[:, complement] = kernel
+
+        return representatives
+
+    def _reduce_logical_weight(self, logicals: np.ndarray) -> np.ndarray:
+        """Greedily multiply logical operators by stabilizers to lower their
+        weight, which does not change the logical operators they represent.
+
+        At each round, the weight change of multiplying by each stabilizer
+        is computed at once, and stabilizers with disjoint supports that
+        lower the weight are applied, until no stabilizer lowers it.
+        """
+        n = self.n
+        H = csr_matrix(self.stabilizer_matrix, dtype='uint8', copy=True)
+        H.data %= 2
+        H.eliminate_zeros()
+
+        # Pauli of each stabilizer on each qubit of its support, as entries
+        # sorted by stabilizer, with stabilizer i in entries[start[i]:end[i]].
+        entry_rows = np.repeat(np.arange(H.shape[0]), np.diff(H.indptr))
+        keys, inverse = np.unique(
+            entry_rows * n + H.indices % n, return_inverse=True
+        )
+        rows, qubits = keys // n, keys % n
+        stab_x = np.bincount(inverse, weights=H.indices < n) > 0
+        stab_z = np.bincount(inverse, weights=H.indices >= n) > 0
+        start = np.searchsorted(rows, np.arange(H.shape[0]))
+        end = np.searchsorted(rows, np.arange(H.shape[0]), side='right')
+
+        reduced = np.array(logicals, dtype='uint8') % 2
+        for logical in reduced:
+            logical_x = logical[:n].astype(bool)
+            logical_z = logical[n:].astype(bool)
+            while True:
+                old_weight = logical_x[qubits] | logical_z[qubits]
+                new_weight = (
+                    (logical_x[qubits] ^ stab_x) | (logical_z[qubits] ^ stab_z)
+                )
+                gains = np.bincount(
+                    rows, weights=old_weight.astype(int) - new_weight,
+                    minlength=H.shape[0]
+                )
+                candidates = np.flatnonzero(gains > 0)
+                if len(candidates) == 0:
+                    break
+
+                used = np.zeros(n, dtype=bool)
+                for i in candidates[np.argsort(-gains[candidates])]:
+                    entries = slice(start[i], end[i])
+                    if not np.any(used[qubits[entries]]):
+                        used[qubits[entries]] = True
+                        logical_x[qubits[entries]] ^= stab_x[entries]
+                        logical_z[qubits[entries]] ^= stab_z[entries]
+
+            logical[:n] = logical_x
+            logical[n:] = logical_z
+
+        return reduced
+
     @property
     def is_css(self) -> bool:
         """Determines if a code is CSS, i.e. if it has separate X
@@ -259,10 +707,8 @@ class StabilizerCode(metaclass=ABCMeta):
         """
 
         if bsparse.is_empty(self._stabilizer_matrix):
-            sparse_dict: Dict = dict()
-            self._stabilizer_matrix = dok_matrix(
-                (self.n_stabilizers, 2*self.n),
-                dtype='uint8'
+            builder = bsparse.BinaryMatrixBuilder(
+                2*self.n, n_rows=self.n_stabilizers
             )
 
             for i_stab, stabilizer_location in enumerate(
@@ -273,23 +719,87 @@ class StabilizerCode(metaclass=ABCMeta):
                 for qubit_location in stabilizer_op.keys():
                     if stabilizer_op[qubit_location] in ['X', 'Y']:
                         i_qubit = self.qubit_index[qubit_location]
-                        if (i_stab, i_qubit) in sparse_dict.keys():
-                            sparse_dict[(i_stab, i_qubit)] += 1
-                        else:
-                            sparse_dict[(i_stab, i_qubit)] = 1
+                        builder.toggle(i_stab, i_qubit)
                     if stabilizer_op[qubit_location] in ['Y', 'Z']:
                         i_qubit = self.n + self.qubit_index[qubit_location]
-                        if (i_stab, i_qubit) in sparse_dict.keys():
-                            sparse_dict[(i_stab, i_qubit)] += 1
-                        else:
-                            sparse_dict[(i_stab, i_qubit)] = 1
+                        builder.toggle(i_stab, i_qubit)
 
-            self._stabilizer_matrix._update(sparse_dict)
-            self._stabilizer_matrix = self._stabilizer_matrix.tocsr()
-            self._stabilizer_matrix.data %= 2
+            self._stabilizer_matrix = builder.freeze()
 
         return self._stabilizer_matrix
 
+    @property
+    def stabilizer_adjacency(
+        self
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Tanner graph from stabilizers to qubits, in the CSR format.
+
+        Stabilizer i acts on qubit qubits[j] with the Pauli paulis[j],
+        for j in range(indptr[i], indptr[i+1]), where the Paulis are
+        labelled 1 for X, 2 for Y and 3 for Z.
+        The qubits of each stabilizer are sorted.
+
+        Returns
+        -------
+        indptr : np.ndarray
+            Array of size n_stabilizers + 1.
+        qubits : np.ndarray
+            Qubit indices, of size the number of edges of the Tanner graph.
+        paulis : np.ndarray
+            Pauli labels, of same size as qubits.
+        """
+        if self._stabilizer_adjacency is None:
+            labels = self._pauli_label_matrix()
+            self._stabilizer_adjacency = (
+                labels.indptr, labels.indices, labels.data
+            )
+
+        return self._stabilizer_adjacency
+
+    @property
+    def qubit_adjacency(
+        self
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Tanner graph from qubits to stabilizers, in the CSC format.
+
+        Qubit q is in the support of stabilizer stabilizers[j] with the
+        Pauli paulis[j], for j in range(indptr[q], indptr[q+1]), with the
+        same labels as `stabilizer_adjacency`.
+
+        Returns
+        -------
+        indptr : np.ndarray
+            Array of size n + 1.
+        stabilizers : np.ndarray
+            Stabilizer indices, of size the number of edges of the Tanner
+            graph.
+        paulis : np.ndarray
+            Pauli labels, of same size as stabilizers.
+        """
+        if self._qubit_adjacency is None:
+            labels = self._pauli_label_matrix().tocsc()
+            labels.sort_indices()
+            self._qubit_adjacency = (
+                labels.indptr, labels.indices, labels.data
+            )
+
+        return self._qubit_adjacency
+
+    def _pauli_label_matrix(self) -> csr_matrix:
+        """Sparse m x n matrix with the Pauli label (1 for X, 2 for Y and 3
+        for Z) of each stabilizer on each qubit."""
+        H = self.stabilizer_matrix
+        codes = csr_matrix(
+            H[:, :self.n].astype(np.int8) + 2*H[:, self.n:].astype(np.int8)
+        )
+        codes.eliminate_zeros()
+        codes.sort_indices()
+
+        # From x + 2z to the labels of I, X, Y, Z.
+        codes.data = np.array([0, 1, 3, 2], dtype=np.int8)[codes.data]
+
+        return codes
+
     @property
     def size(self) -> Tuple:
         """Dimensions of the lattice."""
@@ -415,18 +925,87 @@ class StabilizerCode(metaclass=ABCMeta):
         return bool(np.any(self.logical_errors(error) != 0))
 
     def is_success(self, total_error) -> bool:
-        return (self.in_codespace(total_error) and
-                not self.is_logical_error(total_error))
+        return bool(self.classify_errors(total_error)['success'][0])
 
-    def extract_x_syndrome(self, syndrome: np.ndarray) -> np.ndarray:
+    @property
+    def classifier_matrix(self) -> csr_matrix:
+        """Stabilizers, logical X and logical Z operators stacked into a
+        single sparse matrix, with the X and Z halves swapped so that its
+        product with an error gives all their commutators at once.
+        """
+        if self._classifier_matrix is None:
+            operators = bsparse.vstack([
+                self.stabilizer_matrix,
+                bsparse.from_array(self.logicals_x),
+                bsparse.from_array(self.logicals_z),
+            ])
+            self._classifier_matrix = csr_matrix(
+                bsparse.hstack([
+                    operators[:, self.n:], operators[:, :self.n]
+                ]), dtype='uint8'
+            )
+            self._classifier_matrix.data %= 2
+            self._classifier_matrix.eliminate_zeros()
+
+        return self._classifier_matrix
+
+    def classify_errors(self, total_errors: np.ndarray) -> dict:
+        """Classify a batch of total errors (error plus correction) with a
+        single product against `classifier_matrix`.
+
+        Parameters
+        ----------
+        total_errors: np.ndarray
+            Array of shape (n_shots, 2n), or of size 2n for a single
+            error, in the binary symplectic format
+
+        Returns
+        -------
+        classification: dict
+            Dictionary with the following arrays:
+
+            - 'codespace': boolean array of size n_shots, True if the
+              total error has a zero syndrome
+            - 'x_flips': array of shape (n_shots, k), 1 if the total error
+              flips the corresponding logical qubit in the X basis,
+              i.e. anticommutes with its logical Z
+            - 'z_flips': array of shape (n_shots, k), 1 if the total error
+              anticommutes with the corresponding logical X
+            - 'success': boolean array of size n_shots, True if the total
+              error is in the codespace and has no logical effect
+
+            The effective error of `logical_errors` is the concatenation
+            of x_flips and z_flips.
+        """
+        total_errors = np.atleast_2d(total_errors)
+        m, k = self.stabilizer_matrix.shape[0], self.k
+
+        commutators = self.classifier_matrix.dot(
+            (total_errors % 2).astype('uint8').T
+        ).T % 2
+        commutators = np.asarray(commutators, dtype='uint8')
+
+        codespace = ~np.any(commutators[:, :m], axis=1)
+        z_flips = commutators[:, m:m + k]
+        x_flips = commutators[:, m + k:]
+
+        return {
+            'codespace': codespace,
+            'x_flips': x_flips,
+            'z_flips': z_flips,
+            'success': codespace & ~np.any(commutators[:, m:], axis=1),
+        }
+
+    def extract_x_syndrome(
+        self, syndrome: Syndrome
+    ) -> np.ndarray:
         """For CSS codes only. Returns the part of the syndrome that
         corresponds to X stabilizers.
 
         Parameters
         ----------
-        syndrome: np.ndarray
-            Syndrome as a sparse row of dimension 1xm, where m is the number
-            of stabilizers.
+        syndrome: np.ndarray or SparseSyndrome
+            Syndrome of dimension m, where m is the number of stabilizers.
 
         Returns
         -------
@@ -434,17 +1013,18 @@ class StabilizerCode(metaclass=ABCMeta):
             Syndrome reduced to X stabilizers
         """
 
-        return syndrome[self.x_indices]
+        return to_dense_syndrome(syndrome)[self.x_indices]
 
-    def extract_z_syndrome(self, syndrome: np.ndarray) -> np.ndarray:
+    def extract_z_syndrome(
+        self, syndrome: Syndrome
+    ) -> np.ndarray:
         """For CSS codes only. Returns the part of the syndrome that
         corresponds to Z stabilizers.
 
         Parameters
         ----------
-        syndrome: np.ndarray
-            Syndrome as a sparse row of dimension 1xm, where m is the number
-            of stabilizers.
+        syndrome: np.ndarray or SparseSyndrome
+            Syndrome of dimension m, where m is the number of stabilizers.
 
         Returns
         -------
@@ -452,7 +1032,7 @@ class StabilizerCode(metaclass=ABCMeta):
             Syndrome reduced to X stabilizers
         """
 
-        return syndrome[self.z_indices]
+        return to_dense_syndrome(syndrome)[self.z_indices]
 
     def to_bsf(self, operator: Operator) -> np.ndarray:
         """Convert an operator (given as a dictionary qubit_location -> pauli)
@@ -470,7 +1050,7 @@ class StabilizerCode(metaclass=ABCMeta):
             Array of dimension 2n in the binary symplectic format
             (where n is the number of qubits)
         """
-        bsf_operator = np.zeros(2*self.n, dtype=np.uint)
+        bsf_operator = np.zeros(2*self.n, dtype='uint8')
 
         for qubit_location in operator.keys():
             if operator[qubit_location] in ['X', 'Y']:
@@ -538,6 +1118,112 @@ class StabilizerCode(metaclass=ABCMeta):
 
         return bs_prod(self.stabilizer_matrix, error)
 
+    def measure_sparse_syndrome(self, error: np.ndarray) -> SparseSyndrome:
+        """Noiseless syndrome of a Pauli error as a `SparseSyndrome`.
+
+        It is computed from the qubit adjacency of the Tanner graph, which
+        only visits the stabilizers around the support of the error.
+
+        Parameters
+        ----------
+        error: np.ndarray
+            Error given as an array of dimension 2n in the binary
+            symplectic format.
+
+        Returns
+        -------
+        syndrome: SparseSyndrome
+            Indices of the stabilizers anticommuting with the error.
+        """
+
+        return SparseSyndrome(
+            self._syndrome_defects(error), self.n_stabilizers
+        )
+
+    def measure_syndromes(self, errors: np.ndarray) -> np.ndarray:
+        """Noiseless syndromes of a batch of Pauli errors.
+
+        Parameters
+        ----------
+        errors: np.ndarray
+            Errors given as an array of shape (n_errors, 2n) in the binary
+            symplectic format.
+
+        Returns
+        -------
+        syndromes: np.ndarray
+            Syndromes, as an array of shape (n_errors, m).
+        """
+
+        return (self._syndrome_products(errors).toarray() % 2).astype('uint8')
+
+    def measure_sparse_syndromes(
+        self, errors: np.ndarray
+    ) -> List[SparseSyndrome]:
+        """Noiseless syndromes of a batch of Pauli errors, as a list of
+        `SparseSyndrome` obtained without building a dense array.
+
+        Parameters
+        ----------
+        errors: np.ndarray
+            Errors given as an array of shape (n_errors, 2n) in the binary
+            symplectic format.
+
+        Returns
+        -------
+        syndromes: List[SparseSyndrome]
+            Sparse syndrome of each error.
+        """
+
+        products = self._syndrome_products(errors)
+        products.data %= 2
+        products.eliminate_zeros()
+        products.sort_indices()
+
+        return [
+            SparseSyndrome(defects, self.n_stabilizers)
+            for defects in np.split(products.indices, products.indptr[1:-1])
+        ]
+
+    def _syndrome_products(self, errors: np.ndarray) -> csr_matrix:
+        """Integer (not reduced mod 2) symplectic products of a batch of
+        errors with all the stabilizers, as a sparse (n_errors, m) matrix.
+        """
+        errors = np.atleast_2d(errors)
+        swapped = csr_matrix(np.hstack([
+            errors[:, self.n:], errors[:, :self.n]
+        ]).astype(np.int32))
+
+        return csr_matrix(
+            swapped @ self.stabilizer_matrix.T.astype(np.int32)
+        )
+
+    def _syndrome_defects(self, error: np.ndarray) -> np.ndarray:
+        """Sorted indices of the stabilizers anticommuting with an error."""
+        error = np.asarray(error)
+        n = self.n
+        error_paulis = error[:n].astype(int) + 2*error[n:].astype(int)
+        support = np.flatnonzero(error_paulis)
+
+        indptr, stabilizers, stab_paulis = self.qubit_adjacency
+        starts = indptr[support]
+        lengths = indptr[support + 1] - starts
+        edges = (
+            np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            + np.arange(np.sum(lengths))
+        )
+
+        # Paulis are coded x + 2z for the error and 1, 2, 3 for X, Y, Z
+        # on the stabilizers, and anticommute when distinct and non-trivial.
+        anticommutes = _ANTICOMMUTATION_TABLE[
+            np.repeat(error_paulis[support], lengths), stab_paulis[edges]
+        ]
+        flipped, counts = np.unique(
+            stabilizers[edges[anticommutes]], return_counts=True
+        )
+
+        return flipped[counts % 2 == 1]
+
     def is_stabilizer(self, location: Tuple, stab_type: Optional[str] = None):
         """Returns whether a given location in the coordinate system
         corresponds to a stabilizer or not
@@ -637,12 +1323,14 @@ class StabilizerCode(metaclass=ABCMeta):
             qubit location in the support of the stabilizer
         """
 
-    @abstractmethod
     def get_logicals_x(self) -> List[Operator]:
         """Returns the list of logical X operators, where each operator is a
         dictionary that assigns a Pauli operator ('X', 'Y' or 'Z') to each
         qubit location in its support.
 
+        By default, they are derived from the stabilizers with
+        `compute_logicals`.
+
         Returns
         -------
         logicals: List[Dict[Tuple, str]]
@@ -650,13 +1338,17 @@ class StabilizerCode(metaclass=ABCMeta):
             operator ('X', 'Y' or 'Z') to each qubit location in the support
             of the logical operator.
         """
+        logicals_x, _ = self.compute_logicals()
+        return [self.from_bsf(logical) for logical in logicals_x]
 
-    @abstractmethod
     def get_logicals_z(self) -> List[Operator]:
         """Returns the list of logical Z operators, where each operator is a
         dictionary that assigns a Pauli operator ('X', 'Y' or 'Z') to each
         qubit location in its support.
 
+        By default, they are derived from the stabilizers with
+        `compute_logicals`.
+
         Returns
         -------
         logicals: List[Dict[Tuple, str]]
@@ -664,6 +1356,8 @@ class StabilizerCode(metaclass=ABCMeta):
             operator ('X', 'Y' or 'Z') to each qubit location in the support
             of the logical operator.
         """
+        _, logicals_z = self.compute_logicals()
+        return [self.from_bsf(logical) for logical in logicals_z]
 
     def get_deformation(
         self, location: Tuple, deformation_name: str, **kwargs
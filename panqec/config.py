@@ -16,10 +16,12 @@ from .codes import (
 )
 from .decoders import (
     SweepMatchDecoder, XCubeMatchingDecoder,
-    RotatedSweepMatchDecoder
+    RotatedSweepMatchDecoder, UnionFindDecoder, ColorRestrictionDecoder,
+    PreDecoder, ParallelDecoder
 )
 from .decoders import BeliefPropagationOSDDecoder
 from .decoders import MemoryBeliefPropagationDecoder
+from .decoders import BatchBeliefPropagationDecoder
 from .decoders.matching._matching_decoder import MatchingDecoder
 from .error_models import PauliErrorModel
 
@@ -78,7 +80,12 @@ DECODERS: Dict[str, Any] = {
     'RotatedSweepMatchDecoder': RotatedSweepMatchDecoder,
     'BeliefPropagationOSDDecoder': BeliefPropagationOSDDecoder,
     'MemoryBeliefPropagationDecoder': MemoryBeliefPropagationDecoder,
-    'XCubeMatchingDecoder': XCubeMatchingDecoder
+    'BatchBeliefPropagationDecoder': BatchBeliefPropagationDecoder,
+    'XCubeMatchingDecoder': XCubeMatchingDecoder,
+    'UnionFindDecoder': UnionFindDecoder,
+    'ColorRestrictionDecoder': ColorRestrictionDecoder,
+    'PreDecoder': PreDecoder,
+    'ParallelDecoder': ParallelDecoder
 }
 
 # Slurm automation config.
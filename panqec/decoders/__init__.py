@@ -2,6 +2,7 @@ from .base._base_decoder import BaseDecoder  # noqa
 
 from .belief_propagation.bposd_decoder import BeliefPropagationOSDDecoder  # noqa
 from .belief_propagation.mbp_decoder import MemoryBeliefPropagationDecoder  # noqa
+from .belief_propagation.batch_bp_decoder import BatchBeliefPropagationDecoder  # noqa
 
 from .matching._matching_decoder import MatchingDecoder  # noqa
 from .xcube._xcube_matching_decoder import XCubeMatchingDecoder  # noqa
@@ -9,16 +10,25 @@ from .sweepmatch._sweep_decoder_3d import SweepDecoder3D  # noqa
 from .sweepmatch._sweep_match_decoder import SweepMatchDecoder  # noqa
 from .sweepmatch._rotated_sweep_decoder import RotatedSweepDecoder3D  # noqa
 from .sweepmatch._rotated_sweep_match_decoder import RotatedSweepMatchDecoder  # noqa
+from .union_find._union_find_decoder import UnionFindDecoder  # noqa
+from .restriction._color_restriction_decoder import ColorRestrictionDecoder  # noqa
+from .predecoder._predecoder import PreDecoder  # noqa
+from .parallel._parallel_decoder import ParallelDecoder  # noqa
 
 __all__ = [
     "BaseDecoder",
     "BeliefPropagationOSDDecoder",
     "MemoryBeliefPropagationDecoder",
+    "BatchBeliefPropagationDecoder",
 
     "RotatedSweepDecoder3D",
     "RotatedSweepMatchDecoder",
     "SweepDecoder3D",
     "SweepMatchDecoder",
     "MatchingDecoder",
-    "XCubeMatchingDecoder"
+    "XCubeMatchingDecoder",
+    "UnionFindDecoder",
+    "ColorRestrictionDecoder",
+    "PreDecoder",
+    "ParallelDecoder"
 ]
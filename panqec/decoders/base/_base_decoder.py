@@ -1,13 +1,31 @@
 from abc import ABCMeta, abstractmethod
-from typing import Optional, List
-from panqec.codes import StabilizerCode
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import ContextManager, Optional, List
+from panqec.codes import StabilizerCode, Syndrome
 from panqec.error_models import BaseErrorModel
+from panqec.timing import DecoderTimer
 import numpy as np
 
 
 class BaseDecoder(metaclass=ABCMeta):
     """Base class for decoders"""
 
+    # Whether `decode` can be called from several threads at once on the
+    # same instance. Decoders that modify their state while decoding
+    # (native matching graphs, random generators, counters) are not, and
+    # `ParallelDecoder` gives each of its threads its own copy of them.
+    thread_safe: bool = False
+
+    # Timer of the stages of decoding, only set if timing is enabled with
+    # `enable_timing`, and time taken to build the decoder, if measured.
+    timer: Optional[DecoderTimer] = None
+    init_time: Optional[float] = None
+
+    # Pool of threads of decoders that use several threads, created by
+    # `get_executor` and shut down by `close`.
+    _executor: Optional[ThreadPoolExecutor] = None
+
     def __init__(
         self,
         code: StabilizerCode,
@@ -49,17 +67,94 @@ class BaseDecoder(metaclass=ABCMeta):
         Example: `{'num_iterations': 10}`
         """
 
+    def set_error_rate(self, error_rate: float):
+        """Change the error rate used by the decoder, without rebuilding
+        the structures that only depend on the code.
+
+        It allows a single decoder to be reused for many error rates.
+        Decoders that support it update the quantities depending on the
+        error rate (such as matching weights) in place.
+
+        Parameters
+        ----------
+        error_rate: float
+            New physical error rate.
+
+        Raises
+        ------
+        NotImplementedError
+            If the decoder has to be created again for each error rate.
+        """
+        raise NotImplementedError(
+            f'{self.id} does not support changing the error rate'
+        )
+
+    def enable_timing(
+        self, timer: Optional[DecoderTimer] = None
+    ) -> DecoderTimer:
+        """Record the duration of the stages of decoding in histograms.
+
+        Decoders that use other decoders pass the timer on to them, so
+        that all the stages end up in the same timer.
+
+        Parameters
+        ----------
+        timer: DecoderTimer, optional
+            Timer in which the durations are recorded. A new one is
+            created if not given.
+
+        Returns
+        -------
+        timer : DecoderTimer
+            The timer used by the decoder.
+        """
+        if timer is None:
+            timer = DecoderTimer()
+        self.timer = timer
+
+        return timer
+
+    def disable_timing(self):
+        """Stop recording the duration of the stages of decoding."""
+        self.timer = None
+
+    def get_executor(self, n_threads: int) -> ThreadPoolExecutor:
+        """Pool of threads of the decoder, created the first time it is
+        needed, and kept until `close` is called."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(n_threads)
+        return self._executor
+
+    def close(self):
+        """Shut down the threads of the decoder, if any. They are created
+        again if the decoder is used after being closed."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def stage(self, name: str) -> ContextManager:
+        """Context manager recording the time spent in a stage of decoding,
+        which does nothing if timing is not enabled.
+
+        Example: `with self.stage('match'): ...`
+        """
+        if self.timer is None:
+            return nullcontext()
+        return self.timer.stage(name)
+
     @abstractmethod
-    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
         """Given a code and a syndrome, returns a correction to apply
         to the qubits
 
         Parameters
         ----------
-        syndrome: np.ndarray
+        syndrome: np.ndarray or SparseSyndrome
             Syndrome as an array of size m, where m is the number of
             stabilizers. Each element contains 1 if the stabilizer is
-            activated and 0 otherwise
+            activated and 0 otherwise. It can also be given as a
+            `SparseSyndrome` with the indices of the activated stabilizers,
+            in which case decoders only iterate over those indices.
 
         kwargs: dict
             Decoder-specific parameters (implemented by subclasses)
@@ -70,3 +165,29 @@ class BaseDecoder(metaclass=ABCMeta):
             Correction as an array of size 2n (with n the number of qubits)
             in the binary symplectic format.
         """
+
+    def decode_batch(self, syndromes, **kwargs) -> np.ndarray:
+        """Decode many syndromes with the same decoder.
+
+        Decoders that can process several syndromes at once override it,
+        otherwise each syndrome is decoded in turn with `decode`.
+
+        Parameters
+        ----------
+        syndromes: np.ndarray or List[SparseSyndrome]
+            Array of shape (n_syndromes, m), or list of syndromes.
+
+        kwargs: dict
+            Decoder-specific parameters passed to `decode`
+
+        Returns
+        -------
+        corrections : np.ndarray
+            Array of shape (n_syndromes, 2n) with the correction of each
+            syndrome in the binary symplectic format.
+        """
+        corrections = np.zeros((len(syndromes), 2*self.code.n), dtype='uint8')
+        for i, syndrome in enumerate(syndromes):
+            corrections[i] = self.decode(syndrome, **kwargs)
+
+        return corrections
@@ -0,0 +1,399 @@
+from typing import Dict, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from ldpc import bposd_decoder
+from panqec.codes import StabilizerCode, Syndrome, to_dense_syndrome
+from panqec.error_models import BaseErrorModel
+from panqec.decoders import BaseDecoder
+from panqec import gf2
+
+# Messages are clipped to this magnitude, so that checks of degree one and
+# probabilities close to 0 or 1 do not produce infinite log-likelihoods.
+_MAX_LLR = 30.
+
+
+class TannerGraph:
+    """Edge list of the Tanner graph of a binary parity-check matrix, on
+    which belief propagation runs for many syndromes at once.
+
+    The edges are sorted by check, so that the check-node updates are
+    segment reductions (`np.ufunc.reduceat`) over the edge axis, and the
+    messages of all the shots are stored as arrays of shape
+    (n_shots, n_edges).
+
+    Parameters
+    ----------
+    H : csr_matrix
+        Parity-check matrix of shape (m, n).
+
+    Examples
+    --------
+    >>> H = np.array([[1, 1, 0], [0, 1, 1]])
+    >>> graph = TannerGraph(H)
+    >>> graph.edge_checks, graph.edge_qubits
+    (array([0, 0, 1, 1]), array([0, 1, 1, 2], dtype=int32))
+    >>> llrs = np.log(0.9/0.1) * np.ones(3)
+    >>> corrections, converged, _ = graph.decode(
+    ...     np.array([[1, 0], [1, 1]]), llrs, max_iter=10
+    ... )
+    >>> corrections, converged
+    (array([[1, 0, 0],
+           [0, 1, 0]], dtype=uint8), array([ True,  True]))
+    """
+
+    def __init__(self, H):
+        H = csr_matrix(H, dtype='uint8')
+        H.eliminate_zeros()
+        H.sort_indices()
+        self.H = H
+        self.n_checks, self.n_qubits = H.shape
+
+        degrees = np.diff(H.indptr)
+        self.edge_checks = np.repeat(np.arange(self.n_checks), degrees)
+        self.edge_qubits = H.indices
+        self.n_edges = len(self.edge_qubits)
+
+        # Start of the edges of each (non-empty) check, and index of the
+        # check of each edge among the non-empty ones.
+        self._starts = H.indptr[:-1][degrees > 0]
+        self._segments = np.repeat(
+            np.arange(len(self._starts)), degrees[degrees > 0]
+        )
+
+        # Sums the messages of shape (n_shots, n_edges) over each qubit.
+        self._qubit_sum = csr_matrix(
+            (np.ones(self.n_edges), (np.arange(self.n_edges),
+                                     self.edge_qubits)),
+            shape=(self.n_edges, self.n_qubits)
+        )
+
+    def is_satisfied(self, syndromes: np.ndarray,
+                     corrections: np.ndarray) -> np.ndarray:
+        """Whether each correction of shape (n_shots, n) has the given
+        syndrome."""
+        parities = (self.H @ corrections.T.astype(int)).T % 2
+        return np.all(parities == syndromes, axis=1)
+
+    def _check_update(self, messages: np.ndarray, flips: np.ndarray,
+                      bp_method: str, ms_scaling_factor: float) -> np.ndarray:
+        """Messages from the checks to the qubits, given the messages from
+        the qubits to the checks, both of shape (n_shots, n_edges), and
+        whether the syndrome of the check of each edge is 1."""
+
+        segments = self._segments
+
+        # Sign of the product over the other edges of each check.
+        negative = (messages < 0).astype(np.int8)
+        n_negative = np.add.reduceat(negative, self._starts, axis=1)
+        flip = (n_negative[:, segments] - negative + flips) % 2
+        signs = 1 - 2*flip
+
+        if bp_method == 'ms':
+            # Minimum over the other edges: the smallest magnitude of the
+            # check, except on the edge reaching it where it is the second
+            # smallest (or the smallest again if it is reached twice).
+            magnitudes = np.abs(messages)
+            min1 = np.minimum.reduceat(magnitudes, self._starts, axis=1)
+            is_min = magnitudes == min1[:, segments]
+            n_min = np.add.reduceat(
+                is_min.astype(np.int32), self._starts, axis=1
+            )
+            min2 = np.minimum.reduceat(
+                np.where(is_min, np.inf, magnitudes), self._starts, axis=1
+            )
+            min2 = np.where(n_min > 1, min1, min2)
+            magnitudes = ms_scaling_factor * np.where(
+                is_min, min2[:, segments], min1[:, segments]
+            )
+        else:
+            # Product of tanh(m/2) over the other edges, computed as a sum
+            # of logarithms.
+            log_tanh = np.log(np.maximum(
+                np.abs(np.tanh(messages / 2)), np.finfo(float).tiny
+            ))
+            log_sums = np.add.reduceat(log_tanh, self._starts, axis=1)
+            products = np.exp(log_sums[:, segments] - log_tanh)
+            magnitudes = 2*np.arctanh(np.minimum(products, 1 - 1e-15))
+
+        return signs * np.minimum(magnitudes, _MAX_LLR)
+
+    def decode(self, syndromes: np.ndarray, llrs: np.ndarray,
+               max_iter: int, bp_method: str = 'ms',
+               ms_scaling_factor: float = 1.
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Run belief propagation on a batch of syndromes.
+
+        Only the shots that have not converged yet are updated at each
+        iteration, and the loop stops once they have all converged.
+
+        Parameters
+        ----------
+        syndromes : np.ndarray
+            Binary syndromes of shape (n_shots, m).
+        llrs : np.ndarray
+            Prior log-likelihood ratios log((1-p)/p) of each qubit.
+        max_iter : int
+            Maximum number of iterations.
+        bp_method : str
+            'ms' for min-sum, 'ps' for product-sum.
+        ms_scaling_factor : float
+            Scaling factor of the min-sum messages.
+
+        Returns
+        -------
+        corrections : np.ndarray
+            Hard decisions of shape (n_shots, n), of the last iteration
+            for the shots that have not converged.
+        converged : np.ndarray
+            Whether the correction of each shot matches its syndrome.
+        posteriors : np.ndarray
+            Posterior log-likelihood ratios of shape (n_shots, n).
+        """
+        if bp_method not in ['ms', 'ps']:
+            raise ValueError(
+                f"Unknown BP method '{bp_method}', must be 'ms' or 'ps'"
+            )
+
+        syndromes = np.asarray(syndromes, dtype='uint8')
+        llrs = np.clip(llrs, -_MAX_LLR, _MAX_LLR)
+        n_shots = syndromes.shape[0]
+
+        posteriors = np.tile(llrs, (n_shots, 1))
+        corrections = np.tile((llrs < 0).astype('uint8'), (n_shots, 1))
+        converged = self.is_satisfied(syndromes, corrections)
+
+        active = np.flatnonzero(~converged)
+        messages = np.tile(llrs[self.edge_qubits], (len(active), 1))
+        flips = syndromes[active][:, self.edge_checks].astype(np.int8)
+
+        for _ in range(max_iter):
+            if len(active) == 0:
+                break
+
+            check_messages = self._check_update(
+                messages, flips, bp_method, ms_scaling_factor
+            )
+            totals = llrs + check_messages @ self._qubit_sum
+            hard = (totals < 0).astype('uint8')
+
+            posteriors[active] = totals
+            corrections[active] = hard
+            done = self.is_satisfied(syndromes[active], hard)
+            converged[active[done]] = True
+
+            keep = ~done
+            active = active[keep]
+            messages = (
+                totals[keep][:, self.edge_qubits] - check_messages[keep]
+            )
+            flips = flips[keep]
+
+        return corrections, converged, posteriors
+
+
+class BatchBeliefPropagationDecoder(BaseDecoder):
+    """Belief propagation decoder written with numpy, which decodes a
+    whole batch of syndromes at once.
+
+    BP runs on the binary matrices Hz (X errors) and Hx (Z errors) for CSS
+    codes, and on the full stabilizer matrix otherwise. The messages of
+    all the shots are updated together (see `TannerGraph`), and the shots
+    whose hard decision matches the syndrome stop being updated. The
+    shots that have not converged after `max_bp_iter` iterations are
+    decoded again with the BP-OSD decoder of `ldpc` if `osd` is True,
+    so that OSD only runs for those.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code used by the decoder
+    error_model: BaseErrorModel
+        Error model used by the decoder
+    error_rate: float
+        Error rate used by the decoder
+    max_bp_iter: int
+        Maximum number of iterations of belief propagation
+    bp_method: str
+        'ms' for min-sum, 'ps' for product-sum
+    ms_scaling_factor: float
+        Scaling factor of the min-sum messages
+    osd: bool
+        Whether to use BP-OSD on the shots for which BP did not converge.
+        Otherwise, their correction is the last hard decision of BP.
+    osd_order: int
+        Order of the combination-sweep OSD
+
+    Notes
+    -----
+    With timing enabled, the batched belief propagation is recorded in the
+    stage 'bp' and the OSD fallback in the stage 'osd'.
+
+    Attributes
+    ----------
+    n_osd : int
+        Number of decoding problems (one per shot and per sector of a CSS
+        code) for which BP did not converge and OSD was used.
+    """
+    label = 'Batch BP decoder'
+    allowed_codes = None  # all codes allowed
+    thread_safe = False  # ldpc OSD decoders and call counter
+
+    def __init__(self,
+                 code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 max_bp_iter: int = 100,
+                 bp_method: str = 'ms',
+                 ms_scaling_factor: float = 0.75,
+                 osd: bool = True,
+                 osd_order: int = 10):
+        super().__init__(code, error_model, error_rate)
+        if bp_method not in ['ms', 'ps']:
+            raise ValueError(
+                f"Unknown BP method '{bp_method}', must be 'ms' or 'ps'"
+            )
+
+        self._max_bp_iter = max_bp_iter
+        self._bp_method = bp_method
+        self._ms_scaling_factor = ms_scaling_factor
+        self._osd = osd
+        self._osd_order = osd_order
+
+        self.n_osd = 0
+
+        # Tanner graphs and OSD decoders are created on first use.
+        self._graphs: Dict[str, TannerGraph] = dict()
+        self._osd_decoders: Dict[str, bposd_decoder] = dict()
+
+    @property
+    def params(self) -> dict:
+        return {
+            'max_bp_iter': self._max_bp_iter,
+            'bp_method': self._bp_method,
+            'ms_scaling_factor': self._ms_scaling_factor,
+            'osd': self._osd,
+            'osd_order': self._osd_order
+        }
+
+    def set_error_rate(self, error_rate: float):
+        # The channel probabilities are computed at each decoding.
+        self.error_rate = error_rate
+
+    def get_sectors(self) -> Dict[str, Tuple[csr_matrix, np.ndarray]]:
+        """Check matrix and error probability of each qubit, for each
+        decoding problem.
+
+        For CSS codes, X errors are decoded with Hz and Z errors with Hx.
+        Otherwise, the full stabilizer matrix is decoded, with columns
+        detecting Z errors before the ones detecting X errors.
+        """
+        pi, px, py, pz = self.error_model.probability_distribution(
+            self.code, self.error_rate
+        )
+        if self.code.is_css:
+            return {
+                'X': (self.code.Hz, px + py),
+                'Z': (self.code.Hx, pz + py)
+            }
+        else:
+            return {
+                'XZ': (
+                    self.code.stabilizer_matrix,
+                    np.hstack([pz + py, px + py])
+                )
+            }
+
+    def _get_graph(self, sector: str, H) -> TannerGraph:
+        if sector not in self._graphs:
+            self._graphs[sector] = TannerGraph(H)
+        return self._graphs[sector]
+
+    def _get_osd_decoder(self, sector: str, H) -> bposd_decoder:
+        if sector not in self._osd_decoders:
+            # The order of OSD is limited by the number of free columns.
+            n_free = H.shape[1] - gf2.rank(H)
+            self._osd_decoders[sector] = bposd_decoder(
+                H,
+                error_rate=self.error_rate,
+                max_iter=self._max_bp_iter,
+                bp_method='msl',
+                ms_scaling_factor=0,
+                osd_method="osd_cs",
+                osd_order=min(self._osd_order, n_free)
+            )
+        return self._osd_decoders[sector]
+
+    def _decode_sector(self, sector: str, H, probabilities: np.ndarray,
+                       syndromes: np.ndarray) -> np.ndarray:
+        """Corrections of shape (n_shots, n) for a single decoding
+        problem."""
+        probabilities = np.clip(probabilities, 1e-15, 1 - 1e-15)
+        llrs = np.log((1 - probabilities) / probabilities)
+
+        graph = self._get_graph(sector, H)
+        with self.stage('bp'):
+            corrections, converged, _ = graph.decode(
+                syndromes, llrs, self._max_bp_iter,
+                bp_method=self._bp_method,
+                ms_scaling_factor=self._ms_scaling_factor
+            )
+
+        failed = np.flatnonzero(~converged)
+        if self._osd and len(failed) > 0:
+            with self.stage('osd'):
+                decoder = self._get_osd_decoder(sector, H)
+                decoder.update_channel_probs(probabilities)
+                for shot in failed:
+                    decoder.decode(syndromes[shot])
+                    corrections[shot] = decoder.osdw_decoding
+            self.n_osd += len(failed)
+
+        return corrections
+
+    def decode_batch(self, syndromes, **kwargs) -> np.ndarray:
+        """Decode many syndromes at once.
+
+        Parameters
+        ----------
+        syndromes: np.ndarray or List[SparseSyndrome]
+            Array of shape (n_syndromes, m), or list of syndromes.
+
+        Returns
+        -------
+        corrections : np.ndarray
+            Array of shape (n_syndromes, 2n) with the correction of each
+            syndrome in the binary symplectic format.
+        """
+        if isinstance(syndromes, np.ndarray):
+            syndromes = np.atleast_2d(syndromes).astype('uint8')
+        else:
+            syndromes = np.array(
+                [to_dense_syndrome(syndrome) for syndrome in syndromes],
+                dtype='uint8'
+            ).reshape(-1, self.code.n_stabilizers)
+
+        n = self.code.n
+        corrections = np.zeros((len(syndromes), 2*n), dtype='uint8')
+        sectors = self.get_sectors()
+
+        if self.code.is_css:
+            H, probabilities = sectors['X']
+            corrections[:, :n] = self._decode_sector(
+                'X', H, probabilities, syndromes[:, self.code.z_indices]
+            )
+            H, probabilities = sectors['Z']
+            corrections[:, n:] = self._decode_sector(
+                'Z', H, probabilities, syndromes[:, self.code.x_indices]
+            )
+        else:
+            H, probabilities = sectors['XZ']
+            correction = self._decode_sector('XZ', H, probabilities, syndromes)
+            corrections[:, :n] = correction[:, n:]
+            corrections[:, n:] = correction[:, :n]
+
+        return corrections
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
+        """Get X and Z corrections given code and measured syndrome."""
+        syndrome = to_dense_syndrome(syndrome)
+        return self.decode_batch(np.array([syndrome]), **kwargs)[0]
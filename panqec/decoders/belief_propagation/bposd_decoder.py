@@ -1,13 +1,115 @@
+import time
+from typing import List, Optional, Tuple
 import numpy as np
+from scipy.sparse import bmat, csr_matrix
+from scipy.sparse.csgraph import connected_components
 from ldpc import bposd_decoder
-from panqec.codes import StabilizerCode
+from panqec.codes import StabilizerCode, is_trivial_syndrome, Syndrome
 from panqec.error_models import BaseErrorModel
 from panqec.decoders import BaseDecoder
+from panqec import gf2
+
+
+def get_syndrome_clusters(
+    H: csr_matrix, syndrome: np.ndarray, radius: int
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Split a decoding problem into independent clusters of defects.
+
+    The defects are grown by `radius` hops on the Tanner graph (from
+    checks to their qubits and back to checks). The qubits whose checks
+    all lie in the grown region are then split into connected components,
+    and each component with a defect can be decoded on its own
+    sub-matrix.
+
+    Parameters
+    ----------
+    H : csr_matrix
+        Parity-check matrix of shape (m, n).
+    syndrome : np.ndarray
+        Binary syndrome of size m.
+    radius : int
+        Number of hops by which the defects are grown.
+
+    Returns
+    -------
+    clusters : List[Tuple[np.ndarray, np.ndarray]]
+        Rows (checks) and columns (qubits) of each cluster.
+
+    Examples
+    --------
+    >>> H = csr_matrix(np.eye(6, dtype=int) + np.eye(6, k=1, dtype=int))
+    >>> get_syndrome_clusters(H, np.array([1, 0, 0, 0, 1, 0]), 1)
+    [(array([0, 1]), array([0, 1])), (array([3, 4, 5]), array([4, 5]))]
+    """
+    H = csr_matrix(H)
+    HT = H.T.tocsr()
+
+    in_region = np.zeros(H.shape[0], dtype=bool)
+    in_region[np.flatnonzero(syndrome)] = True
+    for _ in range(radius):
+        in_region = H @ (HT @ in_region) > 0
+
+    qubits = np.flatnonzero(
+        (HT @ in_region > 0) & ~(HT @ ~in_region > 0)
+    )
+    checks = np.flatnonzero(in_region)
+    sub_matrix = H[checks][:, qubits]
+
+    n_checks = len(checks)
+    _, labels = connected_components(
+        bmat([[None, sub_matrix], [sub_matrix.T, None]]), directed=False
+    )
+    check_labels, qubit_labels = labels[:n_checks], labels[n_checks:]
+
+    clusters = []
+    for label in np.unique(check_labels[syndrome[checks] == 1]):
+        clusters.append((
+            checks[check_labels == label], qubits[qubit_labels == label]
+        ))
+
+    return clusters
 
 
 class BeliefPropagationOSDDecoder(BaseDecoder):
+    """BP-OSD decoder, based on the `ldpc` package.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code used by the decoder
+    error_model: BaseErrorModel
+        Error model used by the decoder
+    error_rate: float
+        Error rate used by the decoder
+    max_bp_iter: int
+        Maximum number of iterations of belief propagation
+    channel_update: bool
+        Whether to update the probabilities of X errors from the Z
+        correction (CSS codes only)
+    osd_order: int
+        Order of the combination-sweep OSD
+    bp_method: str
+        Belief propagation method of `ldpc` ('msl', 'ps', ...)
+    cluster_radius: int, optional
+        If given, the defects are grown by this number of hops on the
+        Tanner graph and split into independent clusters, which are
+        decoded on their own sub-matrix (see `get_syndrome_clusters`).
+        OSD then runs on a few small matrices instead of the full one.
+        If a cluster cannot be corrected on its own, the full syndrome is
+        decoded instead.
+    n_threads: int
+        Number of threads used to decode the clusters.
+
+    Notes
+    -----
+    With timing enabled, the calls to `ldpc` are recorded in the stage
+    'bp' if belief propagation converged, and 'bp_osd' if OSD had to run
+    after it. The creation of the `ldpc` decoders is recorded in 'init'
+    and the splitting into clusters in 'clustering'.
+    """
     label = 'BP-OSD decoder'
     allowed_codes = None  # all codes allowed
+    thread_safe = False  # ldpc decoders store their messages
 
     def __init__(self,
                  code: StabilizerCode,
@@ -16,12 +118,16 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
                  max_bp_iter: int = 1000,
                  channel_update: bool = False,
                  osd_order: int = 10,
-                 bp_method: str = 'msl'):
+                 bp_method: str = 'msl',
+                 cluster_radius: Optional[int] = None,
+                 n_threads: int = 1):
         super().__init__(code, error_model, error_rate)
         self._max_bp_iter = max_bp_iter
         self._channel_update = channel_update
         self._osd_order = osd_order
         self._bp_method = bp_method
+        self._cluster_radius = cluster_radius
+        self._n_threads = n_threads
 
         # Do not initialize the decoder until we call the decode method.
         # This is required because during analysis, there is no need to
@@ -30,12 +136,17 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
 
     @property
     def params(self) -> dict:
-        return {
+        params = {
             'max_bp_iter': self._max_bp_iter,
             'channel_update': self._channel_update,
             'osd_order': self._osd_order,
             'bp_method': self._bp_method
         }
+        if self._cluster_radius is not None:
+            params['cluster_radius'] = self._cluster_radius
+            params['n_threads'] = self._n_threads
+
+        return params
 
     def get_probabilities(self):
         pi, px, py, pz = self.error_model.probability_distribution(
@@ -113,11 +224,116 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
             )
         self._initialized = True
 
-    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+    def set_error_rate(self, error_rate: float):
+        # The channel probabilities are computed at each decoding.
+        self.error_rate = error_rate
+
+    def _decode_matrix(self, decoder, H, syndrome: np.ndarray,
+                       probabilities: np.ndarray) -> np.ndarray:
+        """Decode the syndrome of the check matrix H, cluster by cluster
+        if `cluster_radius` is set, and with the full decoder otherwise.
+        The channel probabilities of the full decoder must already be
+        up to date."""
+
+        if self._cluster_radius is not None:
+            with self.stage('clustering'):
+                clusters = get_syndrome_clusters(
+                    H, syndrome, self._cluster_radius
+                )
+            cluster_size = sum(len(qubits) for _, qubits in clusters)
+
+            # Clusters covering most of the code are not worth splitting.
+            if 2*cluster_size < H.shape[1]:
+                correction = self._decode_clusters(
+                    H, syndrome, probabilities, clusters
+                )
+                if correction is not None:
+                    return correction
+
+        self._run_bposd(decoder, syndrome)
+        return decoder.osdw_decoding
+
+    def _run_bposd(self, decoder, syndrome: np.ndarray):
+        """Run an `ldpc` decoder, recording its duration in the stage 'bp'
+        or 'bp_osd' depending on whether BP converged."""
+        start = time.perf_counter()
+        decoder.decode(syndrome)
+        if self.timer is not None:
+            self.timer.record(
+                'bp' if decoder.converge else 'bp_osd',
+                time.perf_counter() - start
+            )
+
+    def _decode_clusters(
+        self, H, syndrome: np.ndarray, probabilities: np.ndarray,
+        clusters: List[Tuple[np.ndarray, np.ndarray]]
+    ) -> Optional[np.ndarray]:
+        """Decode each cluster on its own sub-matrix, in a thread pool if
+        `n_threads` is more than 1, and combine their corrections.
+        Returns None if one of the clusters cannot be corrected."""
+
+        def decode_cluster(cluster):
+            return self._decode_cluster(H, syndrome, probabilities, *cluster)
+
+        if self._n_threads > 1 and len(clusters) > 1:
+            executor = self.get_executor(self._n_threads)
+            corrections = list(executor.map(decode_cluster, clusters))
+        else:
+            corrections = [decode_cluster(cluster) for cluster in clusters]
+
+        correction = np.zeros(H.shape[1], dtype='uint8')
+        for (_, qubits), cluster_correction in zip(clusters, corrections):
+            if cluster_correction is None:
+                return None
+            correction[qubits] = cluster_correction
+
+        return correction
+
+    def _decode_cluster(
+        self, H, syndrome: np.ndarray, probabilities: np.ndarray,
+        checks: np.ndarray, qubits: np.ndarray
+    ) -> Optional[np.ndarray]:
+        """Correction of a cluster on its sub-matrix, or None if the
+        defects of the cluster cannot be corrected inside it."""
+
+        if len(qubits) == 0:
+            return None
+
+        sub_matrix = H[checks][:, qubits]
+        sub_syndrome = syndrome[checks]
+
+        # The order of OSD is limited by the number of free columns, which
+        # is at least the number of columns minus the number of rows.
+        n_free = len(qubits) - len(checks)
+        if n_free < self._osd_order:
+            n_free = len(qubits) - gf2.rank(sub_matrix)
+
+        decoder = bposd_decoder(
+            sub_matrix,
+            channel_probs=probabilities[qubits],
+            max_iter=self._max_bp_iter,
+            bp_method=self._bp_method,
+            ms_scaling_factor=0,
+            osd_method="osd_cs",
+            osd_order=min(self._osd_order, n_free)
+        )
+        self._run_bposd(decoder, sub_syndrome)
+        correction = decoder.osdw_decoding
+
+        if np.any(sub_matrix @ correction % 2 != sub_syndrome):
+            return None
+
+        return correction
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
         """Get X and Z corrections given code and measured syndrome."""
 
+        if is_trivial_syndrome(syndrome):
+            return np.zeros(2*self.code.n, dtype='uint8')
+
         if not self._initialized:
-            self.initialize_decoders()
+            with self.stage('init'):
+                self.initialize_decoders()
 
         is_css = self.code.is_css
         n_qubits = self.code.n
@@ -141,8 +357,9 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
             self.z_decoder.update_channel_probs(probabilities_z)
 
             # Decode Z errors
-            self.z_decoder.decode(syndrome_x)
-            z_correction = self.z_decoder.osdw_decoding
+            z_correction = self._decode_matrix(
+                self.z_decoder, self.code.Hx, syndrome_x, probabilities_z
+            )
 
             # Bayes update of the probability
             if self._channel_update:
@@ -150,10 +367,12 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
                     z_correction, px, py, pz, direction="z->x"
                 )
                 self.x_decoder.update_channel_probs(new_x_probs)
+                probabilities_x = new_x_probs
 
             # Decode X errors
-            self.x_decoder.decode(syndrome_z)
-            x_correction = self.x_decoder.osdw_decoding
+            x_correction = self._decode_matrix(
+                self.x_decoder, self.code.Hz, syndrome_z, probabilities_x
+            )
 
             correction = np.concatenate([x_correction, z_correction])
         else:
@@ -162,8 +381,10 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
             self.decoder.update_channel_probs(probabilities)
 
             # Decode all errors
-            self.decoder.decode(syndrome)
-            correction = self.decoder.osdw_decoding
+            correction = self._decode_matrix(
+                self.decoder, self.code.stabilizer_matrix, syndrome,
+                probabilities
+            )
             correction = np.concatenate(
                 [correction[n_qubits:], correction[:n_qubits]]
             )
@@ -1,6 +1,8 @@
 from typing import Sequence
 import numpy as np
-from panqec.codes import StabilizerCode
+from panqec.codes import (
+    StabilizerCode, to_dense_syndrome, is_trivial_syndrome, Syndrome
+)
 from panqec.decoders import BaseDecoder
 from panqec.error_models import BaseErrorModel
 from typing import Dict
@@ -66,6 +68,7 @@ def log_exp_bias(pauli, gamma, eps=1e-12) -> Sequence:
 class MemoryBeliefPropagationDecoder(BaseDecoder):
     label = 'MBP decoder'
     allowed_codes = None  # all codes allowed
+    thread_safe = True  # messages are copied at each decoding
 
     def __init__(self,
                  code: StabilizerCode,
@@ -86,17 +89,20 @@ class MemoryBeliefPropagationDecoder(BaseDecoder):
         self._decoder: Dict = dict()
         # Convert it to a matrix over GF(4), where each element is in [0,4]
         self.H = code.stabilizer_matrix.toarray()
-        self.H_pauli = symplectic_to_pauli(code.stabilizer_matrix).toarray()
+        stab_indptr, stab_qubits, stab_paulis = code.stabilizer_adjacency
+        self.H_pauli = csr_matrix(
+            (stab_paulis, stab_qubits, stab_indptr),
+            shape=(code.n_stabilizers, code.n)
+        ).toarray()
         pi, px, py, pz = self.get_probabilities()
         self.p_channel = np.vstack([pi, px, py, pz])
 
         # Easy access to the neighboring qubits of each stabilizer
-        self.neighboring_qubits = [self.H_pauli[m].nonzero()[0]
-                                   for m in range(self.H_pauli.shape[0])]
+        self.neighboring_qubits = np.split(stab_qubits, stab_indptr[1:-1])
 
         # Easy access to the neighboring stabilizers of each qubit
-        self.neighboring_stabs = [self.H_pauli[:, n].nonzero()[0]
-                                  for n in range(self.H_pauli.shape[1])]
+        qubit_indptr, qubit_stabs, _ = code.qubit_adjacency
+        self.neighboring_stabs = np.split(qubit_stabs, qubit_indptr[1:-1])
 
         # ===================== Initialize BP variables ====================
 
@@ -132,9 +138,17 @@ class MemoryBeliefPropagationDecoder(BaseDecoder):
         )
         return pi, px, py, pz
 
-    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+    def set_error_rate(self, error_rate: float):
+        # The decoder does not depend on the error rate.
+        self.error_rate = error_rate
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
         """Get X and Z corrections given code and measured syndrome."""
 
+        if is_trivial_syndrome(syndrome):
+            return np.zeros(2*self.code.n, dtype='uint8')
+        syndrome = to_dense_syndrome(syndrome)
+
         H_pauli = self.H_pauli
 
         n_stabs, n_qubits = H_pauli.shape
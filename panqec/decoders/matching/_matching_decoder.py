@@ -2,7 +2,9 @@ import numpy as np
 from typing import Optional, Tuple
 from pymatching import Matching
 from panqec.decoders import BaseDecoder
-from panqec.codes import StabilizerCode
+from panqec.codes import (
+    StabilizerCode, to_dense_syndrome, is_trivial_syndrome, Syndrome
+)
 from panqec.error_models import BaseErrorModel
 
 
@@ -11,6 +13,7 @@ class MatchingDecoder(BaseDecoder):
 
     label = 'Toric 2D Matching'
     allowed_codes = ["Toric2DCode", "Planar2DCode", "RotatedPlanar2DCode"]
+    thread_safe = False  # PyMatching keeps its search state
 
     def __init__(self,
                  code: StabilizerCode,
@@ -49,10 +52,46 @@ class MatchingDecoder(BaseDecoder):
         else:
             wx, wz = error_model.get_weights(code, error_rate)
 
+        # PyMatching reads the check matrices in the CSC format, which is
+        # kept to re-weight the matching graphs without converting them.
+        self._Hz = self.code.Hz.tocsc()
+        self._Hx = self.code.Hx.tocsc()
+
         if error_type is None or error_type == "X":
-            self.matcher_x = Matching(self.code.Hz, spacelike_weights=wx)
+            self.matcher_x = Matching(self._Hz, spacelike_weights=wx)
         if error_type is None or error_type == "Z":
-            self.matcher_z = Matching(self.code.Hx, spacelike_weights=wz)
+            self.matcher_z = Matching(self._Hx, spacelike_weights=wz)
+
+    def set_weights(self, weights: Tuple[np.ndarray, np.ndarray]):
+        """Replace the matching weights of the existing matching graphs.
+
+        Parameters
+        ----------
+        weights: Tuple[np.ndarray, np.ndarray]
+            Matching weights for X and Z errors
+        """
+        self.weights = weights
+        self._load_weights(*weights)
+
+    def set_error_rate(self, error_rate: float):
+        """Re-weight the matching graphs for a new error rate.
+        If custom weights were given, they are kept unchanged.
+        """
+        self.error_rate = error_rate
+
+        if self.weights is None:
+            self._load_weights(
+                *self.error_model.get_weights(self.code, error_rate)
+            )
+
+    def _load_weights(self, wx: np.ndarray, wz: np.ndarray):
+        # Reloading the cached check matrices into the same matching
+        # objects is done in C++ by PyMatching, which is faster than
+        # updating the weights edge by edge from Python.
+        if self.error_type is None or self.error_type == "X":
+            self.matcher_x.load_from_check_matrix(self._Hz, weights=wx)
+        if self.error_type is None or self.error_type == "Z":
+            self.matcher_z.load_from_check_matrix(self._Hx, weights=wz)
 
     @property
     def params(self) -> dict:
@@ -61,12 +100,16 @@ class MatchingDecoder(BaseDecoder):
             'weights': self.weights
         }
 
-    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
         """Get X corrections given code and measured syndrome."""
 
         # Initialize correction as full bsf.
         correction = np.zeros(2*self.code.n, dtype=np.uint)
 
+        if is_trivial_syndrome(syndrome):
+            return correction
+        syndrome = to_dense_syndrome(syndrome)
+
         # Keep only the vertex Z measurement syndrome, discard the rest.
         if self.error_type is None or self.error_type == "X":
             syndromes_z = self.code.extract_z_syndrome(syndrome)
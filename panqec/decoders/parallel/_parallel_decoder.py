@@ -0,0 +1,170 @@
+from typing import List, Optional, Union
+import numpy as np
+from panqec.decoders import BaseDecoder
+from panqec.codes import StabilizerCode, Syndrome
+from panqec.error_models import BaseErrorModel
+from panqec.timing import DecoderTimer
+
+
+class ParallelDecoder(BaseDecoder):
+    """Decoder that splits batches of syndromes over a pool of threads.
+
+    Each thread decodes its share of the batch with `decode_batch` on its
+    own copy of the main decoder, created from the decoder parameters the
+    first time a batch is decoded. Decoders whose `thread_safe` attribute
+    is True are shared by all the threads instead.
+
+    Threads only run at the same time while the decoders are in native
+    code that releases the GIL, so the speedup depends on the decoder.
+    Single syndromes are decoded by the main decoder directly.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code used by the decoder
+    error_model: BaseErrorModel
+        Error model used by the decoder
+    error_rate: float
+        Error rate used by the decoder
+    decoder: BaseDecoder or str
+        Main decoder, or its name in `panqec.config.DECODERS`, in which
+        case it is created with `decoder_params`.
+    decoder_params: dict, optional
+        Parameters of the main decoder, if it is given by its name.
+    n_threads: int
+        Number of threads, and of copies of the main decoder.
+    """
+
+    allowed_codes = None  # all codes allowed
+    thread_safe = False  # a single pool of decoder copies
+
+    def __init__(self,
+                 code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 decoder: Union[BaseDecoder, str],
+                 decoder_params: Optional[dict] = None,
+                 n_threads: int = 2):
+        super().__init__(code, error_model, error_rate)
+
+        if n_threads < 1:
+            raise ValueError(
+                f'The number of threads must be positive, not {n_threads}'
+            )
+
+        self.decoder: BaseDecoder
+        if isinstance(decoder, str):
+            # Imported here as the config imports all the decoders.
+            from panqec.config import DECODERS
+            self.decoder = DECODERS[decoder](
+                code, error_model, error_rate, **(decoder_params or {})
+            )
+        else:
+            self.decoder = decoder
+
+        self.n_threads = n_threads
+        self._clones: List[BaseDecoder] = [self.decoder]
+
+    @property
+    def label(self) -> str:
+        return self.decoder.label
+
+    @property
+    def params(self) -> dict:
+        return {
+            'decoder': self.decoder.id,
+            'decoder_params': self.decoder.params,
+            'n_threads': self.n_threads
+        }
+
+    def enable_timing(
+        self, timer: Optional[DecoderTimer] = None
+    ) -> DecoderTimer:
+        timer = super().enable_timing(timer)
+        for decoder in self._clones:
+            decoder.enable_timing(timer)
+        return timer
+
+    def disable_timing(self):
+        super().disable_timing()
+        for decoder in self._clones:
+            decoder.disable_timing()
+
+    def set_error_rate(self, error_rate: float):
+        for decoder in self._clones:
+            decoder.set_error_rate(error_rate)
+        self.error_rate = error_rate
+
+    def close(self):
+        super().close()
+        for decoder in self._clones:
+            decoder.close()
+
+    def get_decoders(self) -> List[BaseDecoder]:
+        """Decoder used by each thread, creating the copies of the main
+        decoder if needed."""
+        if self.decoder.thread_safe:
+            return [self.decoder] * self.n_threads
+
+        decoder_class = type(self.decoder)
+        while len(self._clones) < self.n_threads:
+            clone = decoder_class(
+                self.code, self.error_model, self.error_rate,
+                **self.decoder.params
+            )
+            if self.timer is not None:
+                clone.enable_timing(self.timer)
+            self._clones.append(clone)
+
+        return self._clones
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
+        """Decode a single syndrome with the main decoder."""
+        return self.decoder.decode(syndrome, **kwargs)
+
+    def decode_batch(self, syndromes, **kwargs) -> np.ndarray:
+        """Decode many syndromes, split into one contiguous chunk per
+        thread.
+
+        Parameters
+        ----------
+        syndromes: np.ndarray or List[SparseSyndrome]
+            Array of shape (n_syndromes, m), or list of syndromes.
+
+        kwargs: dict
+            Decoder-specific parameters passed to `decode_batch`
+
+        Returns
+        -------
+        corrections : np.ndarray
+            Array of shape (n_syndromes, 2n) with the correction of each
+            syndrome in the binary symplectic format.
+        """
+        n_syndromes = len(syndromes)
+        if self.n_threads == 1 or n_syndromes <= 1:
+            return self.decoder.decode_batch(syndromes, **kwargs)
+
+        chunks = [
+            chunk for chunk in np.array_split(
+                np.arange(n_syndromes), self.n_threads
+            )
+            if len(chunk) > 0
+        ]
+
+        def decode_chunk(decoder, chunk):
+            if isinstance(syndromes, np.ndarray):
+                batch = syndromes[chunk]
+            else:
+                batch = [syndromes[i] for i in chunk]
+            return decoder.decode_batch(batch, **kwargs)
+
+        executor = self.get_executor(self.n_threads)
+        decoders = self.get_decoders()
+
+        corrections = np.zeros((n_syndromes, 2*self.code.n), dtype='uint8')
+        for chunk, chunk_corrections in zip(chunks, executor.map(
+            decode_chunk, decoders[:len(chunks)], chunks
+        )):
+            corrections[chunk] = chunk_corrections
+
+        return corrections
@@ -0,0 +1,208 @@
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from scipy.sparse import csr_matrix
+from panqec.decoders import BaseDecoder
+from panqec.codes import (
+    StabilizerCode, Syndrome, SparseSyndrome, to_sparse_syndrome
+)
+from panqec.error_models import BaseErrorModel
+from panqec.timing import DecoderTimer
+
+# X and Z components of the Paulis X, Y and Z in the binary symplectic
+# format, with the labels of the Tanner graph (1, 2, 3).
+_PAULI_BSF = {1: (1, 0), 2: (1, 1), 3: (0, 1)}
+
+
+class PreDecoder(BaseDecoder):
+    """Local pre-decoder that corrects isolated single-qubit errors before
+    calling another decoder on the rest of the syndrome.
+
+    The defects are split into clusters of stabilizers that share a qubit.
+    A cluster whose defects are exactly the syndrome of a single-qubit
+    Pauli error is corrected by that error, using a table of single-qubit
+    syndromes computed once per code. The remaining defects are passed to
+    the main decoder as a sparse syndrome, and the main decoder is not
+    called at all if no defect remains, which is the most common case at
+    low error rates.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code used by the decoder
+    error_model: BaseErrorModel
+        Error model used by the decoder
+    error_rate: float
+        Error rate used by the decoder
+    decoder: BaseDecoder or str
+        Main decoder, or its name in `panqec.config.DECODERS`, in which
+        case it is created with `decoder_params`.
+    decoder_params: dict, optional
+        Parameters of the main decoder, if it is given by its name.
+
+    Notes
+    -----
+    With timing enabled, the pre-decoding is recorded in the stage
+    'predecode', and the main decoder records its own stages.
+
+    Attributes
+    ----------
+    n_decodes : int
+        Number of syndromes decoded.
+    n_skipped : int
+        Number of syndromes fully corrected by the pre-decoder, for
+        which the main decoder was skipped.
+    """
+
+    allowed_codes = None  # all codes allowed
+    thread_safe = False  # counts of decoded and skipped syndromes
+
+    def __init__(self,
+                 code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 decoder: Union[BaseDecoder, str],
+                 decoder_params: Optional[dict] = None):
+        super().__init__(code, error_model, error_rate)
+
+        self.decoder: BaseDecoder
+        if isinstance(decoder, str):
+            # Imported here as the config imports all the decoders.
+            from panqec.config import DECODERS
+            self.decoder = DECODERS[decoder](
+                code, error_model, error_rate, **(decoder_params or {})
+            )
+        else:
+            self.decoder = decoder
+
+        self.n_decodes = 0
+        self.n_skipped = 0
+
+        self._table = self._get_single_qubit_table()
+        self._neighbors = self._get_stabilizer_neighbors()
+
+    @property
+    def label(self) -> str:
+        return f'Pre-decoder + {self.decoder.label}'
+
+    @property
+    def params(self) -> dict:
+        return {
+            'decoder': self.decoder.id,
+            'decoder_params': self.decoder.params
+        }
+
+    @property
+    def skip_rate(self) -> float:
+        """Fraction of the syndromes for which the main decoder was
+        skipped."""
+        if self.n_decodes == 0:
+            return 0.
+        return self.n_skipped / self.n_decodes
+
+    def reset_counts(self):
+        """Reset the counts of decoded and skipped syndromes."""
+        self.n_decodes = 0
+        self.n_skipped = 0
+
+    def enable_timing(
+        self, timer: Optional[DecoderTimer] = None
+    ) -> DecoderTimer:
+        timer = super().enable_timing(timer)
+        self.decoder.enable_timing(timer)
+        return timer
+
+    def disable_timing(self):
+        super().disable_timing()
+        self.decoder.disable_timing()
+
+    def set_error_rate(self, error_rate: float):
+        self.decoder.set_error_rate(error_rate)
+        self.error_rate = error_rate
+
+    def _get_single_qubit_table(self) -> Dict[Tuple, Tuple[int, int]]:
+        """Table from the syndrome of each single-qubit Pauli error (as
+        the sorted tuple of its defects) to the qubit and Pauli label.
+        If several errors have the same syndrome, the first one is kept.
+        """
+        code = self.code
+        indptr, stabilizers, paulis = code.qubit_adjacency
+
+        table: Dict[Tuple, Tuple[int, int]] = {}
+        for qubit in range(code.n):
+            neighbors = stabilizers[indptr[qubit]:indptr[qubit + 1]]
+            neighbor_paulis = paulis[indptr[qubit]:indptr[qubit + 1]]
+            for pauli in [1, 3, 2]:
+                # Two Paulis anticommute if they differ and are not I.
+                defects = tuple(neighbors[neighbor_paulis != pauli].tolist())
+                if len(defects) > 0:
+                    table.setdefault(defects, (qubit, pauli))
+
+        return table
+
+    def _get_stabilizer_neighbors(self) -> List[List[int]]:
+        """Stabilizers sharing a qubit with each stabilizer."""
+        code = self.code
+        indptr, qubits, _ = code.stabilizer_adjacency
+        incidence = csr_matrix(
+            (np.ones(len(qubits), dtype=int), qubits, indptr),
+            shape=(code.n_stabilizers, code.n)
+        )
+        shared = (incidence @ incidence.T).tocsr()
+        shared.sort_indices()
+
+        return [
+            shared.indices[shared.indptr[i]:shared.indptr[i + 1]].tolist()
+            for i in range(code.n_stabilizers)
+        ]
+
+    def _get_clusters(self, defects: np.ndarray) -> List[List[int]]:
+        """Group the defects into clusters of stabilizers sharing a
+        qubit."""
+        is_defect = set(defects.tolist())
+        visited = set()
+        clusters = []
+        for start in defects.tolist():
+            if start in visited:
+                continue
+            visited.add(start)
+            cluster = [start]
+            for stabilizer in cluster:
+                for neighbor in self._neighbors[stabilizer]:
+                    if neighbor in is_defect and neighbor not in visited:
+                        visited.add(neighbor)
+                        cluster.append(neighbor)
+            clusters.append(sorted(cluster))
+
+        return clusters
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
+        """Correct the isolated single-qubit errors, and decode the rest of
+        the syndrome with the main decoder."""
+
+        n = self.code.n
+        correction = np.zeros(2*n, dtype='uint8')
+        self.n_decodes += 1
+
+        defects = to_sparse_syndrome(syndrome).defects
+        residual: List[int] = []
+        with self.stage('predecode'):
+            for cluster in self._get_clusters(defects):
+                match = self._table.get(tuple(cluster))
+                if match is None:
+                    residual.extend(cluster)
+                else:
+                    qubit, pauli = match
+                    x, z = _PAULI_BSF[pauli]
+                    correction[qubit] ^= x
+                    correction[n + qubit] ^= z
+
+        if len(residual) == 0:
+            self.n_skipped += 1
+            return correction
+
+        residual_syndrome = SparseSyndrome(residual, self.code.n_stabilizers)
+        correction ^= np.asarray(
+            self.decoder.decode(residual_syndrome, **kwargs), dtype='uint8'
+        )
+
+        return correction
@@ -0,0 +1,386 @@
+import itertools
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pymatching import Matching
+from panqec.decoders import BaseDecoder
+from panqec.decoders.union_find._union_find_decoder import DecodingGraph
+from panqec.codes import StabilizerCode, Syndrome, to_sparse_syndrome
+from panqec.error_models import BaseErrorModel
+from panqec import gf2
+
+COLORS = ['red', 'green', 'blue']
+
+
+def get_face_colors(code: StabilizerCode) -> np.ndarray:
+    """Color of each stabilizer of a 2D color code, as an index in
+    `COLORS`, read from its stabilizer type.
+
+    Raises
+    ------
+    ValueError
+        If a stabilizer type does not contain a color.
+    """
+    colors = np.zeros(code.n_stabilizers, dtype=int)
+    for index, location in enumerate(code.stabilizer_coordinates):
+        stabilizer_type = code.stabilizer_type(location)
+        matches = [c for c, color in enumerate(COLORS)
+                   if color in stabilizer_type]
+        if len(matches) != 1:
+            raise ValueError(
+                f'Stabilizer {location} of {code.id} has no color'
+            )
+        colors[index] = matches[0]
+
+    return colors
+
+
+def local_inverse(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Solution map and kernel of a small binary matrix.
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        Binary matrix A of shape (m, s).
+
+    Returns
+    -------
+    inverse : np.ndarray
+        Binary matrix P of shape (s, m) such that x = P b solves A x = b
+        for every b in the image of A.
+    offsets : np.ndarray
+        All the elements of the kernel of A, as an array of shape
+        (2^dim, s), to pick the lightest of the solutions.
+    """
+    n_rows, n_cols = matrix.shape
+    reduced, pivots = gf2.row_reduce(
+        np.hstack([matrix, np.eye(n_rows, dtype='uint8')])
+    )
+    solved = pivots < n_cols
+
+    inverse = np.zeros((n_cols, n_rows), dtype='uint8')
+    inverse[pivots[solved]] = reduced[solved, n_cols:]
+
+    kernel = gf2.kernel(matrix)
+    combinations = np.array(
+        list(itertools.product([0, 1], repeat=kernel.shape[0])), dtype=int
+    ).reshape(2**kernel.shape[0], kernel.shape[0])
+    offsets = (combinations @ kernel % 2).astype('uint8')
+
+    return inverse, offsets
+
+
+class RestrictedLattices:
+    """Restricted lattices of one error sector of a 2D color code, and the
+    lifting of their corrections back to the color code.
+
+    The faces of a color code are colored in red, green and blue, such
+    that every qubit belongs to at most one face of each color. The
+    restricted lattice of two colors only keeps the faces of these two
+    colors, and every qubit is an edge between its two faces, so that the
+    defects of these colors can be paired by a matching decoder.
+    Qubits missing a face of some color lie on a boundary of that color,
+    which is represented by a virtual face.
+
+    Following Kubica and Delfosse (arXiv:1905.07393), only the two
+    lattices containing the lifting color (red) are decoded. Their
+    corrections are lifted to the color code locally around each red
+    face: the qubits of the face are chosen such that the number of them
+    touching each neighboring face has the parity of the number of
+    matched edges between the two faces.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        2D color code.
+    error_type : str
+        Type of errors to decode, 'X' or 'Z'.
+    matcher : str
+        Decoder of the restricted lattices, 'matching' (PyMatching) or
+        'union-find'.
+
+    Raises
+    ------
+    ValueError
+        If a qubit belongs to more than one face of the same color.
+    """
+
+    lift_color = 0
+
+    def __init__(self, code: StabilizerCode, error_type: str, matcher: str):
+        self.code = code
+        self.error_type = error_type
+        self.matcher = matcher
+
+        n = code.n
+        if error_type == 'X':
+            sector_rows = np.flatnonzero(code.z_indices)
+            H = code.stabilizer_matrix[:, n:].tocsr()
+        else:
+            sector_rows = np.flatnonzero(code.x_indices)
+            H = code.stabilizer_matrix[:, :n].tocsr()
+        colors = get_face_colors(code)
+
+        # Stabilizers with the same support (as can happen on small
+        # periodic lattices) are a single face, represented by the first.
+        faces: Dict[Tuple, int] = {}
+        for row in sector_rows:
+            support = tuple(H.indices[H.indptr[row]:H.indptr[row + 1]])
+            faces.setdefault(support, row)
+        self.faces = np.array(sorted(faces.values()), dtype=int)
+        self.face_colors = colors[self.faces]
+
+        # Face of each color around each qubit, or the virtual face of the
+        # boundary of that color if there is none.
+        virtual_faces = code.n_stabilizers + np.arange(len(COLORS))
+        self.qubit_faces = np.repeat(virtual_faces[:, None], n, axis=1)
+        for face, color in zip(self.faces, self.face_colors):
+            qubits = H.indices[H.indptr[face]:H.indptr[face + 1]]
+            if np.any(self.qubit_faces[color, qubits] < code.n_stabilizers):
+                raise ValueError(
+                    f'Qubits of {code.id} belong to more than one '
+                    f'{COLORS[color]} face'
+                )
+            self.qubit_faces[color, qubits] = face
+
+        self.other_colors = [
+            c for c in range(len(COLORS)) if c != self.lift_color
+        ]
+        self._init_restricted_decoders(H)
+        self._init_lift()
+
+    def _init_restricted_decoders(self, H):
+        self.restricted_faces: List[np.ndarray] = []
+        self.restricted_matrices = []
+        self.decoders: List = []
+        for color in self.other_colors:
+            faces = self.faces[np.isin(
+                self.face_colors, [self.lift_color, color]
+            )]
+            self.restricted_faces.append(faces)
+            if self.matcher == 'matching':
+                # Kept in the CSC format read by PyMatching, to re-weight
+                # the matching graphs without converting them.
+                self.restricted_matrices.append(H[faces].tocsc())
+                self.decoders.append(Matching(self.restricted_matrices[-1]))
+            else:
+                self.decoders.append(
+                    DecodingGraph(self.code, self.error_type, faces)
+                )
+
+        # Row of each stabilizer in the restricted matrices, -1 if absent.
+        self._restricted_row = np.full(
+            (len(self.other_colors), self.code.n_stabilizers), -1
+        )
+        for i, faces in enumerate(self.restricted_faces):
+            self._restricted_row[i, faces] = np.arange(len(faces))
+
+    def _init_lift(self):
+        """Local solution maps of the lift around each face of the
+        lifting color, including the virtual face of its boundary."""
+        self.lift_tables: Dict[int, Tuple] = {}
+
+        lift_faces = self.qubit_faces[self.lift_color]
+        for face in np.unique(lift_faces).tolist():
+            star = np.flatnonzero(lift_faces == face)
+            around = self.qubit_faces[self.other_colors][:, star]
+            neighbors = np.unique(around)
+            neighbor_index = {
+                neighbor: i for i, neighbor in enumerate(neighbors.tolist())
+            }
+
+            matrix = np.zeros((len(neighbors), len(star)), dtype='uint8')
+            for row in around:
+                matrix[np.searchsorted(neighbors, row), range(len(star))] = 1
+
+            inverse, offsets = local_inverse(matrix)
+            virtual_rows = np.flatnonzero(neighbors >= self.code.n_stabilizers)
+            self.lift_tables[face] = (
+                star, neighbor_index, matrix, inverse, offsets, virtual_rows
+            )
+
+    def set_weights(self, weights: np.ndarray):
+        """Set the weights of the qubits in the restricted lattices."""
+        for i, decoder in enumerate(self.decoders):
+            if self.matcher == 'matching':
+                decoder.load_from_check_matrix(
+                    self.restricted_matrices[i], weights=weights
+                )
+            else:
+                decoder.set_weights(weights)
+
+    def decode(self, defects: np.ndarray) -> np.ndarray:
+        """Correction of the sector for the given defects.
+
+        Parameters
+        ----------
+        defects : np.ndarray
+            Indices of the violated stabilizers of this sector.
+
+        Returns
+        -------
+        correction : np.ndarray
+            Binary array of size n with the qubits to flip.
+        """
+        correction = np.zeros(self.code.n, dtype='uint8')
+
+        # Parity of the matched edges between each face of the lifting
+        # color and its neighbors.
+        parities: Dict[int, Dict[int, int]] = {}
+        for i, color in enumerate(self.other_colors):
+            rows = self._restricted_row[i, defects]
+            rows = rows[rows >= 0]
+            if len(rows) == 0:
+                continue
+
+            if self.matcher == 'matching':
+                syndrome = np.zeros(
+                    len(self.restricted_faces[i]), dtype='uint8'
+                )
+                syndrome[rows] = 1
+                matched = np.flatnonzero(self.decoders[i].decode(syndrome))
+            else:
+                matched = np.flatnonzero(self.decoders[i].decode(
+                    self.restricted_faces[i][rows]
+                ))
+
+            lift_faces = self.qubit_faces[self.lift_color, matched]
+            neighbors = self.qubit_faces[color, matched]
+            for face, neighbor in zip(lift_faces.tolist(), neighbors.tolist()):
+                face_parities = parities.setdefault(face, {})
+                face_parities[neighbor] = face_parities.get(neighbor, 0) ^ 1
+
+        for face, face_parities in parities.items():
+            star, qubits = self._lift(face, face_parities)
+            correction[star[qubits == 1]] ^= 1
+
+        return correction
+
+    def _lift(
+        self, face: int, face_parities: Dict[int, int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Lightest set of qubits around a face of the lifting color whose
+        boundary has the given parities on the neighboring faces.
+
+        The matchings of the two restricted lattices can leave an odd
+        number of edges at the virtual face of a boundary, for which there
+        is no solution. The parity is then fixed by adding an edge between
+        that boundary and one of the two other boundaries (a corner
+        qubit), which does not change the syndrome of any face.
+        """
+        (
+            star, neighbor_index, matrix, inverse, offsets, virtual_rows
+        ) = self.lift_tables[face]
+
+        target = np.zeros(len(neighbor_index), dtype='uint8')
+        for neighbor, parity in face_parities.items():
+            target[neighbor_index[neighbor]] = parity
+
+        targets = [target]
+        if len(virtual_rows) > 0 and np.any(
+            matrix @ (inverse @ target % 2) % 2 != target
+        ):
+            targets = []
+            for row in virtual_rows:
+                shifted = target.copy()
+                shifted[row] ^= 1
+                if np.all(matrix @ (inverse @ shifted % 2) % 2 == shifted):
+                    targets.append(shifted)
+
+        solutions = np.vstack([
+            (inverse @ target + offsets) % 2 for target in targets
+        ])
+        lightest = solutions[np.argmin(solutions.sum(axis=1))]
+
+        return star, lightest
+
+
+class ColorRestrictionDecoder(BaseDecoder):
+    """Restriction decoder for 2D color codes.
+
+    The syndrome of each type of errors is projected onto the restricted
+    lattices of the color code, which are decoded with a matching or
+    union-find decoder, and the corrections are lifted back to the color
+    code (see `RestrictedLattices`). It runs in the same time as the
+    decoder of the restricted lattices.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code used by the decoder
+    error_model: BaseErrorModel
+        Error model used by the decoder (to find the weights)
+    error_rate: float
+        Error rate used by the decoder (to find the weights)
+    error_type: str, optional
+        Determines which type of errors (X or Z) to decode.
+        Can take the values "X", "Z", or None if we want to
+        decode all errors
+    matcher: str
+        Decoder of the restricted lattices, 'matching' (PyMatching) or
+        'union-find'.
+    """
+
+    label = 'Color Restriction'
+    allowed_codes = ["Color666PlanarCode", "Color666ToricCode", "Color488Code"]
+    thread_safe = False  # PyMatching keeps its search state
+
+    def __init__(self,
+                 code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 error_type: Optional[str] = None,
+                 matcher: str = 'matching'):
+        super().__init__(code, error_model, error_rate)
+
+        if error_type not in ["X", "Z", None]:
+            raise ValueError("Argument 'error_type' has to be 'X', 'Z'"
+                             f"or None, not {error_type}")
+        if matcher not in ['matching', 'union-find']:
+            raise ValueError("Argument 'matcher' has to be 'matching' or "
+                             f"'union-find', not {matcher}")
+
+        self.error_type = error_type
+        self.matcher = matcher
+
+        self.lattices: Dict[str, RestrictedLattices] = {
+            sector: RestrictedLattices(code, sector, matcher)
+            for sector in ['X', 'Z']
+            if error_type is None or error_type == sector
+        }
+
+        self.set_error_rate(error_rate)
+
+    @property
+    def params(self) -> dict:
+        return {
+            'error_type': self.error_type,
+            'matcher': self.matcher
+        }
+
+    def set_error_rate(self, error_rate: float):
+        self.error_rate = error_rate
+
+        weights_x, weights_z = self.error_model.get_weights(
+            self.code, error_rate
+        )
+        for sector, weights in [('X', weights_x), ('Z', weights_z)]:
+            if sector in self.lattices:
+                self.lattices[sector].set_weights(weights)
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
+        """Get X and Z corrections given code and measured syndrome."""
+
+        correction = np.zeros(2*self.code.n, dtype='uint8')
+
+        defects = to_sparse_syndrome(syndrome).defects
+        if len(defects) == 0:
+            return correction
+
+        if 'X' in self.lattices:
+            x_defects = defects[self.code.z_indices[defects]]
+            correction[:self.code.n] = self.lattices['X'].decode(x_defects)
+        if 'Z' in self.lattices:
+            z_defects = defects[self.code.x_indices[defects]]
+            correction[self.code.n:] = self.lattices['Z'].decode(z_defects)
+
+        return correction
@@ -1,7 +1,7 @@
 from typing import Tuple, Dict
 import numpy as np
 from panqec.decoders import BaseDecoder
-from panqec.codes import StabilizerCode
+from panqec.codes import StabilizerCode, to_dense_syndrome, Syndrome
 from panqec.error_models import BaseErrorModel
 
 Operator = Dict[Tuple, str]
@@ -11,6 +11,7 @@ class RotatedSweepDecoder3D(BaseDecoder):
 
     label = 'Rotated Code 3D Sweep Decoder'
     allowed_codes = ["RotatedToric3DCode", "RotatedPlanar3DCode"]
+    thread_safe = False  # shared random generator
 
     _rng: np.random.Generator
     max_rounds: int
@@ -43,16 +44,20 @@ class RotatedSweepDecoder3D(BaseDecoder):
 
     # TODO: make this more space-efficient, don't store zeros.
     def get_initial_state(
-        self, syndrome: np.ndarray
+        self, syndrome: Syndrome
     ) -> np.ndarray:
         """Get initial cellular automaton state from syndrome."""
-        signs = syndrome.copy()
+        signs = to_dense_syndrome(syndrome).copy()
         signs[self.code.z_indices] = 0
 
         return signs
 
+    def set_error_rate(self, error_rate: float):
+        # The decoder does not depend on the error rate.
+        self.error_rate = error_rate
+
     def decode(
-        self, syndrome: np.ndarray, **kwargs
+        self, syndrome: Syndrome, **kwargs
     ) -> np.ndarray:
         """Get Z corrections given measured syndrome."""
 
@@ -1,7 +1,7 @@
 from panqec.decoders import (
     BaseDecoder, RotatedSweepDecoder3D, MatchingDecoder
 )
-from panqec.codes import StabilizerCode
+from panqec.codes import StabilizerCode, to_dense_syndrome, Syndrome
 from panqec.error_models import BaseErrorModel
 import numpy as np
 
@@ -10,6 +10,7 @@ class RotatedSweepMatchDecoder(BaseDecoder):
 
     label = 'Rotated Planar Code 3D Sweep Matching Decoder'
     allowed_codes = ["RotatedToric3DCode", "RotatedPlanar3DCode"]
+    thread_safe = False  # random sweeps and PyMatching state
 
     def __init__(self, code: StabilizerCode,
                  error_model: BaseErrorModel,
@@ -32,11 +33,19 @@ class RotatedSweepMatchDecoder(BaseDecoder):
             'max_rounds': self.max_rounds
         }
 
-    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+    def set_error_rate(self, error_rate: float):
+        self.error_rate = error_rate
+        self.sweeper.set_error_rate(error_rate)
+        self.matcher.set_error_rate(error_rate)
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
         """Get X and Z corrections given code and measured syndrome."""
 
-        z_correction = self.sweeper.decode(syndrome)
-        x_correction = self.matcher.decode(syndrome)
+        syndrome = to_dense_syndrome(syndrome)
+        with self.stage('sweep'):
+            z_correction = self.sweeper.decode(syndrome)
+        with self.stage('match'):
+            x_correction = self.matcher.decode(syndrome)
 
         correction = (x_correction + z_correction) % 2
 
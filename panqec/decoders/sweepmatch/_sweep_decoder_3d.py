@@ -2,7 +2,7 @@ from typing import Tuple, Dict
 import numpy as np
 from panqec.decoders import BaseDecoder
 from panqec.error_models import BaseErrorModel
-from panqec.codes import StabilizerCode
+from panqec.codes import StabilizerCode, to_dense_syndrome, Syndrome
 
 Operator = Dict[Tuple, str]
 
@@ -11,6 +11,7 @@ class SweepDecoder3D(BaseDecoder):
 
     label: str = 'Toric 3D Sweep Decoder'
     allowed_codes = ["Toric3DCode", "Planar3DCode"]
+    thread_safe = False  # shared random generator
 
     _rng: np.random.Generator
     max_sweep_factor: int
@@ -88,14 +89,18 @@ class SweepDecoder3D(BaseDecoder):
         direction = int(self._rng.choice([0, 1, 2], size=1))
         return direction
 
-    def get_initial_state(self, syndrome: np.ndarray) -> np.ndarray:
+    def get_initial_state(self, syndrome: Syndrome) -> np.ndarray:
         """Get initial cellular automaton state from syndrome."""
-        signs = syndrome.copy()
+        signs = to_dense_syndrome(syndrome).copy()
         signs[self.code.z_indices] = 0
 
         return signs
 
-    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+    def set_error_rate(self, error_rate: float):
+        # The decoder does not depend on the error rate.
+        self.error_rate = error_rate
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
         """Get Z corrections given measured syndrome."""
 
         # Maximum number of times to sweep before giving up.
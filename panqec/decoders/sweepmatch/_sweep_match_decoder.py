@@ -1,5 +1,5 @@
 import numpy as np
-from panqec.codes import StabilizerCode
+from panqec.codes import StabilizerCode, to_dense_syndrome, Syndrome
 from panqec.decoders import (
     BaseDecoder, SweepDecoder3D, MatchingDecoder
 )
@@ -10,6 +10,7 @@ class SweepMatchDecoder(BaseDecoder):
 
     label = 'Toric 3D Sweep + Matching Decoder'
     allowed_codes = ["Toric3DCode", "Planar3DCode"]
+    thread_safe = False  # random sweeps and PyMatching state
 
     sweeper: BaseDecoder
     matcher: BaseDecoder
@@ -26,11 +27,19 @@ class SweepMatchDecoder(BaseDecoder):
     def params(self) -> dict:
         return {}
 
-    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+    def set_error_rate(self, error_rate: float):
+        self.error_rate = error_rate
+        self.sweeper.set_error_rate(error_rate)
+        self.matcher.set_error_rate(error_rate)
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
         """Get X and Z corrections given code and measured syndrome."""
 
-        z_correction = self.sweeper.decode(syndrome)
-        x_correction = self.matcher.decode(syndrome)
+        syndrome = to_dense_syndrome(syndrome)
+        with self.stage('sweep'):
+            z_correction = self.sweeper.decode(syndrome)
+        with self.stage('match'):
+            x_correction = self.matcher.decode(syndrome)
 
         correction = (x_correction + z_correction) % 2
 
@@ -0,0 +1,382 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from panqec.decoders import BaseDecoder
+from panqec.codes import StabilizerCode, Syndrome, to_sparse_syndrome
+from panqec.error_models import BaseErrorModel
+
+# Stabilizer Paulis (labelled 1, 2, 3 for X, Y, Z in the Tanner graph)
+# that detect X and Z errors.
+_DETECTING_PAULIS = {'X': [2, 3], 'Z': [1, 2]}
+
+
+class DecodingGraph:
+    """Decoding graph of one error sector of a code, on which the
+    Union-Find decoder grows clusters.
+
+    The nodes are the stabilizers detecting the errors of the sector,
+    labelled by their index in the stabilizer matrix, plus a virtual
+    boundary node. Each qubit is an edge between the (at most two)
+    stabilizers detecting an error on it, or between a stabilizer and
+    the boundary node if it is detected by a single stabilizer.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code whose Tanner graph gives the decoding graph.
+    error_type : str
+        Type of errors to decode, 'X' or 'Z'.
+    stabilizers : np.ndarray, optional
+        Indices of the stabilizers to keep as nodes of the graph, to
+        decode on a restricted lattice. By default, all the stabilizers
+        detecting errors of this type are kept.
+
+    Raises
+    ------
+    ValueError
+        If an error of this type on a qubit is detected by more than two
+        stabilizers, in which case the sector is not a graph.
+    """
+
+    def __init__(
+        self, code: StabilizerCode, error_type: str,
+        stabilizers: Optional[np.ndarray] = None
+    ):
+        indptr, checks, paulis = code.qubit_adjacency
+        detecting = np.isin(paulis, _DETECTING_PAULIS[error_type])
+        if stabilizers is not None:
+            detecting &= np.isin(checks, stabilizers)
+        qubit_of_edge = np.repeat(np.arange(code.n), np.diff(indptr))
+
+        qubits = qubit_of_edge[detecting]
+        checks = checks[detecting]
+        degree = np.bincount(qubits, minlength=code.n)
+        if np.any(degree > 2):
+            raise ValueError(
+                f'{error_type} errors of {code.id} are detected by more than '
+                'two stabilizers on some qubits, so they cannot be decoded '
+                'by union-find'
+            )
+
+        self.error_type = error_type
+        self.n_qubits = code.n
+        self.boundary = code.n_stabilizers
+
+        # One edge per detectable qubit, from its first to its second check
+        # (or to the boundary node).
+        self.qubits = np.flatnonzero(degree > 0)
+        first = np.searchsorted(qubits, self.qubits)
+        self.u = checks[first]
+        self.v = np.where(
+            degree[self.qubits] == 2,
+            checks[np.minimum(first + 1, len(checks) - 1)],
+            self.boundary
+        )
+
+        # Edges incident to each node, except the boundary node, which is
+        # never grown from.
+        n_edges = len(self.qubits)
+        ends = np.concatenate([self.u, self.v])
+        edge_ids = np.tile(np.arange(n_edges), 2)
+        inner = ends != self.boundary
+        order = np.argsort(ends[inner], kind='stable')
+        node_indptr = np.concatenate([[0], np.cumsum(
+            np.bincount(ends[inner], minlength=self.boundary)
+        )])
+        incident = edge_ids[inner][order]
+        self.incident_edges: List[List[int]] = [
+            incident[node_indptr[i]:node_indptr[i + 1]].tolist()
+            for i in range(self.boundary)
+        ]
+
+        self._u = self.u.tolist()
+        self._v = self.v.tolist()
+        self.lengths: List[int] = [1] * n_edges
+
+    def set_weights(self, weights: np.ndarray, resolution: int = 2):
+        """Set the edge lengths used for weighted growth from the weights
+        of the qubits.
+
+        The lightest edges have length `resolution`, so that clusters grow
+        by fractions of an edge, and other edges are longer in proportion
+        to their weight.
+
+        Parameters
+        ----------
+        weights : np.ndarray
+            Weight (log-likelihood ratio) of an error on each qubit.
+        resolution : int
+            Number of growth steps needed to cover the lightest edges.
+        """
+        edge_weights = np.asarray(weights, dtype=float)[self.qubits]
+        positive = edge_weights[edge_weights > 0]
+        if len(positive) == 0:
+            lengths = np.ones(len(edge_weights), dtype=int)
+        else:
+            lengths = np.maximum(
+                1, np.rint(resolution * edge_weights / positive.min())
+            ).astype(int)
+        self.lengths = lengths.tolist()
+
+    def decode(self, defects: np.ndarray) -> np.ndarray:
+        """Correction of the sector for the given defects.
+
+        Parameters
+        ----------
+        defects : np.ndarray
+            Indices of the violated stabilizers of this sector.
+
+        Returns
+        -------
+        correction : np.ndarray
+            Binary array of size n with the qubits to flip.
+        """
+        grown_edges = self._grow_clusters(defects)
+        flipped_edges = self._peel(grown_edges, defects)
+
+        correction = np.zeros(self.n_qubits, dtype='uint8')
+        correction[self.qubits[flipped_edges]] = 1
+
+        return correction
+
+    def _grow_clusters(self, defects: np.ndarray) -> List[int]:
+        """Grow the clusters around the defects until every cluster has an
+        even number of defects or touches the boundary, and return the
+        fully grown edges.
+
+        Only the nodes reached by a cluster are stored, so the cost scales
+        with the size of the clusters rather than the size of the code.
+        """
+        u, v, lengths = self._u, self._v, self.lengths
+        boundary = self.boundary
+
+        parent: Dict[int, int] = {}
+        size: Dict[int, int] = {}
+        parity: Dict[int, int] = {}
+        frontier: Dict[int, List[int]] = {}
+        support: Dict[int, int] = {}
+        grown_edges: List[int] = []
+
+        def add_node(node: int):
+            parent[node] = node
+            size[node] = 1
+            parity[node] = 0
+            frontier[node] = (
+                [] if node == boundary else list(self.incident_edges[node])
+            )
+
+        def find(node: int) -> int:
+            root = node
+            while parent[root] != root:
+                root = parent[root]
+            while parent[node] != root:
+                parent[node], node = root, parent[node]
+            return root
+
+        def union(root_1: int, root_2: int):
+            if size[root_1] < size[root_2]:
+                root_1, root_2 = root_2, root_1
+            parent[root_2] = root_1
+            size[root_1] += size[root_2]
+            parity[root_1] ^= parity[root_2]
+            frontier[root_1].extend(frontier.pop(root_2))
+
+        for node in defects.tolist():
+            add_node(node)
+            parity[node] = 1
+
+        # A cluster is active while it has odd parity and does not contain
+        # the boundary node, which can absorb any parity.
+        active = [
+            node for node in parity
+            if parity[node] == 1 and find(node) == node
+        ]
+        while active:
+            # Number of active clusters growing each frontier edge.
+            rates: Dict[int, int] = {}
+            for root in active:
+                kept = []
+                for edge in frontier[root]:
+                    if edge in support and support[edge] >= lengths[edge]:
+                        continue
+                    if u[edge] in parent and v[edge] in parent and (
+                        find(u[edge]) == find(v[edge])
+                    ):
+                        continue
+                    kept.append(edge)
+                    rates[edge] = rates.get(edge, 0) + 1
+                frontier[root] = kept
+
+            if not rates:
+                break
+
+            # Grow until the next edge is fully covered.
+            step = min(
+                -((support.get(edge, 0) - lengths[edge]) // rate)
+                for edge, rate in rates.items()
+            )
+            completed = []
+            for edge, rate in rates.items():
+                support[edge] = support.get(edge, 0) + step*rate
+                if support[edge] >= lengths[edge]:
+                    completed.append(edge)
+
+            for edge in completed:
+                for node in (u[edge], v[edge]):
+                    if node not in parent:
+                        add_node(node)
+                root_u, root_v = find(u[edge]), find(v[edge])
+                if root_u != root_v:
+                    union(root_u, root_v)
+                grown_edges.append(edge)
+
+            boundary_root = find(boundary) if boundary in parent else None
+            active = list({
+                find(root) for root in active
+            })
+            active = [
+                root for root in active
+                if parity[root] == 1 and root != boundary_root
+            ]
+
+        return grown_edges
+
+    def _peel(self, grown_edges: List[int], defects: np.ndarray) -> List[int]:
+        """Peel the erasure formed by the grown edges to find the edges to
+        flip, starting from the leaves of a spanning forest."""
+        u, v = self._u, self._v
+
+        neighbors: Dict[int, List[Tuple[int, int]]] = {}
+        for edge in grown_edges:
+            neighbors.setdefault(u[edge], []).append((edge, v[edge]))
+            neighbors.setdefault(v[edge], []).append((edge, u[edge]))
+
+        # Spanning forest, rooted at the boundary node when a tree
+        # contains it so that it absorbs the remaining parity.
+        parent_edge: Dict[int, Tuple[int, int]] = {}
+        order: List[int] = []
+        roots = sorted(neighbors, key=lambda node: node != self.boundary)
+        for root in roots:
+            if root in parent_edge:
+                continue
+            parent_edge[root] = (-1, -1)
+            queue = [root]
+            for node in queue:
+                order.append(node)
+                for edge, neighbor in neighbors[node]:
+                    if neighbor not in parent_edge:
+                        parent_edge[neighbor] = (edge, node)
+                        queue.append(neighbor)
+
+        is_defect = dict.fromkeys(defects.tolist(), True)
+        flipped_edges = []
+        for node in reversed(order):
+            edge, parent = parent_edge[node]
+            if edge >= 0 and is_defect.get(node, False):
+                flipped_edges.append(edge)
+                is_defect[parent] = not is_defect.get(parent, False)
+
+        return flipped_edges
+
+
+class UnionFindDecoder(BaseDecoder):
+    """Weighted Union-Find decoder for codes whose X or Z errors form a
+    matching graph, such as 2D surface codes.
+
+    Clusters grow from the defects on the decoding graph of each sector,
+    with edges of length proportional to their matching weight, until
+    every cluster can be corrected. Each cluster is then peeled to find
+    a correction. The running time is almost linear in the size of the
+    clusters.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code used by the decoder
+    error_model: BaseErrorModel
+        Error model used by the decoder (to find the weights)
+    error_rate: float
+        Error rate used by the decoder (to find the weights)
+    error_type: str, optional
+        Determines which type of errors (X or Z) to decode.
+        Can take the values "X", "Z", or None to decode all the types
+        of errors whose stabilizers form a graph. For `Toric3DCode`, only
+        X errors are decoded, and for `RhombicToricCode` only Z errors.
+    resolution: int
+        Number of growth steps needed to cover the lightest edges.
+    """
+
+    label = 'Union-Find'
+    allowed_codes = [
+        "Toric2DCode", "Planar2DCode", "RotatedPlanar2DCode",
+        "Toric3DCode", "RhombicToricCode"
+    ]
+    thread_safe = True  # clusters are local to each decoding
+
+    def __init__(self,
+                 code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 error_type: Optional[str] = None,
+                 resolution: int = 2):
+        super().__init__(code, error_model, error_rate)
+
+        if error_type not in ["X", "Z", None]:
+            raise ValueError("Argument 'error_type' has to be 'X', 'Z'"
+                             f"or None, not {error_type}")
+
+        self.error_type = error_type
+        self.resolution = resolution
+
+        self.graphs: Dict[str, DecodingGraph] = {}
+        for sector in ['X', 'Z']:
+            if error_type is not None and sector != error_type:
+                continue
+            try:
+                self.graphs[sector] = DecodingGraph(code, sector)
+            except ValueError:
+                if error_type is not None:
+                    raise
+
+        if not self.graphs:
+            raise ValueError(
+                f'No type of errors of {code.id} can be decoded by union-find'
+            )
+
+        self.set_error_rate(error_rate)
+
+    @property
+    def params(self) -> dict:
+        return {
+            'error_type': self.error_type,
+            'resolution': self.resolution
+        }
+
+    def set_error_rate(self, error_rate: float):
+        self.error_rate = error_rate
+
+        weights_x, weights_z = self.error_model.get_weights(
+            self.code, error_rate
+        )
+        for sector, weights in [('X', weights_x), ('Z', weights_z)]:
+            if sector in self.graphs:
+                self.graphs[sector].set_weights(weights, self.resolution)
+
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
+        """Get X and Z corrections given code and measured syndrome."""
+
+        correction = np.zeros(2*self.code.n, dtype='uint8')
+
+        defects = to_sparse_syndrome(syndrome).defects
+        if len(defects) == 0:
+            return correction
+
+        # Stabilizers detecting X errors are the Z stabilizers and
+        # conversely, for CSS codes.
+        if 'X' in self.graphs:
+            x_defects = defects[self.code.z_indices[defects]]
+            correction[:self.code.n] = self.graphs['X'].decode(x_defects)
+        if 'Z' in self.graphs:
+            z_defects = defects[self.code.x_indices[defects]]
+            correction[self.code.n:] = self.graphs['Z'].decode(z_defects)
+
+        return correction
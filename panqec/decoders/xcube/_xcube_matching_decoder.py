@@ -1,19 +1,47 @@
 import numpy as np
-from typing import List, Dict
-from panqec.decoders import BaseDecoder, MatchingDecoder
-from panqec.codes import StabilizerCode, Toric2DCode
+from typing import Dict, Optional, Tuple
+from pymatching import Matching
+from scipy.sparse import csc_matrix, csr_matrix, identity, kron
+from scipy.sparse.csgraph import connected_components
+from panqec.decoders import BaseDecoder
+from panqec.codes import (
+    StabilizerCode, Toric2DCode, SparseSyndrome, Syndrome,
+    to_sparse_syndrome, is_trivial_syndrome
+)
 from panqec.decoders import BeliefPropagationOSDDecoder
 from panqec.error_models import PauliErrorModel
+from panqec.timing import DecoderTimer
 
+Adjacency = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def check_adjacency(H) -> Adjacency:
+    """Row (CSR) and column (CSC) adjacency arrays of a check matrix,
+    with sorted indices."""
+    H_rows = csr_matrix(H)
+    H_rows.sort_indices()
+    H_cols = H_rows.tocsc()
+    H_cols.sort_indices()
+
+    return H_rows.indptr, H_rows.indices, H_cols.indptr, H_cols.indices
+
+
+def get_matched_pairs(H, correction, syndrome, adjacency=None):
+    """Pairs of syndromes linked by a chain of the correction.
+
+    The adjacency of H, as given by `check_adjacency`, can be passed to
+    avoid recomputing it at each call.
+    """
+    if adjacency is None:
+        adjacency = check_adjacency(H)
+    row_indptr, row_indices, col_indptr, col_indices = adjacency
 
-def get_matched_pairs(H, correction, syndrome):
     pairs = []
     seen_syndromes = set([])
     syndrome_indices = np.nonzero(syndrome)[0]
 
     for s in syndrome_indices:
         if s not in seen_syndromes:
-            # print("s", s)
             seen_syndromes.add(s)
 
             s_prime = s
@@ -22,13 +50,13 @@ def get_matched_pairs(H, correction, syndrome):
 
             while continue_search:
                 found_new_qubit = False
-                for q in H[s_prime].nonzero()[1]:
-                    # print("q", q)
+                row = slice(row_indptr[s_prime], row_indptr[s_prime+1])
+                for q in row_indices[row]:
                     if correction[q] and q != prev_qubit:
-                        # print("Found new qubit")
                         found_new_qubit = True
                         prev_qubit = q
-                        for i in H[:, q].nonzero()[0]:
+                        col = slice(col_indptr[q], col_indptr[q+1])
+                        for i in col_indices[col]:
                             if i != s_prime:
                                 s_prime = i
                                 break
@@ -43,114 +71,50 @@ def get_matched_pairs(H, correction, syndrome):
     return pairs
 
 
-def find_connected_components(neighbors):
-    connected_components = []
-    seen = set()
-
-    def component(node):
-        nodes_in_component = set([node])
-        nodes = set([node])
-        while nodes:
-            node = nodes.pop()
-            seen.add(node)
-            nodes.update(neighbors[node] - seen)
-            nodes_in_component.add(node)
-
-        return list(nodes_in_component)
-
-    for node in neighbors:
-        if node not in seen:
-            connected_components.append(component(node))
-
-    return connected_components
-
-
-def modular_average(numbers, weights, n):
-    if isinstance(numbers, list):
-        numbers = np.array(numbers)
-    if isinstance(weights, list):
-        weights = np.array(weights)
-
-    weights = weights.reshape(-1, 1)
-
-    circle_points = np.vstack([np.cos(2 * np.pi * numbers / n),
-                               np.sin(2 * np.pi * numbers / n)]).T
-
-    mass_center = np.mean(weights * circle_points, axis=0)
-    if np.all(np.isclose(mass_center, 0)):
-        avg = np.dot(numbers, weights)
-    else:
-        circle_avg = mass_center / np.linalg.norm(mass_center)
-        avg = np.arccos(circle_avg[0]) * n / (2 * np.pi)
-
-        if circle_avg[1] < 0:
-            avg *= -1
-
-    if avg < 0:
-        avg += n
-
-    return avg
-
-
 def decode_plane(loops, size):
+    """Correction that fills the minority side of a set of loops on a 2D
+    torus of size (Lx, Ly), as an array of coordinates."""
     Lx, Ly = size
+    loops = np.asarray(loops, dtype=int).reshape(-1, 2)
+    x, y = loops[:, 0], loops[:, 1]
 
-    # Distinguish the two sides of the loops
-    state = {}
-    for x in range(0, 2*Lx, 2):
-        current_state = 0
-        for y in range(0, 2*Ly, 2):
-            if y == 0:
-                if (x - 1, y) in loops:
-                    current_state = 1 - state[(x - 2, y)]
-                elif x >= 2:
-                    current_state = state[(x - 2, y)]
-            if (x, y - 1) in loops:
-                current_state = 1 - current_state
-
-            # print((x, y), current_state)
-            state[(x, y)] = current_state
-
-    # Correct the minority vote
-    count = np.unique(list(state.values()), return_counts=True)
-
-    if len(count[0]) == 1:
-        minority_state = 1 - count[0]
-    else:
-        minority_state = count[0][np.argmin(count[1])]
+    # Distinguish the two sides of the loops: the state flips each time a
+    # loop is crossed, first along y = 0 and then along each column.
+    x_crossings = np.zeros(Lx, dtype=int)
+    on_first_row = (y == 0) & (x % 2 == 1) & (x < 2*Lx - 1)
+    x_crossings[(x[on_first_row] + 1) // 2] = 1
 
-    # print(minority_state)
+    y_crossings = np.zeros((Lx, Ly), dtype=int)
+    vertical = (x % 2 == 0) & (x < 2*Lx) & (y % 2 == 1) & (y < 2*Ly - 1)
+    y_crossings[x[vertical] // 2, (y[vertical] + 1) // 2] = 1
 
-    correction_coordinates = []
-    for x in range(0, 2*Lx, 2):
-        for y in range(0, 2*Ly, 2):
-            if state[(x, y)] == minority_state:
-                correction_coordinates.append((x, y))
-
-    return correction_coordinates
+    state = (
+        np.cumsum(x_crossings)[:, None] + np.cumsum(y_crossings, axis=1)
+    ) % 2
 
+    # Correct the minority vote
+    values, counts = np.unique(state, return_counts=True)
+    if len(values) == 1:
+        return np.zeros((0, 2), dtype=int)
+    minority_state = values[np.argmin(counts)]
 
-def get_toric_loop(xcube_matching_ortho, component, proj_axis_int):
-    toric_loop_dict = {}
-    for loc in xcube_matching_ortho:
-        if loc[proj_axis_int] in component:
-            loc_2d = tuple_remove(loc, proj_axis_int)
+    x_indices, y_indices = np.nonzero(state == minority_state)
 
-            if loc_2d in toric_loop_dict.keys():
-                toric_loop_dict[loc_2d] += 1
-            else:
-                toric_loop_dict[loc_2d] = 1
+    return np.column_stack([2*x_indices, 2*y_indices])
 
-    toric_loop = [coord for coord in toric_loop_dict.keys()
-                  if toric_loop_dict[coord] % 2 == 1]
 
-    return toric_loop
+def stack_locations(locations_2d, axis_int, planes):
+    """3D locations of a 2D layout repeated on each plane along an axis,
+    as an array of shape (len(planes) * len(locations_2d), 3)."""
+    locations_2d = np.asarray(locations_2d, dtype=int).reshape(-1, 2)
+    n_locations = locations_2d.shape[0]
 
+    other_axes = tuple_remove((0, 1, 2), axis_int)
+    locations = np.zeros((len(planes) * n_locations, 3), dtype=int)
+    locations[:, axis_int] = np.repeat(planes, n_locations)
+    locations[:, other_axes] = np.tile(locations_2d, (len(planes), 1))
 
-def tuple_insert(t, index, element):
-    new_t = list(t)
-    new_t.insert(index, element)
-    return tuple(new_t)
+    return locations
 
 
 def tuple_remove(t, index):
@@ -159,22 +123,18 @@ def tuple_remove(t, index):
     return tuple(new_t)
 
 
-if __name__ == "__main__":
-    avg = modular_average([1, 3, 5, 7], [0.5, 0.0, 0.5, 0.0], 8)
-
-    print(avg)
-
-
 class XCubeMatchingDecoder(BaseDecoder):
     """Matching decoder for 2D Toric Code, based on PyMatching"""
 
     label = 'XCube Matching'
     allowed_codes = ["XCubeCode"]
+    thread_safe = False  # PyMatching and ldpc decoders
 
     def __init__(self,
                  code: StabilizerCode,
                  error_model: PauliErrorModel,
-                 error_rate: float):
+                 error_rate: float,
+                 n_threads: int = 1):
         """Constructor for the MatchingDecoder class
 
         Parameters
@@ -185,13 +145,20 @@ class XCubeMatchingDecoder(BaseDecoder):
             Error model used by the decoder (to find the weights)
         error_rate: int, optional
             Error rate used by the decoder (to find the weights)
-        error_type: str, optional
-            Determines which type of errors (X or Z) to decode.
-            Can take the values "X", "Z", or None if we want to
-            decode all errors
+        n_threads: int
+            Number of threads used to match the planes of the three
+            directions and run BP-OSD at the same time. Each of these
+            problems has its own decoder, so they can run concurrently.
+
+        With timing enabled, the matching of the planes is recorded in the
+        stage 'plane_matching', the projection of the matchings and the
+        filling of the loops in 'projection', and the stages of BP-OSD are
+        recorded by its own decoder.
         """
         super().__init__(code, error_model, error_rate)
 
+        self._n_threads = n_threads
+
         Lx, Ly, Lz = code.size
 
         self.toric_code = {'x': Toric2DCode(Ly, Lz),
@@ -199,6 +166,86 @@ class XCubeMatchingDecoder(BaseDecoder):
                            'z': Toric2DCode(Lx, Ly)
                            }
 
+        self._init_planes()
+
+        # The planes of each direction are decoded together, with a single
+        # matching graph made of one copy of the 2D toric code per plane.
+        weights = self._get_toric_weights()
+        self.plane_matcher = {
+            axis: Matching(
+                self._plane_check_matrix[axis],
+                weights=np.tile(weights[axis], self._n_planes[axis])
+            )
+            for axis in ['x', 'y', 'z']
+        }
+
+        self.z_decoder = BeliefPropagationOSDDecoder(self.code,
+                                                     self.error_model,
+                                                     self.error_rate)
+
+    def _init_planes(self):
+        """Precompute the index arrays that map the cube syndromes and the
+        toric corrections between the XCube code and the stacks of 2D toric
+        codes in each direction."""
+
+        qubit_coordinates = np.array(self.code.qubit_coordinates)
+        self._qubit_grid = np.full(
+            tuple(2*L for L in self.code.size), -1, dtype=int
+        )
+        self._qubit_grid[tuple(qubit_coordinates.T)] = np.arange(self.code.n)
+
+        cube_indices = np.flatnonzero(~self.code.x_indices)
+
+        self._n_planes: Dict[str, int] = {}
+        self._cube_row: Dict[str, np.ndarray] = {}
+        self._plane_check_matrix: Dict[str, csc_matrix] = {}
+        self._plane_adjacency: Dict[str, Adjacency] = {}
+        self._plane_qubit_location: Dict[str, np.ndarray] = {}
+        self._plane_face_location: Dict[str, np.ndarray] = {}
+
+        for axis_int, axis in enumerate(['x', 'y', 'z']):
+            toric_code = self.toric_code[axis]
+            n_planes = self.code.size[axis_int]
+            planes = 2*np.arange(n_planes) + 1
+
+            face_indices = np.flatnonzero(toric_code.x_indices)
+            n_faces = len(face_indices)
+            face_coordinates = [
+                toric_code.stabilizer_coordinates[i] for i in face_indices
+            ]
+            face_row = {loc: row for row, loc in enumerate(face_coordinates)}
+
+            # Row of each cube stabilizer in the stacked face syndromes.
+            cube_row = np.full(self.code.n_stabilizers, -1)
+            for i_stab in cube_indices:
+                loc = self.code.stabilizer_coordinates[i_stab]
+                row = face_row.get(tuple_remove(loc, axis_int))
+                if row is not None:
+                    plane_index = (loc[axis_int] - 1) // 2
+                    cube_row[i_stab] = plane_index * n_faces + row
+
+            # In the CSC format read by PyMatching, to re-weight the
+            # matching graphs without converting them.
+            check_matrix = kron(
+                identity(n_planes, dtype='uint8'), toric_code.Hx,
+                format='csc'
+            )
+
+            self._n_planes[axis] = n_planes
+            self._cube_row[axis] = cube_row
+            self._plane_check_matrix[axis] = check_matrix
+            self._plane_adjacency[axis] = check_adjacency(check_matrix)
+            self._plane_qubit_location[axis] = stack_locations(
+                toric_code.qubit_coordinates, axis_int, planes
+            )
+            self._plane_face_location[axis] = stack_locations(
+                face_coordinates, axis_int, planes
+            )
+
+    def _get_toric_weights(self) -> Dict[str, np.ndarray]:
+        """Matching weights of the 2D toric codes in each plane direction,
+        at the current error rate."""
+
         # Weight the 2D toric code matching decoders
         # Only works for Z biased noise and z-axis deformation
         weights_X, _ = self.error_model.get_weights(self.code,
@@ -220,184 +267,160 @@ class XCubeMatchingDecoder(BaseDecoder):
                            for _ in self.toric_code['z'].qubit_coordinates]
                           )}
 
-        self.matching_decoder = {axis: MatchingDecoder(self.toric_code[axis],
-                                                       self.error_model,
-                                                       self.error_rate,
-                                                       weights=(weights[axis],
-                                                                weights[axis]))
-                                 for axis in ['x', 'y', 'z']}
-
-        self.z_decoder = BeliefPropagationOSDDecoder(self.code,
-                                                     self.error_model,
-                                                     self.error_rate)
+        return weights
+
+    def enable_timing(
+        self, timer: Optional[DecoderTimer] = None
+    ) -> DecoderTimer:
+        timer = super().enable_timing(timer)
+        self.z_decoder.enable_timing(timer)
+        return timer
+
+    def disable_timing(self):
+        super().disable_timing()
+        self.z_decoder.disable_timing()
+
+    def close(self):
+        super().close()
+        self.z_decoder.close()
+
+    def set_error_rate(self, error_rate: float):
+        """Re-weight the matching graphs of the 2D toric codes and the
+        BP-OSD channel for a new error rate, keeping the toric codes
+        and the decoders."""
+        self.error_rate = error_rate
+
+        weights = self._get_toric_weights()
+        for axis in ['x', 'y', 'z']:
+            self.plane_matcher[axis].load_from_check_matrix(
+                self._plane_check_matrix[axis],
+                weights=np.tile(weights[axis], self._n_planes[axis])
+            )
+        self.z_decoder.set_error_rate(error_rate)
 
     @property
     def params(self) -> dict:
+        if self._n_threads > 1:
+            return {'n_threads': self._n_threads}
         return {}
 
-    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
-        """Get X corrections given code and measured syndrome."""
+    def _match_planes(
+        self, axis: str, z_defects: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Match the Z defects projected on the 2D toric codes of the
+        planes orthogonal to an axis.
+
+        Returns the 3D locations of the toric corrections, and the pairs
+        of faces matched together.
+        """
+        rows = self._cube_row[axis][z_defects]
+        plane_syndrome = np.zeros(
+            self._plane_check_matrix[axis].shape[0], dtype='uint8'
+        )
+        plane_syndrome[rows[rows >= 0]] = 1
+
+        if not np.any(plane_syndrome):
+            return np.zeros((0, 3), dtype=int), np.zeros((0, 2), dtype=int)
+
+        plane_correction = self.plane_matcher[axis].decode(plane_syndrome)
+        locations = self._plane_qubit_location[axis][
+            np.flatnonzero(plane_correction)
+        ]
+        pairs = np.array(get_matched_pairs(
+            self._plane_check_matrix[axis], plane_correction,
+            plane_syndrome, adjacency=self._plane_adjacency[axis]
+        ), dtype=int).reshape(-1, 2)
+
+        return locations, pairs
+
+    def _project_matchings(
+        self, xcube_matching: Dict[str, np.ndarray],
+        matched_faces: Dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """X correction obtained by projecting the plane matchings along
+        each axis, keeping the projection of minimum weight."""
 
-        # Initialize correction as full bsf.
         possible_correction = {'x': np.zeros(2*self.code.n, dtype=np.uint),
                                'y': np.zeros(2*self.code.n, dtype=np.uint),
                                'z': np.zeros(2*self.code.n, dtype=np.uint)}
 
-        Lx, Ly, Lz = self.code.size
-
-        # print("Initialize plane syndrome")
-        plane_syndrome = {
-            'x': {x: np.zeros(self.toric_code['x'].n_stabilizers)
-                  for x in range(1, 2*Lx, 2)},
-            'y': {y: np.zeros(self.toric_code['y'].n_stabilizers)
-                  for y in range(1, 2*Ly, 2)},
-            'z': {z: np.zeros(self.toric_code['z'].n_stabilizers)
-                  for z in range(1, 2*Lz, 2)}
-        }
-
-        # Remove X stabilizer syndrome and keep it for later
-        x_syndrome = self.code.extract_x_syndrome(syndrome)
-        syndrome[self.code.x_indices] = 0
-        axis_to_int = {'x': 0, 'y': 1, 'z': 2}
-
-        for proj_axis in ['x', 'y', 'z']:
-            proj_axis_int = axis_to_int[proj_axis]
-
+        for proj_axis_int, proj_axis in enumerate(['x', 'y', 'z']):
             ortho_axes = tuple_remove(('x', 'y', 'z'), proj_axis_int)
-
-            L_proj = [Lx, Ly, Lz][proj_axis_int]
-
-            for i_stab in range(len(self.code.stabilizer_index)):
-                if syndrome[i_stab]:
-                    loc = self.code.stabilizer_coordinates[i_stab]
-
-                    for axis in ['x', 'y', 'z']:
-                        loc_2d = tuple_remove(loc, axis_to_int[axis])
-                        idx_face = self.toric_code[axis].stabilizer_index[
-                            loc_2d
-                        ]
-                        plane = loc[axis_to_int[axis]]
-                        plane_syndrome[axis][plane][idx_face] = 1
-
-            # Decode all the 2D toric codes
-            xcube_matching: Dict[str, List] = {'x': [], 'y': [], 'z': []}
-            connected_planes: Dict[int, set] = {
-                plane: set() for plane in plane_syndrome[proj_axis].keys()
-            }
-
-            for axis in ['x', 'y', 'z']:
-                for plane in plane_syndrome[axis].keys():
-                    current_syndrome = plane_syndrome[axis][plane]
-
-                    toric_X_syndrome = self.toric_code[
-                        axis
-                    ].extract_x_syndrome(
-                        current_syndrome
-                    )
-
-                    if np.all(toric_X_syndrome == 0):
-                        continue
-
-                    toric_matching = self.matching_decoder[axis].decode(
-                        current_syndrome
-                    )
-                    n = self.toric_code[axis].n
-                    toric_Z_correction = toric_matching[n:]
-
-                    toric_pairs = get_matched_pairs(
-                        self.toric_code[axis].Hx.todense(),
-                        toric_Z_correction,
-                        toric_X_syndrome
-                    )
-
-                    for i in toric_Z_correction.nonzero()[0]:
-                        x, y = self.toric_code[axis].qubit_coordinates[i]
-                        loc_3d = tuple_insert((x, y), axis_to_int[axis], plane)
-                        xcube_matching[axis].append(loc_3d)
-
-                    if axis != proj_axis:
-                        for pair in toric_pairs:
-                            i1, i2 = pair
-                            loc1 = self.toric_code[axis].qubit_coordinates[i1]
-                            loc2 = self.toric_code[axis].qubit_coordinates[i2]
-
-                            # print("Axis", axis)
-                            # print("Pair", loc1, loc2)
-
-                            proj_component = {'x': {'y': 0, 'z': 0},
-                                              'y': {'x': 0, 'z': 1},
-                                              'z': {'x': 1, 'y': 1}
-                                              }[proj_axis][axis]
-                            plane1 = loc1[proj_component]
-                            plane2 = loc2[proj_component]
-
-                            if plane1 != plane2:
-                                if proj_component == 1:
-                                    connected_planes[plane1+1].add(plane2+1)
-                                    connected_planes[plane2+1].add(plane1+1)
-                                else:
-                                    connected_planes[plane1].add(plane2)
-                                    connected_planes[plane2].add(plane1)
-
-            xcube_matching_proj = xcube_matching[proj_axis]
-            xcube_matching_ortho = set((xcube_matching[ortho_axes[0]]
-                                        + xcube_matching[ortho_axes[1]]))
-
-            connected_components = find_connected_components(connected_planes)
-
-            list_plane_proj = []
-            for component in list(connected_components):
-                plane_proj = component[0]
-                list_plane_proj.append(plane_proj)
-
-                # Perform the projection
-                for loc in xcube_matching_proj:
-                    # print("Z matching", (x, y, z))
-                    plane = loc[proj_axis_int]
-                    ortho_components = tuple_remove(loc, proj_axis_int)
-                    if plane in component:
-                        if (0 < plane - plane_proj <= L_proj or
-                                2*L_proj + plane - plane_proj <= L_proj):
-                            if plane_proj < plane:
-                                plane_stop = plane + 1
-                            else:
-                                plane_stop = 2*L_proj + plane + 1
-
-                            for plane_op in range(plane_proj+1, plane_stop, 2):
-                                loc = tuple_insert(ortho_components,
-                                                   proj_axis_int,
-                                                   plane_op % (2*L_proj))
-
-                                idx = self.code.qubit_index[loc]
-                                possible_correction[proj_axis][idx] += 1
-                        elif plane != plane_proj:
-                            if plane < plane_proj:
-                                plane_stop = plane_proj + 1
-                            else:
-                                plane_stop = 2*L_proj + plane_proj + 1
-
-                            for plane_op in range(plane + 1, plane_stop, 2):
-                                loc = tuple_insert(ortho_components,
-                                                   proj_axis_int,
-                                                   plane_op % (2*L_proj))
-
-                                idx = self.code.qubit_index[loc]
-                                possible_correction[proj_axis][idx] += 1
-
-            # Find the loops
-            for component in connected_components:
-                toric_loop = get_toric_loop(
-                    xcube_matching_ortho, component, proj_axis_int
+            L_proj = self.code.size[proj_axis_int]
+            correction = possible_correction[proj_axis]
+
+            # Planes orthogonal to the projection axis are connected when
+            # a pair of faces matched in another direction spans them.
+            links = np.vstack([
+                self._plane_face_location[axis][matched_faces[axis]][
+                    ..., proj_axis_int
+                ].reshape(-1, 2)
+                for axis in ortho_axes
+            ])
+            links = (links[links[:, 0] != links[:, 1]] - 1) // 2
+            _, component_labels = connected_components(csr_matrix(
+                (np.ones(len(links)), (links[:, 0], links[:, 1])),
+                shape=(L_proj, L_proj)
+            ), directed=False)
+
+            # Each component is projected on its first plane.
+            _, first_planes = np.unique(component_labels, return_index=True)
+            plane_proj = 2*first_planes[component_labels] + 1
+
+            # Perform the projection
+            for loc in xcube_matching[proj_axis]:
+                plane = loc[proj_axis_int]
+                plane_ref = plane_proj[(plane - 1) // 2]
+
+                if (0 < plane - plane_ref <= L_proj or
+                        2*L_proj + plane - plane_ref <= L_proj):
+                    if plane_ref < plane:
+                        plane_stop = plane + 1
+                    else:
+                        plane_stop = 2*L_proj + plane + 1
+                    plane_ops = np.arange(plane_ref + 1, plane_stop, 2)
+                elif plane != plane_ref:
+                    if plane < plane_ref:
+                        plane_stop = plane_ref + 1
+                    else:
+                        plane_stop = 2*L_proj + plane_ref + 1
+                    plane_ops = np.arange(plane + 1, plane_stop, 2)
+                else:
+                    continue
+
+                locations = np.tile(loc, (len(plane_ops), 1))
+                locations[:, proj_axis_int] = plane_ops % (2*L_proj)
+                np.add.at(
+                    correction, self._qubit_grid[tuple(locations.T)], 1
                 )
-                correction_coordinates = decode_plane(toric_loop, (Lx, Ly))
-
-                plane_proj = component[0]
 
-                for loc_2d in correction_coordinates:
-                    loc_3d = tuple_insert(loc_2d, proj_axis_int, plane_proj)
-                    idx = self.code.qubit_index[loc_3d]
-
-                    possible_correction[proj_axis][idx] = 1
+            # Find the loops, as the 2D locations covered an odd number of
+            # times by the matchings of the other directions in the planes
+            # of each component.
+            xcube_matching_ortho = np.unique(np.vstack([
+                xcube_matching[axis] for axis in ortho_axes
+            ]), axis=0)
+            proj_coordinates = xcube_matching_ortho[:, proj_axis_int]
+            xcube_matching_ortho = xcube_matching_ortho[
+                proj_coordinates % 2 == 1
+            ]
+            loop_keys, counts = np.unique(np.column_stack([
+                plane_proj[(xcube_matching_ortho[:, proj_axis_int] - 1) // 2],
+                np.delete(xcube_matching_ortho, proj_axis_int, axis=1)
+            ]), axis=0, return_counts=True)
+            loop_keys = loop_keys[counts % 2 == 1]
+
+            plane_size = tuple_remove(self.code.size, proj_axis_int)
+            for plane_ref in np.unique(loop_keys[:, 0]):
+                toric_loop = loop_keys[loop_keys[:, 0] == plane_ref, 1:]
+                correction_coordinates = decode_plane(toric_loop, plane_size)
+                if len(correction_coordinates) == 0:
+                    continue
+
+                locations = stack_locations(
+                    correction_coordinates, proj_axis_int, [plane_ref]
+                )
+                correction[self._qubit_grid[tuple(locations.T)]] = 1
 
         weight = [np.sum(c) for c in possible_correction.values()]
         index_min_weight = int(np.argmin(weight))
@@ -405,11 +428,60 @@ class XCubeMatchingDecoder(BaseDecoder):
         axis_min_weight = {0: 'x', 1: 'y', 2: 'z'}[index_min_weight]
         correction = possible_correction[axis_min_weight]
 
-        # Decode Z part with BP-OSD
-        syndrome[self.code.z_indices] = 0
-        syndrome[self.code.x_indices] = x_syndrome
+        return correction
 
-        z_correction = self.z_decoder.decode(syndrome).astype('uint8')
+    def decode(self, syndrome: Syndrome, **kwargs) -> np.ndarray:
+        """Get X corrections given code and measured syndrome."""
+
+        if is_trivial_syndrome(syndrome):
+            return np.zeros(2*self.code.n, dtype=np.uint)
+
+        # Split the defects between X stabilizers, kept for BP-OSD, and Z
+        # stabilizers, projected on the planes.
+        defects = to_sparse_syndrome(syndrome).defects
+        is_x_defect = self.code.x_indices[defects]
+        x_defects = defects[is_x_defect]
+        z_defects = defects[~is_x_defect]
+
+        # Decode all the 2D toric codes, with one matching per direction.
+        # For each direction, keep the 3D locations of the toric corrections
+        # and the pairs of faces matched together.
+        # The X defects are decoded by BP-OSD at the same time if several
+        # threads are used.
+        x_syndrome = SparseSyndrome(x_defects, self.code.n_stabilizers)
+        axes = ['x', 'y', 'z']
+        if self._n_threads > 1:
+            executor = self.get_executor(self._n_threads)
+            z_future = executor.submit(
+                self.z_decoder.decode, x_syndrome
+            )
+            with self.stage('plane_matching'):
+                matchings = list(executor.map(
+                    lambda axis: self._match_planes(axis, z_defects), axes
+                ))
+        else:
+            with self.stage('plane_matching'):
+                matchings = [
+                    self._match_planes(axis, z_defects) for axis in axes
+                ]
+
+        xcube_matching: Dict[str, np.ndarray] = {}
+        matched_faces: Dict[str, np.ndarray] = {}
+        for axis, (locations, pairs) in zip(axes, matchings):
+            xcube_matching[axis] = locations
+            matched_faces[axis] = pairs
+
+        with self.stage('projection'):
+            correction = self._project_matchings(
+                xcube_matching, matched_faces
+            )
+
+        # Decode Z part with BP-OSD
+        if self._n_threads > 1:
+            z_correction = z_future.result()
+        else:
+            z_correction = self.z_decoder.decode(x_syndrome)
+        z_correction = z_correction.astype('uint8')
 
         correction += z_correction
 
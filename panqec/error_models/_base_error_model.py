@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import Tuple, List
 from abc import ABCMeta, abstractmethod
 import numpy as np
 from panqec.codes import StabilizerCode
@@ -47,6 +47,52 @@ class BaseErrorModel(metaclass=ABCMeta):
             in the binary symplectic format
         """
 
+    def generate_coupled(
+        self, code: StabilizerCode, error_rates: List[float], rng=None
+    ) -> np.ndarray:
+        """Generate errors for many error rates from common random numbers.
+
+        A single uniform number is drawn per qubit and thresholded against
+        the cumulative distribution of X, Y and Z at every error rate,
+        so that the error supports are nested as the error rate increases.
+        The marginal distribution at each error rate is the same as the one
+        given by `generate`, but the estimates at neighbouring error rates
+        become positively correlated.
+
+        Parameters
+        ----------
+        code : StabilizerCode
+            Errors will be generated on the qubits of the provided code
+        error_rates: List[float]
+            Physical error rates
+        rng: numpy.random.Generator
+            Random number generator (default=None resolves to
+            numpy.random.default_rng())
+
+        Returns
+        -------
+        errors : np.ndarray
+            Array of shape (len(error_rates), 2n) where each row is the
+            error in the binary symplectic format at the corresponding
+            error rate
+        """
+        rng = np.random.default_rng() if rng is None else rng
+
+        uniform = rng.random(code.n)
+
+        errors = np.zeros((len(error_rates), 2*code.n), dtype='uint8')
+        for i_p, error_rate in enumerate(error_rates):
+            _, px, py, pz = self.probability_distribution(code, error_rate)
+
+            # Order the cumulative distribution as X, Y, Z, I so that
+            # the identity always takes the top of the unit interval.
+            errors[i_p, :code.n] = uniform < px + py
+            errors[i_p, code.n:] = np.logical_and(
+                px <= uniform, uniform < px + py + pz
+            )
+
+        return errors
+
     @abstractmethod
     def probability_distribution(
         self, code: StabilizerCode, error_rate: float
@@ -77,7 +123,7 @@ class BaseErrorModel(metaclass=ABCMeta):
         pi, px, py, pz = self.probability_distribution(code, error_rate)
 
         prob_vector = np.zeros(code.n)
-        prob_vector += py * (error[:code.n] == error[code.n:])
+        prob_vector += py * np.logical_and(error[:code.n], error[code.n:])
         prob_vector += px * np.logical_and(error[:code.n],
                                            np.logical_not(error[code.n:]))
         prob_vector += pz * np.logical_and(np.logical_not(error[:code.n]),
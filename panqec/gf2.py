@@ -0,0 +1,379 @@
+"""
+Linear algebra over GF(2) on bit-packed rows.
+
+Each row of a binary matrix is stored as an array of uint64 words, with
+column j in bit j % 64 of word j // 64, so that adding two rows is a single
+vectorized XOR over n / 64 words. Gaussian elimination only loops over the
+columns in Python, and eliminates all the rows with a given pivot bit at
+once.
+
+Functions accept dense numpy arrays as well as scipy sparse matrices, which
+are packed without being converted to dense arrays first.
+"""
+
+from typing import Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from . import bsparse
+
+WORD_SIZE = 64
+
+# Number of ones in each byte.
+_BYTE_WEIGHTS = np.array([bin(i).count('1') for i in range(256)], dtype=int)
+
+
+def n_words(n_cols: int) -> int:
+    """Number of uint64 words needed to store n_cols bits."""
+    return (n_cols + WORD_SIZE - 1) // WORD_SIZE
+
+
+def pack(matrix) -> np.ndarray:
+    """Pack the rows of a binary matrix into uint64 words.
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse.spmatrix
+        Binary matrix of shape (m, n), or binary vector of size n.
+
+    Returns
+    -------
+    packed : np.ndarray
+        Array of shape (m, ceil(n / 64)) and dtype uint64.
+
+    Examples
+    --------
+    >>> pack(np.array([[1, 0, 1], [0, 1, 1]]))
+    array([[5],
+           [6]], dtype=uint64)
+    """
+    if bsparse.is_sparse(matrix):
+        matrix = csr_matrix(matrix)
+        matrix.sum_duplicates()
+        n_rows, n_cols = matrix.shape
+        rows = np.repeat(np.arange(n_rows), np.diff(matrix.indptr))
+        cols = matrix.indices[matrix.data % 2 == 1]
+        rows = rows[matrix.data % 2 == 1]
+
+        packed = np.zeros((n_rows, n_words(n_cols)), dtype=np.uint64)
+        np.bitwise_or.at(
+            packed, (rows, cols // WORD_SIZE),
+            np.left_shift(np.uint64(1), (cols % WORD_SIZE).astype(np.uint64))
+        )
+        return packed
+
+    matrix = np.atleast_2d(np.asarray(matrix) % 2).astype(np.uint8)
+    n_rows, n_cols = matrix.shape
+
+    packed_bytes = np.zeros((n_rows, 8 * n_words(n_cols)), dtype=np.uint8)
+    packed_bytes[:, :(n_cols + 7) // 8] = np.packbits(
+        matrix, axis=1, bitorder='little'
+    )
+
+    return packed_bytes.view('<u8').astype(np.uint64)
+
+
+def unpack(packed: np.ndarray, n_cols: int) -> np.ndarray:
+    """Unpack rows of uint64 words into a dense binary matrix.
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        Array of shape (m, ceil(n / 64)) and dtype uint64.
+    n_cols : int
+        Number of columns n of the unpacked matrix.
+
+    Returns
+    -------
+    matrix : np.ndarray
+        Binary matrix of shape (m, n) and dtype uint8.
+
+    Examples
+    --------
+    >>> unpack(pack(np.array([[1, 0, 1], [0, 1, 1]])), 3)
+    array([[1, 0, 1],
+           [0, 1, 1]], dtype=uint8)
+    """
+    packed = np.atleast_2d(packed).astype('<u8')
+    return np.unpackbits(
+        packed.view(np.uint8), axis=1, count=n_cols, bitorder='little'
+    )
+
+
+def popcount(packed: np.ndarray) -> np.ndarray:
+    """Number of ones in each packed row.
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        Array of shape (m, ceil(n / 64)) and dtype uint64.
+
+    Returns
+    -------
+    weights : np.ndarray
+        Array of size m with the Hamming weight of each row.
+
+    Examples
+    --------
+    >>> popcount(pack(np.array([[1, 0, 1], [0, 1, 1], [0, 0, 0]])))
+    array([2, 2, 0])
+    """
+    packed = np.atleast_2d(packed).astype('<u8')
+    return _BYTE_WEIGHTS[packed.view(np.uint8)].sum(axis=1)
+
+
+def _eliminate(
+    packed: np.ndarray, n_cols: int, full: bool = True
+) -> np.ndarray:
+    """Gaussian elimination in place on packed rows.
+
+    The rows are permuted so that the first r rows are in row echelon form
+    (reduced if `full` is True) and the remaining rows are zero.
+
+    Returns
+    -------
+    pivots : np.ndarray
+        Pivot column of each of the r nonzero rows.
+    """
+    n_rows = packed.shape[0]
+    pivots = []
+    row = 0
+    for col in range(n_cols):
+        if row == n_rows:
+            break
+        word = col // WORD_SIZE
+        bit = np.uint64(1) << np.uint64(col % WORD_SIZE)
+
+        candidates = np.flatnonzero(packed[row:, word] & bit)
+        if len(candidates) == 0:
+            continue
+
+        pivot = row + candidates[0]
+        if pivot != row:
+            packed[[row, pivot]] = packed[[pivot, row]]
+
+        # Columns before the pivot word are zero in the pivot row.
+        targets = row + candidates[1:]
+        if full:
+            targets = np.concatenate([
+                np.flatnonzero(packed[:row, word] & bit), targets
+            ])
+        packed[targets, word:] ^= packed[row, word:]
+
+        pivots.append(col)
+        row += 1
+
+    return np.array(pivots, dtype=int)
+
+
+def row_reduce_packed(packed: np.ndarray, n_cols: int) -> np.ndarray:
+    """Reduced row echelon form of packed rows, computed in place, for
+    matrices too large to be unpacked.
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        Array of shape (m, ceil(n / 64)) and dtype uint64, as given by
+        `pack`. Its first r rows are replaced by the reduced row echelon
+        form, where r is the rank, and the other rows by zeros.
+    n_cols : int
+        Number of columns n of the matrix.
+
+    Returns
+    -------
+    pivots : np.ndarray
+        Pivot column of each of the r nonzero rows.
+
+    Examples
+    --------
+    >>> packed = pack(np.array([[1, 1, 0], [1, 0, 1]]))
+    >>> row_reduce_packed(packed, 3)
+    array([0, 1])
+    >>> unpack(packed, 3)
+    array([[1, 0, 1],
+           [0, 1, 1]], dtype=uint8)
+    """
+    return _eliminate(packed, n_cols, full=True)
+
+
+def rank(matrix) -> int:
+    """Rank of a binary matrix over GF(2).
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse.spmatrix
+        Binary matrix.
+
+    Returns
+    -------
+    rank : int
+        Rank of the matrix.
+
+    Examples
+    --------
+    >>> rank(np.array([[1, 1, 0], [0, 1, 1], [1, 0, 1]]))
+    2
+    """
+    n_cols = matrix.shape[-1]
+    return len(_eliminate(pack(matrix), n_cols, full=False))
+
+
+def pivot_columns(matrix) -> np.ndarray:
+    """Pivot columns of the row echelon form of a binary matrix.
+
+    They are the lexicographically first set of linearly independent
+    columns, and their complement indexes the coordinates on which any
+    vector is uniquely reduced modulo the row space.
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse.spmatrix
+        Binary matrix of shape (m, n).
+
+    Returns
+    -------
+    pivots : np.ndarray
+        Array of size rank with the pivot columns in increasing order.
+
+    Examples
+    --------
+    >>> pivot_columns(np.array([[1, 1, 0], [1, 1, 1]]))
+    array([0, 2])
+    """
+    n_cols = matrix.shape[-1]
+    return _eliminate(pack(matrix), n_cols, full=False)
+
+
+def row_reduce(matrix) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduced row echelon form of a binary matrix over GF(2).
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse.spmatrix
+        Binary matrix of shape (m, n).
+
+    Returns
+    -------
+    reduced : np.ndarray
+        Matrix of shape (r, n) in reduced row echelon form, where r is the
+        rank, spanning the same row space as `matrix`.
+    pivots : np.ndarray
+        Pivot column of each row of `reduced`.
+
+    Examples
+    --------
+    >>> reduced, pivots = row_reduce(np.array([[1, 1, 0], [1, 0, 1]]))
+    >>> reduced
+    array([[1, 0, 1],
+           [0, 1, 1]], dtype=uint8)
+    >>> pivots
+    array([0, 1])
+    """
+    n_cols = matrix.shape[-1]
+    packed = pack(matrix)
+    pivots = _eliminate(packed, n_cols, full=True)
+    return unpack(packed[:len(pivots)], n_cols), pivots
+
+
+def kernel(matrix) -> np.ndarray:
+    """Basis of the kernel (nullspace) of a binary matrix over GF(2).
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse.spmatrix
+        Binary matrix H of shape (m, n).
+
+    Returns
+    -------
+    basis : np.ndarray
+        Matrix of shape (n - rank, n) whose rows x form a basis of the
+        solutions of H x = 0.
+
+    Examples
+    --------
+    >>> kernel(np.array([[1, 1, 0], [0, 1, 1]]))
+    array([[1, 1, 1]], dtype=uint8)
+    """
+    n_cols = matrix.shape[-1]
+    packed = pack(matrix)
+    pivots = _eliminate(packed, n_cols, full=True)
+    free = np.setdiff1d(np.arange(n_cols), pivots)
+
+    # Only the free columns of the reduced matrix are needed, so they are
+    # read from the packed rows without unpacking the whole matrix.
+    free_bits = (
+        packed[:len(pivots), free // WORD_SIZE]
+        >> (free % WORD_SIZE).astype(np.uint64)
+    ) & np.uint64(1)
+
+    basis = np.zeros((len(free), n_cols), dtype=np.uint8)
+    basis[np.arange(len(free)), free] = 1
+    basis[:, pivots] = free_bits.T
+
+    return basis
+
+
+def solve(matrix, syndrome: np.ndarray) -> np.ndarray:
+    """Find a solution x of H x = s over GF(2).
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse.spmatrix
+        Binary matrix H of shape (m, n).
+    syndrome : np.ndarray
+        Binary vector s of size m, or array of shape (n_syndromes, m)
+        to solve for many syndromes with a single elimination.
+
+    Returns
+    -------
+    solution : np.ndarray
+        Binary vector x of size n (or array of shape (n_syndromes, n)),
+        whose free variables are all set to zero.
+
+    Raises
+    ------
+    ValueError
+        If the system has no solution for one of the syndromes.
+
+    Examples
+    --------
+    >>> solve(np.array([[1, 1, 0], [0, 1, 1]]), np.array([1, 0]))
+    array([1, 0, 0], dtype=uint8)
+    """
+    n_rows, n_cols = matrix.shape
+    syndromes = np.atleast_2d(syndrome) % 2
+    if syndromes.shape[1] != n_rows:
+        raise ValueError(
+            f'Syndrome of size {syndromes.shape[1]} incompatible with '
+            f'matrix of shape {matrix.shape}'
+        )
+    n_syndromes = syndromes.shape[0]
+
+    # Eliminate the augmented matrix [H | s_1 ... s_k] column by column,
+    # stopping at the syndrome columns.
+    augmented = np.zeros(
+        (n_rows, n_words(n_cols + n_syndromes)), dtype=np.uint64
+    )
+    packed_matrix = pack(matrix)
+    augmented[:, :packed_matrix.shape[1]] = packed_matrix
+    syndrome_cols = n_cols + np.arange(n_syndromes)
+    rows, cols = np.nonzero(syndromes.T)
+    np.bitwise_or.at(
+        augmented, (rows, syndrome_cols[cols] // WORD_SIZE),
+        np.left_shift(
+            np.uint64(1), (syndrome_cols[cols] % WORD_SIZE).astype(np.uint64)
+        )
+    )
+
+    pivots = _eliminate(augmented, n_cols, full=True)
+    r = len(pivots)
+
+    rhs = unpack(augmented, n_cols + n_syndromes)[:, n_cols:]
+    if np.any(rhs[r:]):
+        raise ValueError('Syndrome is not in the image of the matrix')
+
+    solution = np.zeros((n_syndromes, n_cols), dtype=np.uint8)
+    solution[:, pivots] = rhs[:r].T
+
+    if np.ndim(syndrome) == 1:
+        return solution[0]
+    return solution
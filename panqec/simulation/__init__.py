@@ -3,6 +3,7 @@ from ._direct_simulation import (  # noqa
     DirectSimulation, calculate_logical_error_rate, run_once
 )
 from ._splitting_simulation import SplittingSimulation  # noqa
+from ._stratified_simulation import StratifiedSimulation  # noqa
 from ._batch_simulation import (  # noqa
     BatchSimulation, read_input_json,
     read_input_dict, run_file,
@@ -12,5 +13,6 @@ from ._batch_simulation import (  # noqa
 __all__ = [
     'BaseSimulation',
     'DirectSimulation', 'BatchSimulation', 'SplittingSimulation',
+    'StratifiedSimulation',
     'run_file', 'read_input_json', 'read_input_dict', 'run_once',
 ]
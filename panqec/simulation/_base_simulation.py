@@ -5,9 +5,12 @@ from abc import ABCMeta, abstractmethod
 from json import JSONDecodeError
 import datetime
 import os
+from typing import List, Optional
 import numpy as np
 from panqec.codes import StabilizerCode
+from panqec.decoders import BaseDecoder
 from panqec.error_models import BaseErrorModel
+from panqec.timing import DecoderTimer
 from panqec.utils import load_json, save_json
 
 
@@ -36,9 +39,17 @@ class BaseSimulation(metaclass=ABCMeta):
         self.rng = rng
         self.label = 'results'
 
+        # Histograms of decoding times, if timing is enabled, split between
+        # the runs of this session and the ones loaded from previous results.
+        self.timer: Optional[DecoderTimer] = None
+        self._previous_timer = DecoderTimer()
+
+        # Time spent in each stage of the simulation ('generate',
+        # 'syndrome', 'decode', 'verify' and 'save'), in seconds.
         self._results = {
             'n_runs': 0,
             'wall_time': 0,
+            'stage_times': {},
         }
         self._inputs = {
             'code': {
@@ -58,6 +69,15 @@ class BaseSimulation(metaclass=ABCMeta):
     def wall_time(self):
         return self._results['wall_time']
 
+    @property
+    def stage_times(self) -> dict:
+        return self._results['stage_times']
+
+    def add_stage_time(self, stage: str, duration: float):
+        """Add a duration in seconds to the time spent in a stage."""
+        stage_times = self._results['stage_times']
+        stage_times[stage] = stage_times.get(stage, 0.) + duration
+
     @property
     def n_results(self):
         return self._results['n_runs']
@@ -76,14 +96,38 @@ class BaseSimulation(metaclass=ABCMeta):
         file_name = self.label + extension
         return file_name
 
-    def run(self, n_runs: int):
+    def run(self, n_runs: int, **kwargs):
         self.start_time = datetime.datetime.now()
 
-        self._run(n_runs)
+        self._run(n_runs, **kwargs)
 
         finish_time = datetime.datetime.now() - self.start_time
         self._results['wall_time'] += finish_time.total_seconds()
 
+        if self.timer is not None:
+            self._update_timing_results()
+
+    def _init_timing(self, decoders: List[BaseDecoder]):
+        """Record the time spent in each stage of decoding, starting with
+        the time taken to build the decoders if it was measured.
+
+        The histograms are saved in the results under 'decoder_timing'.
+        """
+        self.timer = DecoderTimer()
+        for decoder in decoders:
+            if decoder.init_time is not None:
+                self.timer.record('init', decoder.init_time)
+        self._update_timing_results()
+
+    def _update_timing_results(self):
+        """Store the histograms of previous and current runs in the
+        results."""
+        timer = DecoderTimer()
+        timer.merge(self._previous_timer)
+        if self.timer is not None:
+            timer.merge(self.timer)
+        self._results['decoder_timing'] = timer.to_dict()
+
     def _find_current_simulation(self, data: list) -> dict:
         for sim in data:
             if sim['inputs'] == self._inputs:
@@ -107,6 +151,11 @@ class BaseSimulation(metaclass=ABCMeta):
             print(err)
 
     def load_results_from_dict(self, data):
+        if self.timer is not None:
+            self._previous_timer = DecoderTimer.from_dict(
+                data['results'].get('decoder_timing')
+            )
+
         for key in self._results.keys():
             if key in data['results'].keys():
                 self._results[key] = data['results'][key]
@@ -120,6 +169,9 @@ class BaseSimulation(metaclass=ABCMeta):
                         for array_value in self._results[key]
                     ]
 
+        if self.timer is not None:
+            self._update_timing_results()
+
     def get_results_to_save(self):
         data = {
             'results': self._results,
@@ -131,7 +183,7 @@ class BaseSimulation(metaclass=ABCMeta):
     def save_results(self, output_file: str):
         """Save results to directory."""
         data = self.get_results_to_save()
-        save_json(output_file, data)
+        save_json([data], output_file)
 
     @abstractmethod
     def get_results(self):
@@ -143,3 +195,8 @@ class BaseSimulation(metaclass=ABCMeta):
 
     def postprocess(self):
         pass
+
+    def close(self):
+        """Release the resources used while running, such as worker
+        processes."""
+        pass
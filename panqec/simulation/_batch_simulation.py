@@ -2,6 +2,7 @@
 
 import os
 import json
+import time
 from json import JSONDecodeError
 import datetime
 import itertools
@@ -17,7 +18,8 @@ from panqec.config import (
 )
 from panqec.utils import identity, load_json, save_json
 from . import (
-    BaseSimulation, DirectSimulation, SplittingSimulation
+    BaseSimulation, DirectSimulation, SplittingSimulation,
+    StratifiedSimulation
 )
 from panqec.analysis import Analysis
 
@@ -61,6 +63,10 @@ def run_file(
                 decoder = simulation.decoders[0].label
                 error_rates = simulation.error_rates
                 print(f'{code}, {noise}, {decoder}, {error_rates}')
+            elif isinstance(simulation, StratifiedSimulation):
+                decoder = simulation.decoder.label
+                error_rates = simulation.error_rates
+                print(f'{code}, {noise}, {decoder}, {error_rates}')
             elif isinstance(simulation, DirectSimulation):
                 decoder = simulation.decoder.label
                 error_rate = simulation.error_rate
@@ -87,11 +93,22 @@ class BatchSimulation():
     save_frequency : int
         Frequency at which to write results to file on disk.
     method: str
-        The method can be either "direct" or "splitting".
+        The method can be either "direct", "splitting" or "stratified".
         The direct method samples independent errors at each iteration,
         while the splitting method (by Bravyi & Vargo) uses MCMC to
         determine the next error to sample.
         Ref: arXiv:1308.6270
+        The stratified method samples errors of each fixed weight and
+        reconstructs the logical error rate at every error rate from
+        the binomial distribution of the weights.
+    coupled : bool
+        If True, direct simulations that share the same code and error model
+        sample their errors from common random numbers: at each trial,
+        one uniform number is drawn per qubit and thresholded at every
+        error rate, which gives nested errors and correlated estimates
+        across the error rates of a sweep.
+    rng :
+        Random number generator used for coupled sampling.
     """
 
     _simulations: List[BaseSimulation]
@@ -109,6 +126,8 @@ class BatchSimulation():
         method: str = "direct",
         log_file: Optional[str] = None,
         verbose: bool = True,
+        coupled: bool = False,
+        rng=None,
     ):
         self._simulations = []
         self.code: Dict = {}
@@ -120,6 +139,8 @@ class BatchSimulation():
         self.verbose = verbose
         self._output_file = output_file
         self._log_file = log_file
+        self.coupled = coupled
+        self.rng = np.random.default_rng() if rng is None else rng
 
     def __getitem__(self, *args):
         return self._simulations.__getitem__(*args)
@@ -188,6 +209,14 @@ class BatchSimulation():
             self._run(n_trials, progress=progress)
         except KeyboardInterrupt:
             print('Simulation paused')
+        finally:
+            self.close()
+
+    def close(self):
+        """Release the resources of the simulations, such as the worker
+        processes of splitting simulations."""
+        for simulation in self._simulations:
+            simulation.close()
 
     def _run(self, n_trials, progress: Callable = identity):
         self.load_results()
@@ -200,9 +229,15 @@ class BatchSimulation():
         ])
 
         for i_trial in progress(list(range(min_current_trial, n_trials))):
-            for simulation in self._simulations:
-                if simulation.n_results < n_trials:
-                    simulation.run(1)
+            if self.coupled:
+                self._run_coupled_trial(n_trials)
+            else:
+                for simulation in self._simulations:
+                    n_runs = self._get_trial_runs(
+                        simulation, i_trial, n_trials
+                    )
+                    if n_runs > 0:
+                        simulation.run(n_runs)
             if i_trial > 0:
                 if i_trial % self.update_frequency == 0:
                     self.on_update(n_trials)
@@ -219,11 +254,72 @@ class BatchSimulation():
         #         print(f"\nPost-processing {simulation.label}")
         #     simulation.postprocess()
 
+    def _get_trial_runs(
+        self, simulation: BaseSimulation, i_trial: int, n_trials: int
+    ) -> int:
+        """Number of runs of a simulation at a given trial.
+
+        Direct simulations that decode batches of runs run a whole batch
+        once the trials have caught up with them, and other simulations
+        run once per trial.
+        """
+        if simulation.n_results >= n_trials:
+            return 0
+        if not isinstance(simulation, DirectSimulation) or (
+            simulation.batch_size == 1
+        ):
+            return 1
+        if simulation.n_results > i_trial:
+            return 0
+        return min(simulation.batch_size, n_trials - simulation.n_results)
+
+    def _run_coupled_trial(self, n_trials: int):
+        """Run one trial of every simulation with common random numbers.
+
+        Direct simulations are grouped by code and error model, and a single
+        pass of the error model generates the errors of all the error rates
+        of a group. Other simulations are run independently.
+        """
+        groups: Dict[str, List[DirectSimulation]] = {}
+        for simulation in self._simulations:
+            if simulation.n_results >= n_trials:
+                continue
+            if isinstance(simulation, DirectSimulation):
+                key = json.dumps(
+                    [simulation._inputs['code'],
+                     simulation._inputs['error_model']],
+                    sort_keys=True, default=str
+                )
+                groups.setdefault(key, []).append(simulation)
+            else:
+                simulation.run(1)
+
+        for group in groups.values():
+            start = time.perf_counter()
+            errors = group[0].error_model.generate_coupled(
+                group[0].code,
+                [simulation.error_rate for simulation in group],
+                rng=self.rng
+            )
+            duration = time.perf_counter() - start
+            for simulation, error in zip(group, errors):
+                simulation.add_stage_time('generate', duration / len(group))
+                simulation.run(1, errors=[error])
+
     def _save_results(self):
+        start = time.perf_counter()
         self._update_file(
             self.get_results_to_save()
         )
 
+        # The file is shared, so is the time taken to write it, which is
+        # saved with the next update.
+        duration = time.perf_counter() - start
+        for simulation in self._simulations:
+            simulation.add_stage_time(
+                'save', duration / len(self._simulations)
+            )
+
     def save_file(self):
         """Do a complete save of the file."""
         combined_data = []
@@ -327,6 +423,10 @@ class BatchSimulation():
 
         if self.method == 'splitting':
             results_df = results_df.explode(['error_rates', 'p_est', 'p_se'])
+        elif self.method == 'stratified':
+            results_df = results_df.explode(
+                ['error_rates', 'p_est', 'p_se', 'p_tail']
+            )
 
         return results_df
 
@@ -475,7 +575,24 @@ def _parse_decoder_dict(
     decoder_params['error_model'] = error_model
     decoder_params['error_rate'] = error_rate
 
+    start = time.perf_counter()
     decoder = decoder_class(**decoder_params)
+    decoder.init_time = time.perf_counter() - start
+
+    return decoder
+
+
+def _reuse_decoder(
+    decoder: Optional[BaseDecoder], error_rate: float
+) -> Optional[BaseDecoder]:
+    """Return the decoder set to a new error rate, or None if there is no
+    decoder or it cannot change its error rate."""
+    if decoder is None:
+        return None
+    try:
+        decoder.set_error_rate(error_rate)
+    except NotImplementedError:
+        return None
     return decoder
 
 
@@ -547,9 +664,18 @@ def get_simulations(data: dict, verbose: bool = True) -> List[BaseSimulation]:
             codes, error_models, decoder_range, error_rates
         )
 
+        # Methods that simulate all the error rates at once.
+        grouped_instances: Iterable[Tuple] = itertools.product(
+            codes, error_models, decoder_range
+        )
+
         if 'method' in data['ranges']:
             method = data['ranges']['method']['name']
-            method_params = data['ranges']['method']['parameters']
+            method_params = dict(data['ranges']['method']['parameters'])
+
+            # Coupled sampling is handled by BatchSimulation, not by
+            # the individual simulations.
+            method_params.pop('coupled', None)
 
     elif 'runs' in data:
         print("Run", data['runs'])
@@ -559,22 +685,30 @@ def get_simulations(data: dict, verbose: bool = True) -> List[BaseSimulation]:
                         for run in data['runs']]
         error_rates = [run['error_rate'] for run in data['runs']]
         instances = zip(codes, error_models, decoder_range, error_rates)
+        grouped_instances = []
 
     else:
         raise ValueError("Invalid data format: does not have 'runs'\
                          or 'ranges' key")
 
     if method == 'direct':
+        # Decoders that support `set_error_rate` are built once for all the
+        # error rates of a code, error model and decoder configuration.
+        shared_decoders: Dict[Tuple, BaseDecoder] = {}
         for code, error_model, decoder_dict, error_rate in instances:
-            decoder = _parse_decoder_dict(decoder_dict, code, error_model,
-                                          error_rate)
+            key = (id(code), id(error_model), id(decoder_dict))
+            decoder = _reuse_decoder(shared_decoders.get(key), error_rate)
+            if decoder is None:
+                decoder = _parse_decoder_dict(decoder_dict, code, error_model,
+                                              error_rate)
+                shared_decoders[key] = decoder
 
             simulations.append(DirectSimulation(code, error_model, decoder,
                                                 error_rate, verbose=verbose,
                                                 **method_params))
 
     if method == 'splitting':
-        for code, error_model, decoder_dict in instances:
+        for code, error_model, decoder_dict in grouped_instances:
             decoders = [_parse_decoder_dict(decoder_dict, code, error_model, p)
                         for p in error_rates]
 
@@ -583,6 +717,19 @@ def get_simulations(data: dict, verbose: bool = True) -> List[BaseSimulation]:
                 verbose=verbose, **method_params
             ))
 
+    if method == 'stratified':
+        for code, error_model, decoder_dict in grouped_instances:
+            # The failure rate of each weight is defined for a fixed
+            # decoder, which is set up at the largest error rate.
+            decoder = _parse_decoder_dict(
+                decoder_dict, code, error_model, max(error_rates)
+            )
+
+            simulations.append(StratifiedSimulation(
+                code, error_model, decoder, error_rates,
+                verbose=verbose, **method_params
+            ))
+
     return simulations
 
 
@@ -626,6 +773,9 @@ def read_input_dict(
 
         if 'method' in data['ranges']:
             method = data['ranges']['method']['name']
+            method_params = data['ranges']['method'].get('parameters', {})
+            if method_params.get('coupled', False):
+                kwargs['coupled'] = True
 
     kwargs['label'] = label
     kwargs['method'] = method
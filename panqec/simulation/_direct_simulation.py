@@ -3,11 +3,12 @@ API for running simulations.
 """
 
 import datetime
+import time
+from typing import Dict, Optional, List
 import numpy as np
 from panqec.codes import StabilizerCode
 from panqec.decoders import BaseDecoder
 from panqec.error_models import BaseErrorModel
-from ..bpauli import get_effective_error
 from . import BaseSimulation
 
 
@@ -16,9 +17,20 @@ def run_once(
     error_model: BaseErrorModel,
     decoder: BaseDecoder,
     error_rate: float,
-    rng=None
+    rng=None,
+    error: Optional[np.ndarray] = None,
+    stage_times: Optional[Dict[str, float]] = None
 ) -> dict:
-    """Run a simulation once and return the results as a dictionary."""
+    """Run a simulation once and return the results as a dictionary.
+
+    If `error` is given, it is used instead of sampling a new error
+    from the error model, which allows errors to be generated upstream
+    (for instance with common random numbers across error rates).
+
+    If `stage_times` is given, the time spent generating the error,
+    measuring the syndrome, decoding and verifying the correction is
+    added to its 'generate', 'syndrome', 'decode' and 'verify' keys.
+    """
 
     if not (0 <= error_rate <= 1):
         raise ValueError('Error rate must be in [0, 1].')
@@ -26,15 +38,32 @@ def run_once(
     if rng is None:
         rng = np.random.default_rng()
 
-    error = error_model.generate(code, error_rate=error_rate, rng=rng)
+    clock = [time.perf_counter()]
+    if error is None:
+        error = error_model.generate(code, error_rate=error_rate, rng=rng)
+    clock.append(time.perf_counter())
+
     syndrome = code.measure_syndrome(error)
-    correction = decoder.decode(syndrome)
+    clock.append(time.perf_counter())
+
+    with decoder.stage('decode'):
+        correction = decoder.decode(syndrome)
+    clock.append(time.perf_counter())
+
     total_error = (correction + error) % 2
-    effective_error = get_effective_error(
-        total_error, code.logicals_x, code.logicals_z
-    )
-    codespace = code.in_codespace(total_error)
-    success = bool(np.all(effective_error == 0)) and codespace
+    classification = code.classify_errors(total_error)
+    effective_error = np.concatenate([
+        classification['x_flips'][0], classification['z_flips'][0]
+    ])
+    codespace = bool(classification['codespace'][0])
+    success = bool(classification['success'][0])
+    clock.append(time.perf_counter())
+
+    if stage_times is not None:
+        for stage, duration in zip(
+            ['generate', 'syndrome', 'decode', 'verify'], np.diff(clock)
+        ):
+            stage_times[stage] = stage_times.get(stage, 0.) + duration
 
     results = {
         'error': error,
@@ -48,6 +77,77 @@ def run_once(
     return results
 
 
+def run_batch(
+    code: StabilizerCode,
+    error_model: BaseErrorModel,
+    decoder: BaseDecoder,
+    error_rate: float,
+    n_runs: int,
+    rng=None,
+    errors: Optional[List[np.ndarray]] = None,
+    stage_times: Optional[Dict[str, float]] = None
+) -> dict:
+    """Run a simulation several times with a single call to
+    `decode_batch`, and return the results as a dictionary of arrays
+    with one row per run.
+
+    The syndromes are measured and the corrections classified for the
+    whole batch at once, and decoders that split batches over threads,
+    such as `ParallelDecoder`, decode them concurrently. `errors` and
+    `stage_times` are used as in `run_once`.
+    """
+
+    if not (0 <= error_rate <= 1):
+        raise ValueError('Error rate must be in [0, 1].')
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    clock = [time.perf_counter()]
+    if errors is None:
+        errors = [
+            error_model.generate(code, error_rate=error_rate, rng=rng)
+            for _ in range(n_runs)
+        ]
+    error_array = np.array(errors, dtype='uint8').reshape(n_runs, 2*code.n)
+    clock.append(time.perf_counter())
+
+    syndromes = code.measure_syndromes(error_array)
+    clock.append(time.perf_counter())
+
+    corrections = decoder.decode_batch(syndromes)
+    clock.append(time.perf_counter())
+
+    # The decoding time of the batch is shared equally between its runs.
+    if decoder.timer is not None:
+        for _ in range(n_runs):
+            decoder.timer.record('decode', (clock[-1] - clock[-2]) / n_runs)
+
+    total_errors = (corrections + error_array) % 2
+    classification = code.classify_errors(total_errors)
+    effective_errors = np.hstack([
+        classification['x_flips'], classification['z_flips']
+    ])
+    clock.append(time.perf_counter())
+
+    if stage_times is not None:
+        for stage, duration in zip(
+            ['generate', 'syndrome', 'decode', 'verify'], np.diff(clock)
+        ):
+            stage_times[stage] = stage_times.get(stage, 0.) + duration
+
+    results = {
+        'error': error_array,
+        'syndrome': syndromes,
+        'correction': corrections,
+        'effective_error': effective_errors,
+        'success': classification['success'],
+        'codespace': classification['codespace'],
+    }
+
+    return results
+
+
 def calculate_logical_error_rate(
     code: StabilizerCode,
     error_model: BaseErrorModel,
@@ -87,6 +187,15 @@ class DirectSimulation(BaseSimulation):
         Set False to suppress output.
     rng :
         Set Random number generator if you want to seed it.
+    timing : bool
+        Set True to record histograms of the decoding time, of the time
+        taken to build the decoder and of the internal stages of the
+        decoder (see `BaseDecoder.enable_timing`), saved in the results.
+    batch_size : int
+        Number of runs decoded together with `decode_batch` (see
+        `run_batch`), which lets decoders such as `ParallelDecoder` decode
+        them concurrently. A batch simulation then runs batch_size
+        trials of the simulation at a time.
     """
 
     start_time: datetime.datetime
@@ -106,14 +215,22 @@ class DirectSimulation(BaseSimulation):
         error_rate: float,
         compress: bool = True,
         verbose=True,
-        rng=None
+        rng=None,
+        timing: bool = False,
+        batch_size: int = 1
     ):
         super().__init__(
             code, error_model, compress=compress, verbose=verbose, rng=rng
         )
 
+        if batch_size < 1:
+            raise ValueError(
+                f'The batch size must be positive, not {batch_size}'
+            )
+
         self.decoder = decoder
         self.error_rate = error_rate
+        self.batch_size = batch_size
 
         self._results = {
             **self._results,
@@ -134,14 +251,42 @@ class DirectSimulation(BaseSimulation):
             }
         }
 
-    def _run(self, n_runs: int):
-        """Run assuming perfect measurement."""
+        if timing:
+            self._init_timing([decoder])
+
+    def _run(self, n_runs: int, errors: Optional[List[np.ndarray]] = None):
+        """Run assuming perfect measurement.
+
+        Pre-generated errors can be given as a list of `n_runs` arrays,
+        in which case no error is sampled by the simulation itself.
+        """
+
+        if errors is not None and len(errors) != n_runs:
+            raise ValueError(
+                f'Expected {n_runs} errors, but {len(errors)} were given.'
+            )
+
+        # The decoder may be shared with simulations at other error rates,
+        # so it records its timing in the histograms of this simulation
+        # only, if any.
+        if self.decoder.error_rate != self.error_rate:
+            self.decoder.set_error_rate(self.error_rate)
+        if self.timer is not None:
+            self.decoder.enable_timing(self.timer)
+        else:
+            self.decoder.disable_timing()
+
+        if self.batch_size > 1:
+            self._run_batches(n_runs, errors)
+            return
 
         for i_run in range(n_runs):
             shot = run_once(
                 self.code, self.error_model, self.decoder,
                 error_rate=self.error_rate,
-                rng=self.rng
+                rng=self.rng,
+                error=None if errors is None else errors[i_run],
+                stage_times=self.stage_times
             )
             for key, value in shot.items():
                 if key in self._results.keys():
@@ -149,6 +294,32 @@ class DirectSimulation(BaseSimulation):
 
             self._results['n_runs'] += 1
 
+    def _run_batches(
+        self, n_runs: int, errors: Optional[List[np.ndarray]] = None
+    ):
+        for start in range(0, n_runs, self.batch_size):
+            stop = min(start + self.batch_size, n_runs)
+            shots = run_batch(
+                self.code, self.error_model, self.decoder,
+                error_rate=self.error_rate,
+                n_runs=stop - start,
+                rng=self.rng,
+                errors=None if errors is None else errors[start:stop],
+                stage_times=self.stage_times
+            )
+            for key, values in shots.items():
+                if key in self._results.keys():
+                    self._results[key].extend(
+                        value.item() if value.ndim == 0 else value
+                        for value in values
+                    )
+
+            self._results['n_runs'] += stop - start
+
+    def close(self):
+        """Shut down the threads of the decoder, if any."""
+        self.decoder.close()
+
     def get_results(self):
         """Return results as dictionary."""
 
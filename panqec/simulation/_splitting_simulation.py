@@ -1,31 +1,211 @@
 """
 API for running simulations.
 """
-import numpy as np
+import json
+import base64
 import datetime
-from typing import List, Tuple
+import time
+import multiprocessing
+from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Tuple, Dict, Optional
+import numpy as np
+from scipy.optimize import brentq
+from scipy.special import log_expit, logsumexp
 from panqec.codes import StabilizerCode
 from panqec.decoders import BaseDecoder
 from panqec.error_models import BaseErrorModel
-from . import calculate_logical_error_rate, BaseSimulation
+from panqec.utils import NumpyEncoder
+from . import calculate_logical_error_rate, run_once, BaseSimulation
+
+
+def _solve_log_c(log_ratios: np.ndarray) -> float:
+    """Solve the Bennett acceptance ratio equation for log(c).
+
+    With x the log-ratios between the probabilities of the samples at two
+    consecutive error rates, the optimal constant satisfies
+    sum 1/(1 + c e^x) = sum 1/(1 + e^-x / c),
+    which is equivalent to sum tanh((log(c) + x)/2) = 0. The left-hand side
+    is increasing in log(c), so the root is bracketed by the range of -x.
+    """
+    log_ratios = log_ratios[np.isfinite(log_ratios)]
+    if len(log_ratios) == 0:
+        return 0.0
+
+    def f(log_c):
+        return np.sum(np.tanh((log_c + log_ratios) / 2))
+
+    lower = -np.max(log_ratios) - 1
+    upper = -np.min(log_ratios) + 1
+
+    return brentq(f, lower, upper)
+
+
+def _jackknife_se(estimates: np.ndarray) -> np.ndarray:
+    """Jackknife standard error from the leave-one-out estimates,
+    given along the first axis."""
+    n_blocks = len(estimates)
+    return np.sqrt(
+        (n_blocks - 1) / n_blocks
+        * np.sum((estimates - np.mean(estimates, axis=0))**2, axis=0)
+    )
+
+
+def _chain_se(estimates: np.ndarray) -> np.ndarray:
+    """Standard error of the mean of independent estimates, given along
+    the first axis."""
+    return np.std(estimates, axis=0, ddof=1) / np.sqrt(len(estimates))
+
+
+# Code, error model and decoder built by each worker process, keyed by their
+# description, so that they are only built once per process.
+_WORKER_CACHE: Dict[str, Tuple] = {}
+
+
+def _get_worker_objects(spec: dict) -> Tuple:
+    """Code, error model and decoder described by a worker spec."""
+    key = json.dumps(spec, sort_keys=True, cls=NumpyEncoder)
+    if key not in _WORKER_CACHE:
+        from ._batch_simulation import (
+            _parse_code_dict, _parse_error_model_dict, _parse_decoder_dict
+        )
+        code = _parse_code_dict(spec['code'])
+        error_model = _parse_error_model_dict(spec['error_model'])
+        decoder = _parse_decoder_dict(
+            deepcopy(spec['decoder']), code, error_model, spec['error_rate']
+        )
+        _WORKER_CACHE[key] = (code, error_model, decoder)
+
+    return _WORKER_CACHE[key]
+
 
+def _chain_worker(connection, chains: List[Tuple[dict, dict]]):
+    """Keep splitting chains in a worker process and advance them on
+    request of the main process.
 
-def g(x):
-    return 1 / (1 + x)
+    The chains are given by the worker spec of their error rate and their
+    state, and are only built once. The worker answers the commands
+    ('step', n_steps) with the log-probabilities of each chain and the
+    total stage times, and ('state', 0) with the state of each chain,
+    until it receives ('close', 0).
+    """
+    resident = []
+    for spec, state in chains:
+        code, error_model, decoder = _get_worker_objects(spec)
+        chain = SplittingChain(
+            code, error_model, decoder, spec['error_rate'], state['error']
+        )
+        chain.set_state(state)
+        resident.append(chain)
+
+    while True:
+        command, n_steps = connection.recv()
+        if command == 'step':
+            log_p_errors = [
+                [chain.step() for _ in range(n_steps)] for chain in resident
+            ]
+            stage_times: Dict[str, float] = {}
+            for chain in resident:
+                for stage, duration in chain.stage_times.items():
+                    stage_times[stage] = stage_times.get(stage, 0.) + duration
+                chain.stage_times.clear()
+            connection.send((log_p_errors, stage_times))
+        elif command == 'state':
+            connection.send([chain.get_state() for chain in resident])
+        else:
+            break
+
+    connection.close()
+
+
+def _serialize_chain_state(state: dict) -> dict:
+    """Chain state in a json-compatible format, with the error bit-packed
+    and base64-encoded."""
+    return {
+        'n': len(state['error']),
+        'error': base64.b64encode(
+            np.packbits(state['error'].astype(bool)).tobytes()
+        ).decode('ascii'),
+        'rng_state': state['rng_state'],
+        'n_accepted': int(state['n_accepted']),
+        'n_rejected': int(state['n_rejected']),
+    }
 
 
-g = np.vectorize(g)
+def _deserialize_chain_state(data: dict) -> dict:
+    """Inverse of `_serialize_chain_state`."""
+    packed = np.frombuffer(base64.b64decode(data['error']), dtype=np.uint8)
+    return {
+        'error': np.unpackbits(packed, count=data['n']),
+        'rng_state': data['rng_state'],
+        'n_accepted': data['n_accepted'],
+        'n_rejected': data['n_rejected'],
+    }
+
+
+def _count_failures(spec: dict, n_runs: int, seed: int) -> int:
+    """Number of decoding failures out of n_runs in a worker process."""
+    code, error_model, decoder = _get_worker_objects(spec)
+    rng = np.random.default_rng(seed)
+
+    n_fails = 0
+    for _ in range(n_runs):
+        results = run_once(
+            code, error_model, decoder, spec['error_rate'], rng=rng
+        )
+        n_fails += 1 - results['success']
+
+    return n_fails
 
 
 class SplittingSimulation(BaseSimulation):
-    """Quantum Error Correction Simulation."""
+    """Quantum Error Correction Simulation with the splitting method.
+
+    Parameters
+    -----------
+    code : StabilizerCode
+        The code to simulate.
+    error_model : BaseErrorModel
+        The error model to use.
+    decoders: List[BaseDecoder]
+        The decoder to use for each error rate.
+    error_rates : List[float]
+        The error rates of the splitting sequence.
+    n_init_runs : int
+        Number of direct runs used to estimate the logical error rate at the
+        largest error rate, from which the other ones are deduced.
+    start_run : int
+        Number of initial steps of each chain discarded as burn-in.
+    n_chains : int
+        Number of independent Markov chains per error rate. Their samples
+        are merged for the ratio estimator. The standard error of the
+        logical error rates is given by the spread of the estimates of the
+        independent chains, or by a blocked jackknife over the steps of a
+        single chain (see `estimate_ratios`), combined with the error of
+        the initial direct estimate. It is not part of the inputs
+        identifying the simulation: results resumed from a file keep the
+        number of chains they were started with.
+    n_jobs : int
+        Number of worker processes used to advance the chains and to
+        run the initial direct simulation. The chains are kept by the
+        workers between runs, until `close` is called.
+    compress : bool
+        Set False to not compress the output files and save as plain json.
+    verbose : bool
+        Set False to suppress output.
+    rng :
+        Set Random number generator if you want to seed it.
+    timing : bool
+        Set True to record histograms of the decoding time and of the
+        internal stages of the decoders, saved in the results. Only the
+        chains advanced in the main process are timed.
+    """
 
     start_time: datetime.datetime
     code: StabilizerCode
     error_model: BaseErrorModel
     decoder: BaseDecoder
     error_rates: np.ndarray
-    current_error: List[np.ndarray]  # error vector for each error rate
     label: str
     _results: dict = {}
     rng = None
@@ -38,9 +218,12 @@ class SplittingSimulation(BaseSimulation):
         error_rates: List[float],
         n_init_runs: int,
         start_run: int = 0,
+        n_chains: int = 1,
+        n_jobs: int = 1,
         compress: bool = True,
         verbose: bool = True,
-        rng=None
+        rng=None,
+        timing: bool = False
     ):
         super().__init__(
             code, error_model, compress=compress, verbose=verbose, rng=rng
@@ -49,16 +232,30 @@ class SplittingSimulation(BaseSimulation):
         self.decoders = decoders
         self.error_rates = np.sort(error_rates)[::-1]
         self.n_init_runs = n_init_runs
+        self.n_chains = n_chains
+        self.n_jobs = n_jobs
+
+        # Worker processes keeping the chains when n_jobs > 1, with the
+        # indices (i_p, i_chain) of the chains of each worker.
+        self._workers: List[Tuple[Any, Any, List[Tuple[int, int]]]] = []
+        self._chains_stale = False
 
-        self.current_error = []
-        self.initial_logical_p = None
+        self.chains = []
+        self.initial_logical_p: Optional[float] = None
+        self.initial_logical_p_se: Optional[float] = None
         self.start_run = start_run
 
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # The log-probabilities of each error rate are stored step by step,
+        # with the n_chains chains consecutive within each step.
         self._results = {
             **self._results,
             'error_rates': self.error_rates,
             'log_p_errors': [[] for _ in self.error_rates],
-            'logical_error_rates': []
+            'logical_error_rates': [],
+            'logical_error_rates_se': [],
+            'n_chains': n_chains
         }
         self._inputs = {
             **self._inputs,
@@ -66,7 +263,7 @@ class SplittingSimulation(BaseSimulation):
                 'name': self.decoders[0].id,
                 'parameters': self.decoders[0].params,
             },
-            'error_rates': self.error_rates,
+            'error_rates': self.error_rates.tolist(),
             'method': {
                 'name': 'splitting',
                 'parameters': {
@@ -76,11 +273,65 @@ class SplittingSimulation(BaseSimulation):
             }
         }
 
+        if timing:
+            self._init_timing(decoders)
+
+    def load_results_from_dict(self, data):
+        """Load previous results, and restore the state of the chains
+        if it was saved, so that they do not need to equilibrate again."""
+        super().load_results_from_dict(data)
+
+        # The stored log-probabilities interleave the chains of the file,
+        # which were a single one before several chains were supported.
+        self.n_chains = int(data['results'].get('n_chains', 1))
+        self._results['n_chains'] = self.n_chains
+
+        # Log-probabilities keep being appended to.
+        self._results['log_p_errors'] = [
+            list(log_p_errors)
+            for log_p_errors in self._results['log_p_errors']
+        ]
+
+        chain_states = data['results'].get('chains', [])
+        if len(chain_states) > 0:
+            self.chains = [
+                [
+                    SplittingChain(
+                        self.code, self.error_model, self.decoders[i_p],
+                        error_rate, state['error']
+                    )
+                    for state in map(_deserialize_chain_state, states)
+                ]
+                for i_p, (error_rate, states) in enumerate(
+                    zip(self.error_rates, chain_states)
+                )
+            ]
+            for chains, states in zip(self.chains, chain_states):
+                for chain, state in zip(chains, states):
+                    chain.set_state(_deserialize_chain_state(state))
+
+    def get_results_to_save(self):
+        data = super().get_results_to_save()
+
+        # Save the chains so that they can be resumed later.
+        data['results'] = {
+            **data['results'],
+            'chains': [
+                [_serialize_chain_state(chain.get_state()) for chain in chains]
+                for chains in self.chains
+            ]
+        }
+
+        return data
+
     def _run(self, n_runs: int):
         """Run assuming perfect measurement."""
         # Find an error that leads to a decoding failure
 
-        if len(self.current_error) == 0:
+        if self.rng is None:
+            self.rng = np.random.default_rng()
+
+        if len(self._chains) == 0:
             # # Only works for deformed 3D rotated toric code
             # # TODO; remove that (or replace it)
             # initial_error = np.concatenate([np.zeros(self.code.n),
@@ -114,22 +365,179 @@ class SplittingSimulation(BaseSimulation):
                     "Splitting method: the chosen initial error"
                     "does not fail when decoded"
                 )
-            self.current_error = [initial_error
-                                  for _ in range(len(self.error_rates))]
+            self.chains = [
+                [
+                    SplittingChain(
+                        self.code, self.error_model, self.decoders[i_p],
+                        error_rate, initial_error,
+                        rng=np.random.default_rng(self.rng.integers(2**63))
+                    )
+                    for _ in range(self.n_chains)
+                ]
+                for i_p, error_rate in enumerate(self.error_rates)
+            ]
+
+        if self.n_jobs > 1:
+            self._run_parallel(n_runs)
+            return
+
+        for decoder in self.decoders:
+            if self.timer is not None:
+                decoder.enable_timing(self.timer)
+            else:
+                decoder.disable_timing()
 
         for i_run in range(n_runs):
-            for i_p, error_rate in enumerate(self.error_rates):
-                self.current_error[i_p], log_p_error = self.get_next_error(
-                    self.decoders[i_p], error_rate, self.current_error[i_p]
-                )
-                self._results['log_p_errors'][i_p].append(log_p_error)
+            for i_p, chains in enumerate(self.chains):
+                for chain in chains:
+                    log_p_error = chain.step()
+                    self._results['log_p_errors'][i_p].append(log_p_error)
             self._results['n_runs'] += 1
 
+        for chains in self.chains:
+            for chain in chains:
+                for stage, duration in chain.stage_times.items():
+                    self.add_stage_time(stage, duration)
+                chain.stage_times.clear()
+
+    @property
+    def chains(self) -> List[List['SplittingChain']]:
+        """Markov chains of each error rate. The chains advanced in worker
+        processes are brought up to date when accessed."""
+        if self._chains_stale:
+            self._sync_chains()
+        return self._chains
+
+    @chains.setter
+    def chains(self, chains: List[List['SplittingChain']]):
+        self._stop_workers()
+        self._chains = chains
+
+    def _run_parallel(self, n_runs: int):
+        """Advance all the chains by n_runs steps in worker processes,
+        which keep the chains between runs."""
+        if len(self._workers) == 0:
+            self._start_workers()
+
+        for _, connection, _ in self._workers:
+            connection.send(('step', n_runs))
+
+        chain_log_p_errors: Dict[Tuple[int, int], List[float]] = {}
+        for _, connection, indices in self._workers:
+            log_p_errors, stage_times = connection.recv()
+            chain_log_p_errors.update(zip(indices, log_p_errors))
+            for stage, duration in stage_times.items():
+                self.add_stage_time(stage, duration)
+
+        for i_run in range(n_runs):
+            for i_p, chains in enumerate(self._chains):
+                for i_chain in range(len(chains)):
+                    self._results['log_p_errors'][i_p].append(
+                        chain_log_p_errors[i_p, i_chain][i_run]
+                    )
+
+        self._results['n_runs'] += n_runs
+        self._chains_stale = True
+
+    def _start_workers(self):
+        """Start the worker processes, and split the chains between
+        them."""
+        indices = [
+            (i_p, i_chain)
+            for i_p, chains in enumerate(self._chains)
+            for i_chain in range(len(chains))
+        ]
+        context = multiprocessing.get_context()
+        for i_worker in range(min(self.n_jobs, len(indices))):
+            worker_indices = indices[i_worker::self.n_jobs]
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=_chain_worker,
+                args=(worker_connection, [
+                    (
+                        self._worker_spec(i_p),
+                        self._chains[i_p][i_chain].get_state()
+                    )
+                    for i_p, i_chain in worker_indices
+                ]),
+                daemon=True
+            )
+            process.start()
+            worker_connection.close()
+            self._workers.append((process, connection, worker_indices))
+
+    def _sync_chains(self):
+        """Copy the state of the chains kept by the workers to the chains
+        of the main process."""
+        self._chains_stale = False
+        for _, connection, _ in self._workers:
+            connection.send(('state', 0))
+        for _, connection, indices in self._workers:
+            states = connection.recv()
+            for (i_p, i_chain), state in zip(indices, states):
+                self._chains[i_p][i_chain].set_state(state)
+
+    def _stop_workers(self):
+        """Stop the worker processes, without updating the chains of the
+        main process."""
+        for process, connection, _ in self._workers:
+            connection.send(('close', 0))
+            connection.close()
+            process.join()
+        self._workers = []
+        self._chains_stale = False
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+        return self._executor
+
+    def _worker_spec(self, i_p: int) -> dict:
+        """Description of the objects needed by a worker process to
+        simulate the error rate of index i_p."""
+        return {
+            'code': {
+                'name': self.code.id,
+                'parameters': self.code.params
+            },
+            'error_model': {
+                'name': self.error_model.id,
+                'parameters': self.error_model.params
+            },
+            'decoder': {
+                'name': self.decoders[i_p].id,
+                'parameters': self.decoders[i_p].params
+            },
+            'error_rate': float(self.error_rates[i_p])
+        }
+
+    def close(self):
+        """Shut down the worker processes, if any, after bringing the
+        chains up to date, and the threads of the decoders. They are
+        restarted by the next run."""
+        if self._chains_stale:
+            self._sync_chains()
+        self._stop_workers()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for decoder in self.decoders:
+            decoder.close()
+
+    @property
+    def current_error(self) -> List[List[np.ndarray]]:
+        """Current error of each Markov chain of each error rate."""
+        return [[chain.error for chain in chains] for chains in self.chains]
+
     def postprocess(self):
         super().postprocess()
 
         logical_p = self.compute_logical_probabilities()
         self._results['logical_error_rates'] = logical_p
+        if self.logical_p_se is not None:
+            self._results['logical_error_rates_se'] = self.logical_p_se
+
+        self.close()
 
     def get_results(self):
         """Return results as dictionary."""
@@ -148,13 +556,20 @@ class SplittingSimulation(BaseSimulation):
             'p_est': self._results['logical_error_rates']
         }
 
-        # Use posterior Beta distribution of the effective error rate
-        # standard distribution as standard error.
-        # TODO: change that to the actual splitting method std
-        simulation_data['p_se'] = np.sqrt(
-            simulation_data['p_est']*(1 - simulation_data['p_est'])
-            / (simulation_data['n_runs'] + 1)
-        )
+        if len(self._results['logical_error_rates_se']) > 0:
+            # Standard error from the spread of the chains, or from a
+            # blocked jackknife of a single chain.
+            simulation_data['p_se'] = np.array(
+                self._results['logical_error_rates_se']
+            )
+        else:
+            # Without enough steps for the jackknife, use posterior Beta
+            # distribution of the effective error rate standard
+            # distribution as standard error.
+            simulation_data['p_se'] = np.sqrt(
+                simulation_data['p_est']*(1 - simulation_data['p_est'])
+                / (simulation_data['n_runs'] + 1)
+            )
         return simulation_data
 
     def get_next_error(
@@ -162,127 +577,455 @@ class SplittingSimulation(BaseSimulation):
         decoder: BaseDecoder,
         error_rate: float,
         previous_error: np.ndarray
-    ) -> Tuple[np.ndarray, np.ndarray]:
+    ) -> Tuple[np.ndarray, float]:
+        """Perform one Metropolis step from a given error.
+
+        This is a stateless wrapper around `SplittingChain.step`, which
+        should be preferred to run long chains.
+        """
         if not (0 <= error_rate <= 1):
             raise ValueError('Error rate must be in [0, 1].')
 
-        new_edge = np.zeros(2*self.code.n, dtype='uint')
-        e_index = np.random.choice(self.code.n)
+        if self.rng is None:
+            self.rng = np.random.default_rng()
+
+        chain = SplittingChain(
+            self.code, self.error_model, decoder, error_rate,
+            previous_error, rng=self.rng
+        )
+        log_p_next_error = chain.step()
+
+        return chain.error, log_p_next_error
 
-        pi, px, py, pz = self.error_model.probability_distribution(self.code,
-                                                                   error_rate)
+    def get_chain_log_p_errors(self) -> np.ndarray:
+        """Log-probabilities of the errors visited by each chain after
+        the burn-in, as an array of shape (n_error_rates, n_chains, n_steps).
+        """
+        n_p = len(self.error_rates)
+        log_p_errors = np.array(self._results['log_p_errors'], dtype=float)
+        log_p_errors = log_p_errors.reshape(
+            n_p, -1, self.n_chains
+        ).transpose(0, 2, 1)
 
-        paulis = []
-        if px[e_index] != 0:
-            paulis.append('X')
-        if py[e_index] != 0:
-            paulis.append('Y')
-        if pz[e_index] != 0:
-            paulis.append('Z')
+        return log_p_errors[:, :, self.start_run:]
 
-        e_pauli = np.random.choice(paulis)
+    def compute_optimal_c(
+        self, log_p_errors: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Optimal constant of the Bennett acceptance ratio estimator
+        between each pair of consecutive error rates.
 
-        if e_pauli == 'X' or e_pauli == 'Y':
-            new_edge[e_index] = 1
-        if e_pauli == 'Z' or e_pauli == 'Y':
-            new_edge[self.code.n + e_index] = 1
+        Parameters
+        ----------
+        log_p_errors : np.ndarray, optional
+            Array of shape (n_error_rates, n_samples) of log-probabilities.
+            By default, the samples of all the chains after burn-in.
 
-        new_error = (previous_error + new_edge) % 2
+        Returns
+        -------
+        optimal_c : np.ndarray
+            Array of size n_error_rates - 1.
+        """
+        n_p = len(self.error_rates)
+        if log_p_errors is None:
+            log_p_errors = self.get_chain_log_p_errors().reshape(n_p, -1)
 
-        log_p_previous_error = self.error_model.error_probability(
-            previous_error, self.code, error_rate, log_output=True
-        )
-        log_p_new_error = self.error_model.error_probability(
-            new_error, self.code, error_rate, log_output=True
-        )
+        log_ratios = np.diff(-np.asarray(log_p_errors, dtype=float), axis=0)
 
-        q = np.exp(min(0, log_p_new_error - log_p_previous_error))
-        b = np.random.choice([0, 1], p=[1-q, q])
+        return np.exp([_solve_log_c(log_ratio) for log_ratio in log_ratios])
 
-        next_error = previous_error
-        log_p_next_error = log_p_previous_error
+    def compute_ratios(
+        self, log_p_errors: np.ndarray, optimal_c: np.ndarray
+    ) -> np.ndarray:
+        """Ratios between the logical error rates of consecutive error rates.
 
-        if b:
-            syndrome = self.code.measure_syndrome(new_error)
-            correction = decoder.decode(syndrome)
-            total_error = (correction + new_error) % 2
-            if (self.code.is_logical_error(total_error)
-                    or not self.code.in_codespace(total_error)):
-                next_error = new_error
-                log_p_next_error = log_p_new_error
+        Parameters
+        ----------
+        log_p_errors : np.ndarray
+            Array of shape (n_error_rates, n_samples) of log-probabilities.
+        optimal_c : np.ndarray
+            Constant of the ratio estimator for each pair of error rates.
 
-        return next_error, log_p_next_error
+        Returns
+        -------
+        ratios : np.ndarray
+            Array of size n_error_rates - 1.
+        """
+        log_ratios = np.diff(-np.asarray(log_p_errors, dtype=float), axis=0)
+        log_c = np.log(optimal_c)[:, None]
 
-    def compute_optimal_c(self):
-        list_c = np.linspace(0.0001, 1, 100)
-        n_p = len(self.error_rates)
-        log_p_errors = np.array(self._results['log_p_errors'])
-
-        optimal_c = []
-
-        for j in range(n_p-1):
-            print(f"{j+1} / {n_p - 1}")
-            lhs = []
-            rhs = []
-            for c in list_c:
-                print(f"C : {c}", end="\r")
-                lhs.append(np.sum(
-                    g(c * np.exp(log_p_errors[j][self.start_run:]
-                      - log_p_errors[j+1][self.start_run:]))
-                ))
-                rhs.append(np.sum(
-                    g(1/c * np.exp(log_p_errors[j+1][self.start_run:]
-                      - log_p_errors[j][self.start_run:]))
-                ))
-
-            lhs = np.array(lhs)
-            rhs = np.array(rhs)
-
-            try:
-                idx = np.argwhere(np.diff(np.sign(lhs - rhs))).flatten()[0]
-                optimal_c.append(list_c[idx])
-            except IndexError:
-                optimal_c.append(1)
-
-        return optimal_c
-
-    def compute_logical_probabilities(self):
-        n_p = len(self.error_rates)
-        log_p_errors = np.array(self._results['log_p_errors'])
+        log_numerator = logsumexp(log_expit(-(log_c + log_ratios)), axis=1)
+        log_denominator = logsumexp(log_expit(log_c + log_ratios), axis=1)
 
-        logical_p = np.zeros(n_p)
+        return np.exp(log_c[:, 0] + log_numerator - log_denominator)
 
-        if self.verbose:
-            print("Compute initial logical error rate")
+    def estimate_ratios(
+        self,
+        chain_log_p_errors: Optional[np.ndarray] = None,
+        n_blocks: int = 10
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Ratios between the logical error rates of consecutive error rates,
+        with their standard errors.
+
+        With several chains, the ratios are re-estimated from each chain
+        alone, and their standard error is that of the mean of these
+        independent estimates. With a single chain, its steps are split
+        into `n_blocks` contiguous blocks, and the ratios are re-estimated
+        with each block left out in turn (blocked jackknife), which
+        accounts for the autocorrelation of the chain.
+
+        Parameters
+        ----------
+        chain_log_p_errors : np.ndarray, optional
+            Array of shape (n_error_rates, n_chains, n_steps) of
+            log-probabilities, by default given by `get_chain_log_p_errors`.
+        n_blocks : int
+            Number of jackknife blocks of a single chain.
+
+        Returns
+        -------
+        ratios : np.ndarray
+            Array of size n_error_rates - 1.
+        ratios_se : np.ndarray
+            Standard error of the ratios, NaN if there are not enough
+            samples.
+        """
+        if chain_log_p_errors is None:
+            chain_log_p_errors = self.get_chain_log_p_errors()
+        n_p, n_chains, _ = chain_log_p_errors.shape
+
+        ratios = self._ratios_from_chains(chain_log_p_errors)
+
+        replicates = self._ratio_replicates(chain_log_p_errors, n_blocks)
+        if replicates is None:
+            return ratios, np.full(n_p - 1, np.nan)
+
+        se = _chain_se if n_chains > 1 else _jackknife_se
+
+        return ratios, se(replicates)
+
+    def _ratio_replicates(
+        self, chain_log_p_errors: np.ndarray, n_blocks: int
+    ) -> Optional[np.ndarray]:
+        """Ratios estimated from each chain alone if there are several,
+        or else with each block of steps of the chain left out, as an
+        array of shape (n_replicates, n_error_rates - 1). None if there
+        are not enough samples."""
+        _, n_chains, n_steps = chain_log_p_errors.shape
+
+        if n_chains > 1:
+            if n_steps == 0:
+                return None
+            return np.array([
+                self._ratios_from_chains(chain_log_p_errors[:, [i_chain]])
+                for i_chain in range(n_chains)
+            ])
 
-        self.initial_logical_p = calculate_logical_error_rate(
-            self.code, self.error_model, self.decoders[0],
-            self.error_rates[0], self.n_init_runs, verbose=True
+        n_blocks = min(n_blocks, n_steps)
+        if n_blocks < 2:
+            return None
+        return np.array([
+            self._ratios_from_chains(
+                np.delete(chain_log_p_errors, block, axis=2)
+            )
+            for block in np.array_split(np.arange(n_steps), n_blocks)
+        ])
+
+    def _ratios_from_chains(self, chain_log_p_errors: np.ndarray):
+        log_p_errors = chain_log_p_errors.reshape(
+            chain_log_p_errors.shape[0], -1
         )
-        logical_p[0] = self.initial_logical_p
+        optimal_c = self.compute_optimal_c(log_p_errors)
+        return self.compute_ratios(log_p_errors, optimal_c)
+
+    def estimate_initial_logical_p(self) -> Tuple[float, float]:
+        """Estimate the logical error rate at the largest error rate
+        by direct simulation, in parallel if n_jobs > 1.
+
+        Returns
+        -------
+        p_est : float
+            Estimated logical error rate.
+        p_se : float
+            Standard error of the estimate.
+        """
+        if self.n_jobs > 1:
+            if self.rng is None:
+                self.rng = np.random.default_rng()
+            executor = self._get_executor()
+            batch_sizes = [
+                len(batch)
+                for batch in np.array_split(
+                    np.arange(self.n_init_runs), self.n_jobs
+                )
+            ]
+            seeds = self.rng.integers(2**63, size=self.n_jobs)
+            futures = [
+                executor.submit(
+                    _count_failures, self._worker_spec(0), int(n_runs),
+                    int(seed)
+                )
+                for n_runs, seed in zip(batch_sizes, seeds)
+            ]
+            n_fails = sum(future.result() for future in futures)
+            p_est = n_fails / self.n_init_runs
+        else:
+            p_est = calculate_logical_error_rate(
+                self.code, self.error_model, self.decoders[0],
+                self.error_rates[0], self.n_init_runs, verbose=True
+            )
+
+        p_se = np.sqrt(p_est*(1 - p_est) / (self.n_init_runs + 1))
+
+        return p_est, p_se
+
+    def compute_logical_probabilities(self, n_blocks: int = 10):
+        chain_log_p_errors = self.get_chain_log_p_errors()
 
         if self.verbose:
-            print(f"P = {self.initial_logical_p}")
+            print("Compute initial logical error rate")
+
+        (
+            self.initial_logical_p, self.initial_logical_p_se
+        ) = self.estimate_initial_logical_p()
 
         if self.verbose:
-            print("Compute optimal C")
-        optimal_c = self.compute_optimal_c()
+            print(f"P = {self.initial_logical_p}")
 
         if self.verbose:
             print("Compute logical error rates")
 
-        for j in range(n_p-1):
-            c = optimal_c[j]
-            numerator = np.sum(
-                g(c * np.exp(log_p_errors[j][self.start_run:]
-                             - log_p_errors[j+1][self.start_run:]))
+        ratios = self._ratios_from_chains(chain_log_p_errors)
+        logical_p = self.initial_logical_p * np.concatenate([
+            [1], np.cumprod(ratios)
+        ])
+
+        # Standard error of the products of ratios, from the spread of
+        # the chains or from a blocked jackknife of a single chain (see
+        # `estimate_ratios`), combined with the relative error of the
+        # initial direct estimate.
+        self.logical_p_se = None
+        replicates = self._ratio_replicates(chain_log_p_errors, n_blocks)
+        if replicates is not None:
+            replicate_logical_p = self.initial_logical_p * np.hstack([
+                np.ones((len(replicates), 1)), np.cumprod(replicates, axis=1)
+            ])
+            se = (
+                _chain_se if chain_log_p_errors.shape[1] > 1
+                else _jackknife_se
             )
-            denominator = np.sum(
-                g(1/c * np.exp(log_p_errors[j+1][self.start_run:]
-                               - log_p_errors[j][self.start_run:]))
+            relative_initial_se = 0.0
+            if self.initial_logical_p > 0:
+                relative_initial_se = (
+                    self.initial_logical_p_se / self.initial_logical_p
+                )
+            self.logical_p_se = np.sqrt(
+                se(replicate_logical_p)**2
+                + (relative_initial_se * logical_p)**2
             )
-            ratio = c * numerator / denominator
-
-            logical_p[j+1] = logical_p[j] * ratio
 
         return logical_p
+
+
+class SplittingChain:
+    """Markov chain of failing errors used by the splitting method.
+
+    The chain keeps the current error together with its syndrome and
+    log-probability, and updates both incrementally when a single qubit
+    is flipped, using the cached columns of the stabilizer matrix.
+    A Metropolis step therefore costs O(column weight), on top of the
+    decoding of the proposed error.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        The code to simulate.
+    error_model : BaseErrorModel
+        The error model giving the stationary distribution of the chain.
+    decoder : BaseDecoder
+        Decoder used to check that proposed errors lead to a failure.
+    error_rate : float
+        Physical error rate of the chain.
+    initial_error : np.ndarray
+        Initial error, which should fail when decoded.
+    rng : numpy.random.Generator, optional
+        Random number generator (default=None resolves to
+        numpy.random.default_rng())
+
+    Attributes
+    ----------
+    stage_times : Dict[str, float]
+        Time in seconds spent proposing flips ('generate'), updating the
+        syndrome ('syndrome'), decoding ('decode') and checking the
+        correction ('verify') since the chain was created or the
+        dictionary was last cleared.
+    """
+
+    def __init__(
+        self,
+        code: StabilizerCode,
+        error_model: BaseErrorModel,
+        decoder: BaseDecoder,
+        error_rate: float,
+        initial_error: np.ndarray,
+        rng=None
+    ):
+        self.code = code
+        self.error_model = error_model
+        self.decoder = decoder
+        self.error_rate = error_rate
+        self.rng = np.random.default_rng() if rng is None else rng
+
+        self.n_accepted = 0
+        self.n_rejected = 0
+        self.stage_times: Dict[str, float] = {}
+
+        n = code.n
+        pi, px, py, pz = error_model.probability_distribution(
+            code, error_rate
+        )
+
+        # Log-probability of each single-qubit Pauli, indexed by x + 2*z,
+        # i.e. 0 for I, 1 for X, 2 for Z and 3 for Y.
+        with np.errstate(divide='ignore'):
+            self._log_probs = np.log(np.vstack([pi, px, pz, py]))
+
+        # Proposed flips on each qubit, among the Paulis of nonzero
+        # probability, using the same indexing.
+        flips = np.array([1, 3, 2])
+        allowed = np.vstack([px, py, pz]).T != 0
+        self._n_flips = allowed.sum(axis=1)
+        order = np.argsort(~allowed, axis=1, kind='stable')
+        self._flips = np.where(
+            np.arange(3) < self._n_flips[:, None], flips[order], 0
+        )
+
+        # Stabilizers that anticommute with X or Z on each qubit, from the
+        # Tanner graph cached by the code.
+        indptr, stabilizers, paulis = code.qubit_adjacency
+        qubits = np.repeat(np.arange(n), np.diff(indptr))
+        self._detectors: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        for flip, detecting in [(1, [2, 3]), (2, [1, 2])]:
+            mask = np.isin(paulis, detecting)
+            self._detectors[flip] = (
+                np.concatenate([[0], np.cumsum(
+                    np.bincount(qubits[mask], minlength=n)
+                )]),
+                stabilizers[mask]
+            )
+
+        self.set_error(initial_error)
+
+    def get_state(self) -> dict:
+        """State of the chain, from which it can be restored with
+        `set_state`."""
+        return {
+            'error': self.error.copy(),
+            'rng_state': self.rng.bit_generator.state,
+            'n_accepted': self.n_accepted,
+            'n_rejected': self.n_rejected,
+        }
+
+    def set_state(self, state: dict):
+        """Restore the chain to a state given by `get_state`."""
+        self.set_error(state['error'])
+        self.rng.bit_generator.state = state['rng_state']
+        self.n_accepted = state['n_accepted']
+        self.n_rejected = state['n_rejected']
+
+    def set_error(self, error: np.ndarray):
+        """Set the current error and recompute its syndrome and
+        log-probability from scratch."""
+        n = self.code.n
+        self.error = np.array(error, dtype='uint8') % 2
+        self.syndrome = self.code.measure_syndrome(self.error).astype('uint8')
+        self._paulis = self.error[:n] + 2*self.error[n:]
+        self.log_p = float(np.sum(
+            self._log_probs[self._paulis, np.arange(n)]
+        ))
+
+    def _flip(self, qubit: int, flip: int):
+        """Multiply the current error by a single-qubit Pauli,
+        updating its syndrome in O(column weight)."""
+        n = self.code.n
+        self._paulis[qubit] ^= flip
+
+        # An X flip is detected by the stabilizers acting as Y or Z on the
+        # qubit, and a Z flip by those acting as X or Y.
+        if flip & 1:
+            self.error[qubit] ^= 1
+        if flip & 2:
+            self.error[n + qubit] ^= 1
+        for part in [1, 2]:
+            if flip & part:
+                indptr, indices = self._detectors[part]
+                rows = indices[indptr[qubit]:indptr[qubit + 1]]
+                self.syndrome[rows] ^= 1
+
+    def _add_stage_time(self, stage: str, start: float) -> float:
+        """Add the time elapsed since start to a stage, and return the
+        current time."""
+        now = time.perf_counter()
+        self.stage_times[stage] = self.stage_times.get(stage, 0.) + (
+            now - start
+        )
+        return now
+
+    def step(self) -> float:
+        """Perform one Metropolis step of the chain.
+
+        A single-qubit Pauli is proposed uniformly at random, accepted
+        with the Metropolis probability, and the resulting error is kept
+        only if it still fails when decoded.
+
+        Returns
+        -------
+        log_p : float
+            Log-probability of the error after the step.
+        """
+        start = time.perf_counter()
+        qubit = int(self.rng.integers(self.code.n))
+        if self._n_flips[qubit] == 0:
+            self.n_rejected += 1
+            self._add_stage_time('generate', start)
+            return self.log_p
+        flip = int(
+            self._flips[qubit, self.rng.integers(self._n_flips[qubit])]
+        )
+
+        old_pauli = self._paulis[qubit]
+        new_pauli = old_pauli ^ flip
+        delta_log_p = (
+            self._log_probs[new_pauli, qubit]
+            - self._log_probs[old_pauli, qubit]
+        )
+
+        if np.log(self.rng.random()) >= min(0, delta_log_p):
+            self.n_rejected += 1
+            self._add_stage_time('generate', start)
+            return self.log_p
+        start = self._add_stage_time('generate', start)
+
+        # Apply the flip in place, and undo it if the new error is
+        # corrected successfully.
+        self._flip(qubit, flip)
+        start = self._add_stage_time('syndrome', start)
+
+        # Some decoders modify the syndrome they are given.
+        with self.decoder.stage('decode'):
+            correction = self.decoder.decode(self.syndrome.copy())
+        start = self._add_stage_time('decode', start)
+
+        total_error = (correction + self.error) % 2
+        success = self.code.is_success(total_error)
+        start = self._add_stage_time('verify', start)
+
+        if success:
+            self.n_rejected += 1
+            self._flip(qubit, flip)
+            self._add_stage_time('syndrome', start)
+        else:
+            self.n_accepted += 1
+            self.log_p += delta_log_p
+
+        return self.log_p
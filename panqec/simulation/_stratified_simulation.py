@@ -0,0 +1,267 @@
+"""
+API for running simulations.
+"""
+import datetime
+from typing import List, Optional, Tuple
+import numpy as np
+from scipy.stats import binom
+from panqec.codes import StabilizerCode
+from panqec.decoders import BaseDecoder
+from panqec.error_models import BaseErrorModel
+from . import BaseSimulation
+
+
+class StratifiedSimulation(BaseSimulation):
+    """Weight-stratified (subset) sampling simulation.
+
+    Instead of sampling errors at a given error rate, errors are sampled
+    conditioned on their exact weight w, which gives an estimate of the
+    failure probability f(w) of the decoder for each weight.
+    The logical error rate at any physical error rate p is then obtained
+    analytically from the binomial distribution of the weights
+
+    .. math::
+
+        P_L(p) = \\sum_w \\binom{n}{w} p^w (1 - p)^{n-w} f(w)
+
+    so that a single run gives the whole low error rate curve.
+    It assumes that all the qubits have the same total error probability
+    and that the relative rates of X, Y and Z errors on each qubit do not
+    depend on the error rate, as is the case for `PauliErrorModel`.
+
+    Parameters
+    -----------
+    code : StabilizerCode
+        The code to simulate.
+    error_model : BaseErrorModel
+        The error model to use.
+    decoder: BaseDecoder
+        The decoder to use.
+    error_rates : List[float]
+        Error rates at which to reconstruct the logical error rate.
+    max_weight : int, optional
+        Largest error weight to sample. By default, it is chosen such
+        that errors of larger weight have a total probability below
+        `tail_probability` at the largest error rate.
+    min_weight : int
+        Smallest error weight to sample. Errors of smaller weights are
+        assumed to always be corrected.
+    tail_probability : float
+        Probability of the truncated weights used to choose `max_weight`.
+    compress : bool
+        Set False to not compress the output files and save as plain json.
+    verbose : bool
+        Set False to suppress output.
+    rng :
+        Set Random number generator if you want to seed it.
+    """
+
+    start_time: datetime.datetime
+    code: StabilizerCode
+    error_model: BaseErrorModel
+    decoder: BaseDecoder
+    error_rates: np.ndarray
+    weights: np.ndarray
+    label: str
+    _results: dict = {}
+    rng = None
+
+    def __init__(
+        self,
+        code: StabilizerCode,
+        error_model: BaseErrorModel,
+        decoder: BaseDecoder,
+        error_rates: List[float],
+        max_weight: Optional[int] = None,
+        min_weight: int = 1,
+        tail_probability: float = 1e-6,
+        compress: bool = True,
+        verbose: bool = True,
+        rng=None
+    ):
+        super().__init__(
+            code, error_model, compress=compress, verbose=verbose, rng=rng
+        )
+
+        self.decoder = decoder
+        self.error_rates = np.sort(error_rates)
+        self.tail_probability = tail_probability
+
+        if max_weight is None:
+            max_weight = int(binom.isf(
+                tail_probability, self.code.n, np.max(self.error_rates)
+            )) + 1
+        max_weight = min(max_weight, self.code.n)
+        self.min_weight = max(min_weight, 1)
+        self.max_weight = max_weight
+        self.weights = np.arange(self.min_weight, self.max_weight + 1)
+
+        self._pauli_cdf = self._get_pauli_cdf()
+
+        self._results = {
+            **self._results,
+            'weights': self.weights.tolist(),
+            'n_fail': [0 for _ in self.weights],
+        }
+        self._inputs = {
+            **self._inputs,
+            'decoder': {
+                'name': self.decoder.id,
+                'parameters': self.decoder.params
+            },
+            'error_rates': self.error_rates.tolist(),
+            'method': {
+                'name': 'stratified',
+                'parameters': {
+                    'max_weight': max_weight,
+                    'min_weight': self.min_weight,
+                    'tail_probability': tail_probability
+                }
+            }
+        }
+
+    def _get_pauli_cdf(self) -> np.ndarray:
+        """Cumulative distribution of X, Y and Z on each qubit,
+        conditioned on the qubit having an error.
+
+        Returns
+        -------
+        pauli_cdf : np.ndarray
+            Array of shape (2, n) with the conditional probability of X
+            and the conditional probability of X or Y on each qubit.
+        """
+        reference_rate = float(np.max(self.error_rates))
+        if reference_rate == 0:
+            reference_rate = 0.5
+
+        pi, px, py, pz = self.error_model.probability_distribution(
+            self.code, reference_rate
+        )
+        p_error = px + py + pz
+
+        if not np.allclose(p_error, p_error[0]):
+            raise ValueError(
+                'Stratified method: the error model must have the same '
+                'total error probability on every qubit.'
+            )
+
+        return np.array([px / p_error, (px + py) / p_error])
+
+    def sample_error(self, weight: int) -> np.ndarray:
+        """Sample an error conditioned on having exactly `weight` qubits
+        with a non-identity Pauli.
+
+        Parameters
+        ----------
+        weight : int
+            Number of qubits in the support of the error.
+
+        Returns
+        -------
+        error : np.ndarray
+            Error as an array of size 2n in the binary symplectic format.
+        """
+        rng = np.random.default_rng() if self.rng is None else self.rng
+
+        n = self.code.n
+        support = rng.choice(n, size=weight, replace=False)
+        uniform = rng.random(weight)
+
+        # X for u < P(X), Y for P(X) <= u < P(X) + P(Y) and Z otherwise.
+        has_x = uniform < self._pauli_cdf[1, support]
+        has_z = uniform >= self._pauli_cdf[0, support]
+
+        error = np.zeros(2*n, dtype='uint8')
+        error[support[has_x]] = 1
+        error[n + support[has_z]] = 1
+
+        return error
+
+    def _run(self, n_runs: int):
+        """Sample and decode one error of each weight per run."""
+
+        if self.rng is None:
+            self.rng = np.random.default_rng()
+
+        for i_run in range(n_runs):
+            for i_w, weight in enumerate(self.weights):
+                error = self.sample_error(weight)
+                syndrome = self.code.measure_syndrome(error)
+                correction = self.decoder.decode(syndrome)
+                total_error = (correction + error) % 2
+                success = self.code.is_success(total_error)
+                self._results['n_fail'][i_w] += int(not success)
+
+            self._results['n_runs'] += 1
+
+    def close(self):
+        """Shut down the threads of the decoder, if any."""
+        self.decoder.close()
+
+    @property
+    def failure_rates(self) -> np.ndarray:
+        """Estimated failure probability f(w) for each sampled weight."""
+        n_fail = np.array(self._results['n_fail'])
+        n_runs = self._results['n_runs']
+        if n_runs == 0:
+            return np.full(len(self.weights), np.nan)
+        return n_fail / n_runs
+
+    def get_logical_error_rate(self, error_rate: float) -> Tuple:
+        """Logical error rate at a given error rate, reconstructed from
+        the failure probabilities of each weight.
+
+        Parameters
+        ----------
+        error_rate : float
+            Physical error rate, which does not need to be one of the
+            error rates of the simulation.
+
+        Returns
+        -------
+        p_est : float
+            Estimate of the logical error rate.
+        p_se : float
+            Standard error of the estimate.
+        p_tail : float
+            Probability of the weights that were not sampled above
+            `max_weight`, which bounds the truncation bias.
+        """
+        n_runs = self._results['n_runs']
+        weight_probs = binom.pmf(self.weights, self.code.n, error_rate)
+        f_est = self.failure_rates
+
+        p_est = np.sum(weight_probs * f_est)
+        p_se = np.sqrt(np.sum(
+            weight_probs**2 * f_est * (1 - f_est) / (n_runs + 1)
+        ))
+        p_tail = binom.sf(self.max_weight, self.code.n, error_rate)
+
+        return p_est, p_se, p_tail
+
+    def get_results(self):
+        """Return results as dictionary."""
+
+        p_est, p_se, p_tail = np.array([
+            self.get_logical_error_rate(error_rate)
+            for error_rate in self.error_rates
+        ]).reshape(-1, 3).T
+
+        simulation_data = {
+            'size': self.code.size,
+            'code': self.code.label,
+            'n': self.code.n,
+            'k': self.code.k,
+            'd': self.code.d,
+            'error_model': self.error_model.label,
+            'decoder': self.decoder.label,
+            'error_rates': self.error_rates,
+            'n_runs': self._results['n_runs'],
+            'weights': self.weights,
+            'f_est': self.failure_rates,
+            'p_est': p_est,
+            'p_se': p_se,
+            'p_tail': p_tail,
+        }
+
+        return simulation_data
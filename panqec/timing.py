@@ -0,0 +1,220 @@
+"""
+Streaming histograms of durations, used to time the stages of decoders.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+import numpy as np
+
+# Stages of a simulation whose total time is saved in the results.
+SIMULATION_STAGES = ['generate', 'syndrome', 'decode', 'verify', 'save']
+
+
+class LatencyHistogram:
+    """Streaming histogram of durations with logarithmic bins.
+
+    Only the counts of each bin, the total, the minimum and the maximum are
+    kept, so that many durations can be recorded in constant memory and
+    histograms from different runs can be merged.
+
+    Parameters
+    ----------
+    min_time : float
+        Lower edge of the first bin, in seconds. Shorter durations are
+        counted in an underflow bin.
+    max_time : float
+        Upper edge of the last bin, in seconds. Longer durations are
+        counted in an overflow bin.
+    bins_per_decade : int
+        Number of bins per factor of 10.
+
+    Examples
+    --------
+    >>> histogram = LatencyHistogram()
+    >>> for duration in [1e-3, 2e-3, 3e-3, 1e-1]:
+    ...     histogram.add(duration)
+    >>> histogram.count, round(histogram.mean, 6)
+    (4, 0.0265)
+    >>> bool(2e-3 <= histogram.quantile(0.5) <= 3e-3)
+    True
+    """
+
+    def __init__(self, min_time: float = 1e-7, max_time: float = 1e4,
+                 bins_per_decade: int = 10):
+        self.min_time = min_time
+        self.max_time = max_time
+        self.bins_per_decade = bins_per_decade
+
+        n_bins = int(round(np.log10(max_time / min_time) * bins_per_decade))
+        self.edges = min_time * 10**(np.arange(n_bins + 1) / bins_per_decade)
+
+        # Underflow and overflow bins on each side.
+        self.counts = np.zeros(n_bins + 2, dtype=int)
+        self.total = 0.
+        self.min = np.inf
+        self.max = 0.
+
+    @property
+    def count(self) -> int:
+        """Number of durations recorded."""
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        """Mean duration, or NaN if no duration was recorded."""
+        if self.count == 0:
+            return np.nan
+        return self.total / self.count
+
+    def add(self, duration: float):
+        """Record a duration in seconds."""
+        index = int(np.searchsorted(self.edges, duration, side='right'))
+        self.counts[index] += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add the durations recorded by another histogram with the same
+        bins."""
+        if (
+            self.min_time != other.min_time
+            or self.max_time != other.max_time
+            or self.bins_per_decade != other.bins_per_decade
+        ):
+            raise ValueError('Cannot merge histograms with different bins')
+
+        self.counts += other.counts
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile of the durations, as the geometric center
+        of the bin that contains it, bounded by the minimum and maximum.
+        """
+        count = self.count
+        if count == 0:
+            return np.nan
+
+        index = int(np.searchsorted(np.cumsum(self.counts), q * count))
+        index = min(index, len(self.counts) - 1)
+        if index == 0:
+            value = self.min
+        elif index == len(self.counts) - 1:
+            value = self.max
+        else:
+            value = np.sqrt(self.edges[index - 1] * self.edges[index])
+
+        return float(np.clip(value, self.min, self.max))
+
+    def to_dict(self) -> dict:
+        """Description of the histogram that can be saved in json, with
+        only the nonzero counts."""
+        bins = np.flatnonzero(self.counts)
+        return {
+            'min_time': self.min_time,
+            'max_time': self.max_time,
+            'bins_per_decade': self.bins_per_decade,
+            'bins': bins.tolist(),
+            'counts': self.counts[bins].tolist(),
+            'total': self.total,
+            'min': self.min if self.count > 0 else None,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LatencyHistogram':
+        """Histogram described by `to_dict`."""
+        histogram = cls(
+            data['min_time'], data['max_time'], data['bins_per_decade']
+        )
+        histogram.counts[data['bins']] = data['counts']
+        histogram.total = data['total']
+        if data['min'] is not None:
+            histogram.min = data['min']
+        histogram.max = data['max']
+
+        return histogram
+
+
+class DecoderTimer:
+    """Histograms of the time spent in each stage of decoding.
+
+    Stages are identified by their name, such as 'decode' for the whole
+    call to `decode`, 'init' for the construction of the decoder, or
+    decoder-specific stages such as 'sweep' and 'match'. Durations can
+    be recorded from several threads.
+
+    Examples
+    --------
+    >>> timer = DecoderTimer()
+    >>> with timer.stage('match'):
+    ...     pass
+    >>> timer.record('match', 0.01)
+    >>> timer.histograms['match'].count
+    2
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = dict()
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, duration: float):
+        """Record the duration in seconds of a stage."""
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = LatencyHistogram()
+            self.histograms[stage].add(duration)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context manager recording the time spent inside it."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def merge(self, other: 'DecoderTimer'):
+        """Add the durations recorded by another timer."""
+        with self._lock:
+            for stage, histogram in other.histograms.items():
+                if stage not in self.histograms:
+                    self.histograms[stage] = LatencyHistogram(
+                        histogram.min_time, histogram.max_time,
+                        histogram.bins_per_decade
+                    )
+                self.histograms[stage].merge(histogram)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, total, mean and quantiles (in seconds) of the duration
+        of each stage."""
+        return {
+            stage: {
+                'count': histogram.count,
+                'total': histogram.total,
+                'mean': histogram.mean,
+                'p50': histogram.quantile(0.5),
+                'p90': histogram.quantile(0.9),
+                'p99': histogram.quantile(0.99),
+                'max': histogram.max,
+            }
+            for stage, histogram in self.histograms.items()
+        }
+
+    def to_dict(self) -> dict:
+        """Description of the histograms that can be saved in json."""
+        return {
+            stage: histogram.to_dict()
+            for stage, histogram in self.histograms.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> 'DecoderTimer':
+        """Timer described by `to_dict`."""
+        timer = cls()
+        for stage, histogram in (data or {}).items():
+            timer.histograms[stage] = LatencyHistogram.from_dict(histogram)
+        return timer
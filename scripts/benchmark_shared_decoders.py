@@ -0,0 +1,60 @@
+"""
+Compare the running time of a batch simulation over several error rates
+when the decoder is shared by all the error rates, and when each error
+rate has its own decoder.
+
+The batch simulation runs one trial of each error rate in turn, so a
+shared decoder switches error rate at every trial.
+
+Usage:
+    python scripts/benchmark_shared_decoders.py [n_trials] [n_rates] [L]
+"""
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from panqec.codes import Toric2DCode
+from panqec.decoders import MatchingDecoder
+from panqec.error_models import PauliErrorModel
+from panqec.simulation import BatchSimulation, DirectSimulation
+
+
+def main():
+    n_trials = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n_rates = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    L = int(sys.argv[3]) if len(sys.argv) > 3 else 15
+
+    code = Toric2DCode(L, L)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    error_rates = np.linspace(0.01, 0.1, n_rates)
+
+    print(f'{code.label}, {n_rates} error rates, {n_trials} trials')
+    for shared in [True, False]:
+        duration = benchmark(code, error_model, error_rates, n_trials, shared)
+        label = 'shared decoder' if shared else 'one decoder per rate'
+        print(f'{label:<24}{duration:>8.2f} s')
+
+
+def benchmark(code, error_model, error_rates, n_trials, shared):
+    """Time to build the decoders and run the batch simulation."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        start = time.perf_counter()
+        batch_sim = BatchSimulation(
+            os.path.join(tmpdir, 'results.json.gz'),
+            save_frequency=n_trials, verbose=False
+        )
+        decoder = None
+        for error_rate in error_rates:
+            if decoder is None or not shared:
+                decoder = MatchingDecoder(code, error_model, error_rate)
+            batch_sim.append(DirectSimulation(
+                code, error_model, decoder, error_rate, verbose=False
+            ))
+        batch_sim.run(n_trials)
+
+        return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare the speed and accuracy of the Union-Find decoder with the matching
+decoder on 2D surface codes.
+
+Usage:
+    python scripts/benchmark_union_find.py [error_rate] [n_runs] [sizes...]
+"""
+import sys
+import time
+import numpy as np
+from panqec.codes import Toric2DCode, Planar2DCode, RotatedPlanar2DCode
+from panqec.decoders import UnionFindDecoder, MatchingDecoder
+from panqec.error_models import PauliErrorModel
+
+
+def main():
+    error_rate = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+    n_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    sizes = [int(L) for L in sys.argv[3:]] or [8, 16, 32]
+
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    print(f'p = {error_rate}, {n_runs} runs')
+    print(
+        f"{'code':<24}{'decoder':<14}"
+        f"{'time/decode (ms)':>18}{'p_L':>10}"
+    )
+    for code_class in [Toric2DCode, Planar2DCode, RotatedPlanar2DCode]:
+        for L in sizes:
+            code = code_class(L, L)
+            benchmark(code, error_model, error_rate, n_runs)
+
+
+def benchmark(code, error_model, error_rate, n_runs, seed=0):
+    """Decode the same errors with both decoders and print the average
+    decoding time and logical error rate of each."""
+    rng = np.random.default_rng(seed)
+    errors = np.array([
+        error_model.generate(code, error_rate, rng=rng)
+        for _ in range(n_runs)
+    ])
+    syndromes = code.measure_syndromes(errors)
+
+    decoders = {
+        'union-find': UnionFindDecoder(code, error_model, error_rate),
+        'matching': MatchingDecoder(code, error_model, error_rate),
+    }
+    for name, decoder in decoders.items():
+        start = time.perf_counter()
+        corrections = np.array([
+            decoder.decode(syndrome) for syndrome in syndromes
+        ])
+        duration = time.perf_counter() - start
+
+        n_fail = sum(
+            not code.is_success(total_error)
+            for total_error in (errors + corrections) % 2
+        )
+        print(
+            f'{code.label:<24}{name:<14}'
+            f'{1000*duration/n_runs:>18.3f}{n_fail/n_runs:>10.4f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -104,6 +104,89 @@ class StabilizerCodeTest(metaclass=ABCMeta):
         assert code.logicals_x.shape[0] == k
         assert code.logicals_z.shape[0] == k
 
+    def test_classify_errors_matches_single_error_checks(self, code):
+        rng = np.random.default_rng(0)
+        errors = rng.integers(0, 2, size=(10, 2*code.n), dtype='uint8')
+
+        # Include errors in the codespace, with and without logical effect.
+        errors[0] = 0
+        errors[1] = code.logicals_x[0]
+        errors[2] = to_array(code.stabilizer_matrix[0])
+
+        classification = code.classify_errors(errors)
+        for i, error in enumerate(errors):
+            assert classification['codespace'][i] == code.in_codespace(error)
+            assert np.all(
+                np.concatenate([
+                    classification['x_flips'][i],
+                    classification['z_flips'][i]
+                ]) == code.logical_errors(error)
+            )
+            assert classification['success'][i] == (
+                code.in_codespace(error) and not code.is_logical_error(error)
+            )
+        assert np.all(classification['success'][[0, 2]])
+        assert not classification['success'][1]
+
+    def test_tanner_graph_adjacency_matches_stabilizer_matrix(self, code):
+        H = code.stabilizer_matrix.toarray()
+        n = code.n
+        labels = np.array([0, 1, 3, 2])[H[:, :n] + 2*H[:, n:]]
+
+        indptr, qubits, paulis = code.stabilizer_adjacency
+        assert len(indptr) == code.n_stabilizers + 1
+        for i_stab in range(code.n_stabilizers):
+            edges = slice(indptr[i_stab], indptr[i_stab + 1])
+            assert np.all(qubits[edges] == np.flatnonzero(labels[i_stab]))
+            assert np.all(paulis[edges] == labels[i_stab, qubits[edges]])
+
+        indptr, stabilizers, paulis = code.qubit_adjacency
+        assert len(indptr) == n + 1
+        for qubit in range(n):
+            edges = slice(indptr[qubit], indptr[qubit + 1])
+            assert np.all(
+                stabilizers[edges] == np.flatnonzero(labels[:, qubit])
+            )
+            assert np.all(paulis[edges] == labels[stabilizers[edges], qubit])
+
+        assert code.stabilizer_adjacency is code.stabilizer_adjacency
+
+    def test_sparse_syndromes_match_dense(self, code):
+        rng = np.random.default_rng(0)
+        errors = (rng.random((5, 2*code.n)) < 0.1).astype('uint8')
+        errors[0] = 0
+
+        syndromes = code.measure_syndromes(errors)
+        sparse_syndromes = code.measure_sparse_syndromes(errors)
+        assert sparse_syndromes[0].is_trivial
+        for error, syndrome, sparse_syndrome in zip(
+            errors, syndromes, sparse_syndromes
+        ):
+            assert np.all(syndrome == code.measure_syndrome(error))
+            assert np.all(sparse_syndrome.to_dense() == syndrome)
+            assert code.measure_sparse_syndrome(error) == sparse_syndrome
+
+    def test_compute_logicals_gives_symplectic_basis(self, code):
+        n, k = code.n, code.k
+        logicals_x, logicals_z = code.compute_logicals()
+        assert logicals_x.shape == logicals_z.shape == (k, 2*n)
+
+        for logicals in [logicals_x, logicals_z]:
+            commutators = bs_prod(logicals, code.stabilizer_matrix)
+            assert np.all(to_array(commutators) == 0)
+        assert np.all(bs_prod(logicals_x, logicals_x) == 0)
+        assert np.all(bs_prod(logicals_z, logicals_z) == 0)
+        assert np.all(bs_prod(logicals_x, logicals_z) == np.eye(k))
+
+        matrix_with_logicals = vstack([
+            code.stabilizer_matrix, logicals_x, logicals_z
+        ])
+        assert brank(matrix_with_logicals) == n + k
+
+        if code.is_css:
+            assert np.all(logicals_x[:, n:] == 0)
+            assert np.all(logicals_z[:, :n] == 0)
+
 
 class StabilizerCodeTestWithCoordinates(StabilizerCodeTest, metaclass=ABCMeta):
 
@@ -1,5 +1,8 @@
+import os
 import pytest
-from panqec.codes import Toric2DCode
+import numpy as np
+import panqec.config
+from panqec.codes import StabilizerCode, Toric2DCode
 from tests.codes.stabilizer_code_test import StabilizerCodeTest
 
 
@@ -8,3 +11,84 @@ class TestToric2DCode(StabilizerCodeTest):
     @pytest.fixture(params=[(2, 2), (3, 3), (2, 3)])
     def code(self, request):
         return Toric2DCode(*request.param)
+
+
+class Toric2DCodeWithComputedLogicals(Toric2DCode):
+    """Toric code using the logicals derived from its stabilizers."""
+
+    get_logicals_x = StabilizerCode.get_logicals_x
+    get_logicals_z = StabilizerCode.get_logicals_z
+
+
+class TestToric2DCodeWithComputedLogicals(StabilizerCodeTest):
+
+    @pytest.fixture(params=[(2, 2), (3, 3), (2, 3)])
+    def code(self, request):
+        return Toric2DCodeWithComputedLogicals(*request.param)
+
+    def test_computed_logicals_have_minimum_weight(self, code):
+        assert code.d == min(code.size)
+
+
+class TestEstimateDistance:
+
+    @pytest.fixture(autouse=True)
+    def data_dir(self, tmpdir, monkeypatch):
+        # Distance estimates are stored in the panqec data directory.
+        monkeypatch.setattr(panqec.config, 'PANQEC_DIR', str(tmpdir))
+        return str(tmpdir)
+
+    @pytest.mark.parametrize('n_jobs', [1, 2])
+    def test_estimate_distance_of_toric_code(self, n_jobs):
+        code = Toric2DCode(4, 5)
+        distance = code.estimate_distance(
+            n_iter=20, n_jobs=n_jobs, rng=np.random.default_rng(0)
+        )
+        assert distance == 4
+        assert code.estimated_distance == 4
+
+    def test_estimate_distance_improves_heavy_logicals(self):
+        code = Toric2DCode(4, 4)
+
+        # Make the logicals heavier by multiplying them by stabilizers.
+        stabilizers = code.stabilizer_matrix.toarray()
+        code._logicals_x = (code.logicals_x + stabilizers[code.x_indices][0])
+        code._logicals_x %= 2
+        code._logicals_z = (code.logicals_z + stabilizers[code.z_indices][0])
+        code._logicals_z %= 2
+        assert code.d > 4
+
+        assert code.estimate_distance(rng=np.random.default_rng(0)) == 4
+        assert code.estimated_distance == 4
+
+        # The distance given by the logicals is unchanged.
+        assert code.d > 4
+
+    def test_estimate_distance_stops_at_target(self):
+        code = Toric2DCode(4, 4)
+        stabilizers = code.stabilizer_matrix.toarray()
+        code._logicals_x = (code.logicals_x + stabilizers[code.x_indices][0])
+        code._logicals_x %= 2
+        heavy_distance = code.d
+
+        # The weight of the logicals already reaches the target.
+        assert code.estimate_distance(target=heavy_distance) == heavy_distance
+
+    def test_estimate_distance_stored_on_disk(self, data_dir):
+        code = Toric2DCode(3, 4)
+        assert code.estimated_distance is None
+        code.estimate_distance(n_iter=20, rng=np.random.default_rng(0))
+        cache_file = os.path.join(data_dir, 'codes', 'distances.json')
+        assert os.path.isfile(cache_file)
+
+        # A new instance of the same code reads the estimate back.
+        new_code = Toric2DCode(3, 4)
+        assert new_code.estimated_distance == 3
+        assert new_code.estimate_distance(n_iter=10) == 3
+        assert Toric2DCode(4, 4).estimated_distance is None
+
+    def test_estimate_distance_without_cache(self, data_dir):
+        code = Toric2DCode(3, 4)
+        code.estimate_distance(n_iter=20, cache=False)
+        assert code.estimated_distance == 3
+        assert not os.path.exists(os.path.join(data_dir, 'codes'))
@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+from panqec.codes import Toric2DCode, Color666PlanarCode, RotatedToric3DCode
+from panqec.decoders import BatchBeliefPropagationDecoder
+from panqec.decoders.belief_propagation.batch_bp_decoder import TannerGraph
+from panqec.error_models import PauliErrorModel
+from tests.decoders.decoder_test import DecoderTest
+
+
+class TestBatchBeliefPropagationDecoder(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return Color666PlanarCode(3)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return BatchBeliefPropagationDecoder(code, error_model, 0.1)
+
+    @pytest.mark.parametrize('bp_method', ['ms', 'ps'])
+    def test_correction_matches_syndrome(self, code, error_model, bp_method):
+        decoder = BatchBeliefPropagationDecoder(
+            code, error_model, 0.05, bp_method=bp_method
+        )
+        rng = np.random.default_rng(0)
+        errors = np.array([
+            error_model.generate(code, 0.05, rng=rng) for _ in range(50)
+        ])
+        syndromes = code.measure_syndromes(errors)
+        corrections = decoder.decode_batch(syndromes)
+        assert np.all(code.measure_syndromes(corrections) == syndromes)
+
+    def test_osd_only_for_shots_not_converged(self, code, error_model):
+        rng = np.random.default_rng(0)
+        errors = np.array([
+            error_model.generate(code, 0.1, rng=rng) for _ in range(50)
+        ])
+        syndromes = code.measure_syndromes(errors)
+
+        bp_decoder = BatchBeliefPropagationDecoder(
+            code, error_model, 0.1, osd=False
+        )
+        osd_decoder = BatchBeliefPropagationDecoder(code, error_model, 0.1)
+        bp_corrections = bp_decoder.decode_batch(syndromes)
+        osd_corrections = osd_decoder.decode_batch(syndromes)
+
+        converged = np.all(
+            code.measure_syndromes(bp_corrections) == syndromes, axis=1
+        )
+        assert 0 < osd_decoder.n_osd
+        assert bp_decoder.n_osd == 0
+
+        # Both sectors are decoded once by BP for the whole batch.
+        timer = osd_decoder.enable_timing()
+        osd_decoder.decode_batch(syndromes)
+        assert timer.histograms['bp'].count == 2
+        assert 0 < timer.histograms['osd'].count <= 2
+        assert np.all(
+            bp_corrections[converged] == osd_corrections[converged]
+        )
+
+
+def test_invalid_bp_method_raises():
+    code = Toric2DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    with pytest.raises(ValueError):
+        BatchBeliefPropagationDecoder(code, error_model, 0.1, bp_method='x')
+
+
+def test_tanner_graph_convergence_masking():
+    # Repetition code, where BP converges at the first iteration for a
+    # single flip and the trivial syndrome needs no iteration at all.
+    H = np.eye(4, 5, dtype=int) + np.eye(4, 5, k=1, dtype=int)
+    graph = TannerGraph(H)
+    assert graph.n_edges == 8
+
+    syndromes = np.array([[0, 0, 0, 0], [0, 1, 1, 0]])
+    llrs = np.log(0.9/0.1) * np.ones(5)
+    corrections, converged, posteriors = graph.decode(
+        syndromes, llrs, max_iter=1
+    )
+    assert np.all(converged)
+    assert np.all(corrections == [[0, 0, 0, 0, 0], [0, 0, 1, 0, 0]])
+    assert np.all(posteriors[0] == llrs)
+    assert posteriors[1, 2] < 0
+
+
+def test_non_css_code_decoded_with_full_matrix():
+    code = RotatedToric3DCode(3)
+    assert not code.is_css
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = BatchBeliefPropagationDecoder(code, error_model, 0.05)
+
+    rng = np.random.default_rng(0)
+    errors = np.array([
+        error_model.generate(code, 0.05, rng=rng) for _ in range(10)
+    ])
+    syndromes = code.measure_syndromes(errors)
+    corrections = decoder.decode_batch(syndromes)
+    assert list(decoder._graphs.keys()) == ['XZ']
+    assert np.all(code.measure_syndromes(corrections) == syndromes)
@@ -1,6 +1,10 @@
 import pytest
-from panqec.codes import Toric3DCode
+import numpy as np
+from panqec.codes import Toric2DCode, Toric3DCode
 from panqec.decoders import BeliefPropagationOSDDecoder
+from panqec.decoders.belief_propagation.bposd_decoder import (
+    get_syndrome_clusters
+)
 from tests.decoders.decoder_test import DecoderTest
 
 
@@ -14,3 +18,55 @@ class TestBeliefPropagationOSDDecoder(DecoderTest):
     def decoder(self, code, error_model):
         error_rate = 0.1
         return BeliefPropagationOSDDecoder(code, error_model, error_rate)
+
+
+class TestClusterBeliefPropagationOSDDecoder(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(12)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        error_rate = 0.1
+        return BeliefPropagationOSDDecoder(
+            code, error_model, error_rate, cluster_radius=1
+        )
+
+    @pytest.mark.parametrize('n_threads', [1, 2])
+    def test_clusters_decoded_like_full_syndrome(
+        self, code, error_model, n_threads
+    ):
+        error_rate = 0.01
+        full_decoder = BeliefPropagationOSDDecoder(
+            code, error_model, error_rate
+        )
+        cluster_decoder = BeliefPropagationOSDDecoder(
+            code, error_model, error_rate,
+            cluster_radius=1, n_threads=n_threads
+        )
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            error = error_model.generate(code, error_rate, rng=rng)
+            syndrome = code.measure_syndrome(error)
+            correction = cluster_decoder.decode(syndrome)
+            assert np.all(code.measure_syndrome(correction) == syndrome)
+            assert code.is_success((correction + error) % 2) == (
+                code.is_success((full_decoder.decode(syndrome) + error) % 2)
+            )
+
+
+def test_syndrome_clusters_are_independent():
+    code = Toric2DCode(12)
+    H = code.Hz
+    error = code.to_bsf({(1, 0): 'X', (13, 12): 'X'})
+    syndrome = H @ error[:code.n] % 2
+
+    clusters = get_syndrome_clusters(H, syndrome, 1)
+    assert len(clusters) == 2
+
+    for checks, qubits in clusters:
+        # No qubit of a cluster touches a check outside of it.
+        outside = np.setdiff1d(np.arange(H.shape[0]), checks)
+        assert H[outside][:, qubits].nnz == 0
+        assert np.any(syndrome[checks])
@@ -2,7 +2,7 @@ import pytest
 from typing import List
 from abc import ABCMeta, abstractmethod
 import numpy as np
-from panqec.codes import StabilizerCode
+from panqec.codes import StabilizerCode, SparseSyndrome
 from panqec.decoders import BaseDecoder
 from panqec.error_models import BaseErrorModel, PauliErrorModel
 
@@ -38,6 +38,104 @@ class DecoderTest(metaclass=ABCMeta):
         assert code.is_success(correction)
         assert code.in_codespace(correction)
 
+    def test_decode_sparse_syndrome_like_dense(self, code, decoder):
+        error = np.zeros(2*code.n, dtype='uint8')
+        error[[0, code.n + code.n // 2]] = 1
+
+        sparse_syndrome = code.measure_sparse_syndrome(error)
+        assert np.all(
+            sparse_syndrome.to_dense() == code.measure_syndrome(error)
+        )
+
+        dense_correction = decoder.decode(code.measure_syndrome(error))
+        sparse_correction = decoder.decode(sparse_syndrome)
+        assert np.all(sparse_correction == dense_correction)
+
+        trivial_syndrome = SparseSyndrome([], code.n_stabilizers)
+        assert np.all(decoder.decode(trivial_syndrome) == 0)
+
+    def test_decode_batch_like_decode(self, code, decoder, error_model):
+        rng = np.random.default_rng(0)
+        errors = np.array([
+            error_model.generate(code, 0.05, rng=rng) for _ in range(3)
+        ])
+        syndromes = code.measure_syndromes(errors)
+
+        # A new decoder goes through the same random choices (if any) as
+        # the batch decoder.
+        new_decoder = type(decoder)(
+            code, error_model, decoder.error_rate, **decoder.params
+        )
+        corrections = decoder.decode_batch(syndromes.copy())
+        assert corrections.shape == (3, 2*code.n)
+        for syndrome, correction in zip(syndromes, corrections):
+            assert np.all(correction == new_decoder.decode(syndrome.copy()))
+
+    def test_set_error_rate_like_new_decoder(
+        self, code, decoder, error_model
+    ):
+        new_error_rate = 0.2
+        try:
+            decoder.set_error_rate(new_error_rate)
+        except NotImplementedError:
+            pytest.skip(f'{decoder.id} cannot change its error rate')
+        assert decoder.error_rate == new_error_rate
+
+        new_decoder = type(decoder)(
+            code, error_model, new_error_rate, **decoder.params
+        )
+        rng = np.random.default_rng(0)
+        for _ in range(3):
+            error = error_model.generate(code, 0.05, rng=rng)
+            syndrome = code.measure_syndrome(error)
+            assert np.all(
+                decoder.decode(syndrome.copy())
+                == new_decoder.decode(syndrome.copy())
+            )
+
+    def test_set_error_rate_back_to_previous_rate(
+        self, code, decoder, error_model
+    ):
+        # As done by a decoder shared by interleaved simulations.
+        error_rate = decoder.error_rate
+        new_decoder = type(decoder)(
+            code, error_model, error_rate, **decoder.params
+        )
+        try:
+            decoder.set_error_rate(0.2)
+        except NotImplementedError:
+            pytest.skip(f'{decoder.id} cannot change its error rate')
+        decoder.set_error_rate(error_rate)
+
+        rng = np.random.default_rng(0)
+        for _ in range(3):
+            error = error_model.generate(code, 0.05, rng=rng)
+            syndrome = code.measure_syndrome(error)
+            assert np.all(
+                decoder.decode(syndrome.copy())
+                == new_decoder.decode(syndrome.copy())
+            )
+
+    def test_timing_does_not_change_correction(
+        self, code, decoder, error_model
+    ):
+        rng = np.random.default_rng(0)
+        error = error_model.generate(code, 0.05, rng=rng)
+        syndrome = code.measure_syndrome(error)
+
+        new_decoder = type(decoder)(
+            code, error_model, decoder.error_rate, **decoder.params
+        )
+        timer = decoder.enable_timing()
+        with decoder.stage('decode'):
+            correction = decoder.decode(syndrome.copy())
+        assert decoder.timer is timer
+        assert timer.histograms['decode'].count == 1
+        assert np.all(correction == new_decoder.decode(syndrome.copy()))
+
+        decoder.disable_timing()
+        assert decoder.timer is None
+
     @pytest.mark.slow
     def test_decode_single_qubit_error(self, code, decoder, allowed_paulis):
         for pauli in allowed_paulis:
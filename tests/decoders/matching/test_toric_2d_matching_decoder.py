@@ -49,6 +49,22 @@ class TestToric2DMatchingDecoder(DecoderTest):
             'Total error should be in code space'
         )
 
+    def test_set_error_rate_reweights_matching_graphs(self, code):
+        error_model = PauliErrorModel(0.1, 0.1, 0.8)
+        decoder = MatchingDecoder(code, error_model, 0.1)
+        matcher_x = decoder.matcher_x
+        old_edges = decoder.matcher_x.edges()
+
+        decoder.set_error_rate(0.3)
+        assert decoder.matcher_x is matcher_x
+        new_decoder = MatchingDecoder(code, error_model, 0.3)
+        for matcher, new_matcher in [
+            (decoder.matcher_x, new_decoder.matcher_x),
+            (decoder.matcher_z, new_decoder.matcher_z),
+        ]:
+            assert matcher.edges() == new_matcher.edges()
+        assert decoder.matcher_x.edges() != old_edges
+
     def test_exception_when_wrong_code(self, code):
         error_model = PauliErrorModel(1/3, 1/3, 1/3)
         error_rate = 0.5
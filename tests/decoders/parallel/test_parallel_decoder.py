@@ -0,0 +1,80 @@
+import pytest
+import numpy as np
+from panqec.codes import Toric2DCode
+from panqec.decoders import (
+    ParallelDecoder, MatchingDecoder, UnionFindDecoder
+)
+from panqec.error_models import PauliErrorModel
+from tests.decoders.decoder_test import DecoderTest
+
+
+class TestParallelDecoder(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(4, 5)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return ParallelDecoder(
+            code, error_model, 0.1, 'MatchingDecoder', n_threads=3
+        )
+
+    def test_batch_decoded_like_main_decoder(
+        self, code, error_model, decoder
+    ):
+        rng = np.random.default_rng(0)
+        errors = np.array([
+            error_model.generate(code, 0.1, rng=rng) for _ in range(20)
+        ])
+        syndromes = code.measure_syndromes(errors)
+
+        corrections = decoder.decode_batch(syndromes)
+        matcher = MatchingDecoder(code, error_model, 0.1)
+        assert np.all(corrections == matcher.decode_batch(syndromes))
+
+        # Each thread has its own copy of the matching decoder.
+        decoders = decoder.get_decoders()
+        assert len(set(map(id, decoders))) == 3
+        assert decoders[0] is decoder.decoder
+
+    def test_close_shuts_down_threads(self, code, decoder):
+        syndromes = np.zeros((4, code.n_stabilizers), dtype='uint8')
+        decoder.decode_batch(syndromes)
+        executor = decoder._executor
+        assert executor is not None
+
+        decoder.close()
+        assert decoder._executor is None
+        with pytest.raises(RuntimeError):
+            executor.submit(print)
+
+        # The threads are created again by the next batch.
+        assert np.all(decoder.decode_batch(syndromes) == 0)
+        decoder.close()
+
+    def test_set_error_rate_updates_copies(self, decoder):
+        decoder.get_decoders()
+        decoder.set_error_rate(0.05)
+        assert all(
+            clone.error_rate == 0.05 for clone in decoder.get_decoders()
+        )
+
+
+def test_thread_safe_decoder_is_shared():
+    code = Toric2DCode(4)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    main_decoder = UnionFindDecoder(code, error_model, 0.1)
+    decoder = ParallelDecoder(code, error_model, 0.1, main_decoder)
+
+    assert decoder.params['decoder'] == 'UnionFindDecoder'
+    assert all(
+        clone is main_decoder for clone in decoder.get_decoders()
+    )
+
+
+def test_invalid_number_of_threads_raises():
+    code = Toric2DCode(4)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    with pytest.raises(ValueError):
+        ParallelDecoder(code, error_model, 0.1, 'MatchingDecoder', n_threads=0)
@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+from panqec.codes import Toric2DCode, Color666PlanarCode
+from panqec.decoders import (
+    PreDecoder, MatchingDecoder, BeliefPropagationOSDDecoder
+)
+from panqec.error_models import PauliErrorModel
+from tests.decoders.decoder_test import DecoderTest
+
+
+class TestPreDecoderMatching(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(4, 5)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return PreDecoder(code, error_model, 0.1, 'MatchingDecoder')
+
+    def test_single_qubit_errors_skip_main_decoder(self, code, decoder):
+        for pauli in ['X', 'Y', 'Z']:
+            error = code.to_bsf({code.qubit_coordinates[3]: pauli})
+            correction = decoder.decode(code.measure_syndrome(error))
+            assert np.all(correction == error)
+
+        assert decoder.n_decodes == 3
+        assert decoder.n_skipped == 3
+        assert decoder.skip_rate == 1
+
+    def test_residual_syndrome_goes_to_main_decoder(
+        self, code, decoder, error_model
+    ):
+        # Two neighboring X errors form a single cluster of defects that
+        # is not the syndrome of a single-qubit error.
+        vertex = code.stabilizer_coordinates[
+            np.flatnonzero(code.z_indices)[5]
+        ]
+        qubits = list(code.get_stabilizer(vertex).keys())[:2]
+        error = code.to_bsf({qubits[0]: 'X', qubits[1]: 'X'})
+        syndrome = code.measure_syndrome(error)
+
+        correction = decoder.decode(syndrome)
+        assert np.all(code.measure_syndrome(correction) == syndrome)
+        assert decoder.n_skipped == 0
+
+        # The whole syndrome was left to the main decoder.
+        matcher = MatchingDecoder(code, error_model, 0.1)
+        assert np.all(correction == matcher.decode(syndrome))
+
+        decoder.reset_counts()
+        assert decoder.n_decodes == 0
+
+
+def test_predecoder_wraps_decoder_instance():
+    code = Color666PlanarCode(2)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    main_decoder = BeliefPropagationOSDDecoder(code, error_model, 0.05)
+    decoder = PreDecoder(code, error_model, 0.05, main_decoder)
+    assert decoder.decoder is main_decoder
+    assert decoder.params['decoder'] == 'BeliefPropagationOSDDecoder'
+
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        error = error_model.generate(code, 0.05, rng=rng)
+        syndrome = code.measure_syndrome(error)
+        correction = decoder.decode(syndrome)
+        assert np.all(code.measure_syndrome(correction) == syndrome)
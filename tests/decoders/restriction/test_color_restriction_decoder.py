@@ -0,0 +1,88 @@
+import pytest
+import numpy as np
+from panqec.codes import (
+    Color666PlanarCode, Color666ToricCode, Color488Code, Toric2DCode
+)
+from panqec.decoders import ColorRestrictionDecoder
+from panqec.decoders.restriction._color_restriction_decoder import (
+    local_inverse
+)
+from panqec.error_models import PauliErrorModel
+from tests.decoders.decoder_test import DecoderTest
+
+
+class ColorRestrictionTest(DecoderTest):
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return ColorRestrictionDecoder(code, error_model, 0.1)
+
+    @pytest.mark.parametrize('matcher', ['matching', 'union-find'])
+    def test_correction_matches_syndrome(self, code, error_model, matcher):
+        decoder = ColorRestrictionDecoder(
+            code, error_model, 0.05, matcher=matcher
+        )
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            error = error_model.generate(code, 0.05, rng=rng)
+            syndrome = code.measure_syndrome(error)
+            correction = decoder.decode(syndrome)
+            assert np.all(code.measure_syndrome(correction) == syndrome)
+
+
+class TestColorRestriction666Planar(ColorRestrictionTest):
+
+    @pytest.fixture
+    def code(self):
+        return Color666PlanarCode(3, 3)
+
+    def test_corner_error_is_corrected(self, code, decoder):
+        # Corner qubits belong to a single face.
+        corner = np.flatnonzero(np.diff(code.qubit_adjacency[0]) == 2)[0]
+        error = np.zeros(2*code.n, dtype='uint8')
+        error[[corner, code.n + corner]] = 1
+
+        correction = decoder.decode(code.measure_syndrome(error))
+        assert code.is_success((correction + error) % 2)
+
+
+class TestColorRestriction666Toric(ColorRestrictionTest):
+
+    @pytest.fixture
+    def code(self):
+        return Color666ToricCode(2, 2)
+
+
+class TestColorRestriction488(ColorRestrictionTest):
+
+    @pytest.fixture
+    def code(self):
+        return Color488Code(3, 3)
+
+    def test_duplicate_stabilizers_are_single_face(self, code, decoder):
+        lattices = decoder.lattices['X']
+        assert len(lattices.faces) < np.sum(code.z_indices)
+        assert np.all(lattices.qubit_faces < code.n_stabilizers)
+
+
+def test_local_inverse_solves_hexagon():
+    # Six qubits around a face, each touching two of its six neighbors.
+    matrix = np.zeros((6, 6), dtype='uint8')
+    for qubit in range(6):
+        matrix[qubit, qubit] = 1
+        matrix[(qubit + 1) % 6, qubit] = 1
+
+    inverse, offsets = local_inverse(matrix)
+    assert offsets.shape == (2, 6)
+
+    target = np.array([1, 0, 0, 1, 0, 0], dtype='uint8')
+    solution = inverse @ target % 2
+    assert np.all(matrix @ solution % 2 == target)
+    assert np.all(matrix @ offsets[1] % 2 == 0)
+
+
+def test_code_without_colors_raises():
+    code = Toric2DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    with pytest.raises(ValueError):
+        ColorRestrictionDecoder(code, error_model, 0.1)
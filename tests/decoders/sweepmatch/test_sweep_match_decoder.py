@@ -23,6 +23,13 @@ class TestSweepMatchDecoder(DecoderTest):
         assert decoder.label is not None
         assert decoder.decode is not None
 
+    def test_timing_records_sweep_and_match(self, code, decoder):
+        timer = decoder.enable_timing()
+        error = code.to_bsf({(1, 0, 0): 'Y'})
+        decoder.decode(code.measure_syndrome(error))
+        assert timer.histograms['sweep'].count == 1
+        assert timer.histograms['match'].count == 1
+
     def test_decode_trivial_syndrome(self, decoder, code):
         syndrome = np.zeros(
             shape=code.stabilizer_matrix.shape[0], dtype=np.uint
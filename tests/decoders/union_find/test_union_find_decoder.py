@@ -0,0 +1,137 @@
+import pytest
+import numpy as np
+from panqec.codes import (
+    Toric2DCode, Planar2DCode, RotatedPlanar2DCode, Toric3DCode,
+    RhombicToricCode, Color666ToricCode
+)
+from panqec.decoders import UnionFindDecoder, MatchingDecoder
+from panqec.error_models import PauliErrorModel
+from tests.decoders.decoder_test import DecoderTest
+
+
+class TestUnionFindToric2D(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(5, 6)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return UnionFindDecoder(code, error_model, 0.1)
+
+    def test_correction_matches_syndrome(self, code, decoder, error_model):
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            error = error_model.generate(code, 0.1, rng=rng)
+            syndrome = code.measure_syndrome(error)
+            correction = decoder.decode(syndrome)
+            assert np.all(code.measure_syndrome(correction) == syndrome)
+
+    def test_weighted_growth_follows_lighter_edges(self, code, error_model):
+        # Make the qubits between two defects much more likely to have an
+        # error than the rest, so that they are grown and flipped first.
+        error = code.to_bsf({(1, 2): 'X', (1, 4): 'X'})
+        syndrome = code.measure_syndrome(error)
+
+        weights_x, weights_z = error_model.get_weights(code, 0.01)
+        weights_x[np.flatnonzero(error[:code.n])] /= 10
+        decoder = UnionFindDecoder(code, error_model, 0.01)
+        decoder.graphs['X'].set_weights(weights_x, decoder.resolution)
+
+        correction = decoder.decode(syndrome)
+        assert np.all(correction == error)
+
+    def test_accuracy_similar_to_matching(self, code, error_model):
+        error_rate = 0.05
+        decoder = UnionFindDecoder(code, error_model, error_rate)
+        matcher = MatchingDecoder(code, error_model, error_rate)
+
+        rng = np.random.default_rng(0)
+        n_fail_uf = n_fail_mwpm = 0
+        for _ in range(200):
+            error = error_model.generate(code, error_rate, rng=rng)
+            syndrome = code.measure_syndrome(error)
+            n_fail_uf += not code.is_success(
+                (error + decoder.decode(syndrome)) % 2
+            )
+            n_fail_mwpm += not code.is_success(
+                (error + matcher.decode(syndrome)) % 2
+            )
+        assert n_fail_uf <= 2*n_fail_mwpm + 5
+
+
+class TestUnionFindPlanar2D(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return Planar2DCode(4, 5)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return UnionFindDecoder(code, error_model, 0.1)
+
+    def test_boundary_defect_is_matched_to_boundary(self, code, decoder):
+        error = np.zeros(2*code.n, dtype='uint8')
+        boundary_qubits = np.flatnonzero(np.diff(
+            code.qubit_adjacency[0]
+        ) < 4)
+        error[boundary_qubits[0]] = 1
+        syndrome = code.measure_syndrome(error)
+
+        correction = decoder.decode(syndrome)
+        assert code.is_success((correction + error) % 2)
+
+
+class TestUnionFindRotatedPlanar2D(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return RotatedPlanar2DCode(5, 5)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return UnionFindDecoder(code, error_model, 0.1)
+
+
+class TestUnionFindToric3D(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return Toric3DCode(3, 4, 5)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return UnionFindDecoder(code, error_model, 0.1, 'X')
+
+    @pytest.fixture
+    def allowed_paulis(self):
+        return ['X']
+
+    def test_only_x_sector_is_graph_like(self, code, error_model):
+        decoder = UnionFindDecoder(code, error_model, 0.1)
+        assert list(decoder.graphs) == ['X']
+
+        with pytest.raises(ValueError):
+            UnionFindDecoder(code, error_model, 0.1, 'Z')
+
+
+class TestUnionFindRhombicToric(DecoderTest):
+
+    @pytest.fixture
+    def code(self):
+        return RhombicToricCode(4, 4, 4)
+
+    @pytest.fixture
+    def decoder(self, code, error_model):
+        return UnionFindDecoder(code, error_model, 0.1)
+
+    @pytest.fixture
+    def allowed_paulis(self):
+        return ['Z']
+
+
+def test_code_without_graph_like_sector_raises():
+    code = Color666ToricCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    with pytest.raises(ValueError):
+        UnionFindDecoder(code, error_model, 0.1)
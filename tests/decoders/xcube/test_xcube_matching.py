@@ -1,6 +1,11 @@
 import pytest
+import numpy as np
 from panqec.codes import XCubeCode
 from panqec.decoders import XCubeMatchingDecoder
+from panqec.error_models import PauliErrorModel
+from panqec.decoders.xcube._xcube_matching_decoder import (
+    decode_plane, stack_locations
+)
 from tests.decoders.decoder_test import DecoderTest
 
 
@@ -13,3 +18,73 @@ class TestXCubeMatchingDecoder(DecoderTest):
     def decoder(self, code, error_model):
         error_rate = 0.1
         return XCubeMatchingDecoder(code, error_model, error_rate)
+
+    def test_threads_decode_like_serial(self, code, error_model, decoder):
+        threaded_decoder = XCubeMatchingDecoder(
+            code, error_model, 0.1, n_threads=4
+        )
+        assert threaded_decoder.params == {'n_threads': 4}
+
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            error = error_model.generate(code, 0.1, rng=rng)
+            syndrome = code.measure_syndrome(error)
+            assert np.all(
+                threaded_decoder.decode(syndrome) == decoder.decode(syndrome)
+            )
+
+    def test_matched_pairs_are_faces_of_defects(self, code, decoder):
+        # Regression test: the matched pairs are rows of the face syndromes,
+        # and used to be looked up as qubits of the toric codes.
+        error = code.to_bsf({(1, 0, 0): 'X'})
+        syndrome = code.measure_syndrome(error)
+        defects = np.flatnonzero(syndrome)
+        defect_locations = {
+            code.stabilizer_coordinates[i] for i in defects
+        }
+        assert len(defect_locations) == 4
+
+        for axis in ['x', 'y', 'z']:
+            _, pairs = decoder._match_planes(axis, defects)
+            locations = decoder._plane_face_location[axis][pairs]
+            assert len(pairs) > 0
+            assert {
+                tuple(location) for location in locations.reshape(-1, 3)
+            } == defect_locations
+
+        # The faces matched in the planes orthogonal to y span the planes
+        # z = 1 and z = 7, which are then projected together along z.
+        _, pairs = decoder._match_planes('y', defects)
+        z_planes = decoder._plane_face_location['y'][pairs][..., 2]
+        assert sorted(z_planes.ravel().tolist()) == [1, 1, 7, 7]
+
+        correction = decoder.decode(syndrome)
+        assert code.is_success((correction + error) % 2)
+
+
+def test_single_qubit_errors_on_non_cubic_lattice():
+    # Regression test: the loops of each projection used to be filled on
+    # planes of size (Lx, Ly) whatever the axis.
+    code = XCubeCode(3, 4, 5)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = XCubeMatchingDecoder(code, error_model, 0.05)
+    for qubit in range(code.n):
+        error = np.zeros(2*code.n, dtype='uint8')
+        error[qubit] = 1
+        correction = decoder.decode(code.measure_syndrome(error))
+        assert code.is_success((correction + error) % 2)
+
+
+def test_decode_plane_fills_inside_of_loop():
+    # Crossing the two vertical edges around (2, 2) in its column.
+    correction = decode_plane([(2, 1), (2, 3)], (4, 4))
+    assert correction.tolist() == [[2, 2]]
+
+    assert decode_plane([], (4, 4)).shape == (0, 2)
+
+
+def test_stack_locations():
+    locations = stack_locations([(0, 1), (2, 3)], 1, [1, 3])
+    assert locations.tolist() == [
+        [0, 1, 1], [2, 1, 3], [0, 3, 1], [2, 3, 3]
+    ]
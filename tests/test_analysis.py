@@ -8,7 +8,7 @@ from panqec.analysis import (
     get_subthreshold_fit_function, get_single_qubit_error_rate, Analysis,
     deduce_bias, count_fails
 )
-from panqec.simulation import read_input_json
+from panqec.simulation import read_input_json, read_input_dict
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 
 
@@ -440,3 +440,53 @@ class TestAnalysisClusterTutorial:
         analysis.thresholds
         analysis.sector_thresholds
         analysis.min_thresholds
+
+
+def test_decoder_timing_summary(tmpdir):
+    data = {'ranges': {
+        'label': 'timed',
+        'code': {'name': 'Toric2DCode', 'parameters': [{'L_x': 3}]},
+        'error_model': {
+            'name': 'PauliErrorModel',
+            'parameters': {'r_x': 1/3, 'r_y': 1/3, 'r_z': 1/3}
+        },
+        'decoder': {'name': 'BeliefPropagationOSDDecoder'},
+        'error_rate': [0.05, 0.1],
+        'method': {'name': 'direct', 'parameters': {'timing': True}}
+    }}
+    output_file = os.path.join(tmpdir, 'results.json.gz')
+    batch_sim = read_input_dict(data, output_file, verbose=False)
+    batch_sim.run(4)
+
+    timing = Analysis(str(tmpdir)).get_decoder_timing()
+    assert set(timing['error_rate']) == {0.05, 0.1}
+    decode_rows = timing[timing['stage'] == 'decode']
+    assert list(decode_rows['count']) == [4, 4]
+    assert np.all(decode_rows['p50'] <= decode_rows['max'])
+    assert 'init' in set(timing['stage'])
+
+
+def test_stage_time_breakdown(tmpdir):
+    data = {'ranges': {
+        'label': 'stages',
+        'code': {'name': 'Toric2DCode', 'parameters': [{'L_x': 3}]},
+        'error_model': {
+            'name': 'PauliErrorModel',
+            'parameters': {'r_x': 1/3, 'r_y': 1/3, 'r_z': 1/3}
+        },
+        'decoder': {'name': 'MatchingDecoder'},
+        'error_rate': [0.05, 0.1],
+        'method': {'name': 'direct', 'parameters': {}}
+    }}
+    output_file = os.path.join(tmpdir, 'results.json.gz')
+    batch_sim = read_input_dict(data, output_file, verbose=False)
+    batch_sim.run(4)
+
+    results = Analysis(str(tmpdir)).get_results()
+    assert len(results) == 2
+    for stage in ['generate', 'syndrome', 'decode', 'verify', 'save']:
+        assert np.all(results[f'{stage}_time'] > 0)
+    assert np.all(results['throughput'] > 0)
+    assert np.all(
+        (results['decode_fraction'] > 0) & (results['decode_fraction'] < 1)
+    )
@@ -10,7 +10,8 @@ from panqec.codes import Toric2DCode
 from panqec.bpauli import (
     pauli_string_to_bvector, bvector_to_pauli_string,
     bs_prod, get_effective_error, bvector_to_int,
-    bvectors_to_ints, ints_to_bvectors, apply_deformation
+    bvectors_to_ints, ints_to_bvectors, apply_deformation, bsf_wt,
+    bsf_to_pauli, PauliBatch
 )
 from panqec.bsparse import from_array, is_sparse, vstack
 
@@ -166,6 +167,20 @@ def test_get_effective_error_many():
     ])), 'Effective errors should be bsf for Y, I, Z'
 
 
+def test_pauli_string_conversions_on_batches():
+    pstrings = ['IXYZ', 'ZZII', 'YYYY']
+    bvectors = pauli_string_to_bvector(pstrings)
+    assert bvectors.shape == (3, 8)
+    assert np.all(bvectors[1] == pauli_string_to_bvector('ZZII'))
+    assert bvector_to_pauli_string(bvectors) == pstrings
+    assert bsf_to_pauli(from_array(bvectors)) == pstrings
+
+
+def test_pauli_string_to_bvector_invalid_character_raises_error():
+    with pytest.raises(ValueError):
+        pauli_string_to_bvector('IXA')
+
+
 def test_bvector_to_int():
     assert bvector_to_int(pauli_string_to_bvector('IIIII')) == 0
     assert bvector_to_int(pauli_string_to_bvector('I')) == 0
@@ -181,6 +196,14 @@ def test_bvectors_to_ints():
     ))) == [0, 51, 1]
 
 
+def test_bvectors_to_ints_large_inverse():
+    rng = np.random.default_rng(0)
+    bvectors = rng.integers(0, 2, size=(10, 2*101))
+    ints = bvectors_to_ints(bvectors)
+    assert ints[0] == int(''.join(map(str, bvectors[0])), 2)
+    assert np.all(np.array(ints_to_bvectors(ints, 101)) == bvectors)
+
+
 def test_ints_to_bvectors():
     assert np.all(
         np.array(ints_to_bvectors([0, 1, 2], 3))
@@ -320,3 +343,68 @@ class TestApplyDeformation:
         deformation_index = [True, False, True]
         with pytest.raises(ValueError):
             apply_deformation(deformation_index, bsf)
+
+
+class TestPauliBatch:
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(5, 6)
+
+    @pytest.fixture
+    def errors(self, code):
+        rng = np.random.default_rng(0)
+        return rng.integers(0, 2, size=(20, 2*code.n), dtype='uint8')
+
+    def test_bsf_round_trip(self, errors):
+        paulis = PauliBatch.from_bsf(errors)
+        assert len(paulis) == 20
+        assert paulis.x.dtype == np.uint64
+        assert np.all(paulis.to_bsf() == errors)
+        assert np.all(paulis[3].to_bsf() == errors[3])
+        assert PauliBatch.from_bsf(from_array(errors)) == paulis
+
+    def test_xor_is_composition(self, errors):
+        paulis = PauliBatch.from_bsf(errors)
+        composed = paulis ^ paulis[0]
+        assert np.all(composed.to_bsf() == (errors + errors[0]) % 2)
+
+        paulis ^= PauliBatch.from_bsf(errors)
+        assert paulis == PauliBatch.zeros(20, errors.shape[1] // 2)
+
+    def test_weight(self, errors):
+        paulis = PauliBatch.from_bsf(errors)
+        assert np.all(paulis.weight() == [bsf_wt(error) for error in errors])
+
+    def test_symplectic_product_matches_bs_prod(self, code, errors):
+        paulis = PauliBatch.from_bsf(errors)
+        syndromes = paulis.symplectic_product(code.packed_stabilizers)
+        assert np.all(
+            syndromes == bs_prod(errors, code.stabilizer_matrix)
+        )
+
+        # Chunks of a few Paulis of both batches.
+        pauli_bytes = 8 * paulis.x.shape[1]
+        for max_bytes in [1, 5 * pauli_bytes, 3 * len(syndromes[0])]:
+            assert np.all(
+                paulis.symplectic_product(
+                    code.packed_stabilizers, max_bytes=max_bytes
+                ) == syndromes
+            )
+
+        packed_x, packed_z = code.packed_logicals
+        assert np.all(
+            paulis.symplectic_product(packed_x, max_bytes=pauli_bytes)
+            == bs_prod(errors, code.logicals_x)
+        )
+        assert np.all(
+            paulis.symplectic_product(packed_z)
+            == bs_prod(errors, code.logicals_z)
+        )
+
+    def test_mismatched_sizes_raise_error(self, errors):
+        paulis = PauliBatch.from_bsf(errors)
+        with pytest.raises(ValueError):
+            paulis ^ PauliBatch.zeros(1, 3)
+        with pytest.raises(ValueError):
+            PauliBatch.from_bsf(np.zeros(5))
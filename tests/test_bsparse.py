@@ -1,3 +1,4 @@
+import pytest
 import panqec.bsparse as bsparse
 import numpy as np
 from scipy.sparse import csr_matrix
@@ -185,3 +186,55 @@ def test_dot():
     assert bsparse.dot(a.toarray(), b) == 0
     assert bsparse.dot(a.toarray(), b.toarray()) == 0
     assert bsparse.dot(a, b.toarray()) == 0
+
+
+def test_batch_dot():
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 2, size=(7, 300))
+    b = rng.integers(0, 2, size=(5, 300))
+
+    expected = a.dot(b.T) % 2
+    assert np.all(bsparse.batch_dot(a, b) == expected)
+    assert np.all(
+        bsparse.batch_dot(bsparse.from_array(a), bsparse.from_array(b))
+        == expected
+    )
+
+
+class TestBinaryMatrixBuilder:
+
+    def test_toggle_and_freeze(self):
+        builder = bsparse.BinaryMatrixBuilder(6, n_rows=2)
+        builder.toggle(0, 4)
+        builder.toggle(0, 1)
+        builder.toggle(1, 3)
+        builder.toggle(1, 3)
+        assert builder.is_one(0, 4)
+        assert not builder.is_one(1, 3)
+
+        row = builder.add_row([5, 0, 5, 2])
+        assert row == 2
+        assert builder.shape == (3, 6)
+
+        matrix = builder.freeze()
+        assert bsparse.is_sparse(matrix)
+        assert matrix.has_sorted_indices
+        assert np.all(matrix.toarray() == [
+            [0, 1, 0, 0, 1, 0],
+            [0, 0, 0, 0, 0, 0],
+            [1, 0, 1, 0, 0, 0],
+        ])
+
+    def test_matches_insert_mod2(self):
+        rng = np.random.default_rng(1)
+        row = bsparse.zero_row(50)
+        builder = bsparse.BinaryMatrixBuilder(50, n_rows=1)
+        for index in rng.integers(0, 50, size=200):
+            bsparse.insert_mod2(index, row)
+            builder.toggle(0, index)
+        assert bsparse.equal(builder.freeze(), row)
+
+    def test_out_of_range_raises_error(self):
+        builder = bsparse.BinaryMatrixBuilder(3, n_rows=1)
+        with pytest.raises(ValueError):
+            builder.toggle(0, 3)
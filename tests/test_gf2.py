@@ -0,0 +1,96 @@
+import pytest
+import numpy as np
+from scipy.sparse import csr_matrix
+from panqec import gf2
+from panqec.bpauli import gf2_rank
+from panqec.codes import Toric3DCode
+
+
+@pytest.fixture
+def random_matrices():
+    rng = np.random.default_rng(0)
+    matrices = []
+    for _ in range(50):
+        n_rows, n_cols = rng.integers(1, 150, size=2)
+        density = rng.random()
+        matrices.append(
+            (rng.random((n_rows, n_cols)) < density).astype('uint8')
+        )
+    return matrices
+
+
+def test_pack_unpack_inverse(random_matrices):
+    for matrix in random_matrices:
+        packed = gf2.pack(matrix)
+        assert packed.dtype == np.uint64
+        assert packed.shape == (matrix.shape[0], gf2.n_words(matrix.shape[1]))
+        assert np.all(gf2.unpack(packed, matrix.shape[1]) == matrix)
+        assert np.all(gf2.pack(csr_matrix(matrix)) == packed)
+
+
+def test_rank_matches_big_int_rank(random_matrices):
+    for matrix in random_matrices:
+        rows = [int(''.join(map(str, row)), 2) for row in matrix]
+        expected_rank = gf2_rank(rows)
+        assert gf2.rank(matrix) == expected_rank
+        assert gf2.rank(csr_matrix(matrix)) == expected_rank
+
+
+def test_row_reduce_is_reduced_echelon_form(random_matrices):
+    for matrix in random_matrices:
+        reduced, pivots = gf2.row_reduce(matrix)
+        assert len(pivots) == gf2.rank(matrix)
+        assert np.all(np.diff(pivots) > 0)
+        assert np.all(reduced[:, pivots] == np.eye(len(pivots)))
+
+        # Same row space.
+        assert gf2.rank(np.vstack([matrix, reduced])) == len(pivots)
+
+
+def test_row_reduce_packed_matches_row_reduce(random_matrices):
+    for matrix in random_matrices:
+        n_cols = matrix.shape[1]
+        reduced, pivots = gf2.row_reduce(matrix)
+        packed = gf2.pack(csr_matrix(matrix))
+        assert np.all(gf2.row_reduce_packed(packed, n_cols) == pivots)
+        assert np.all(packed[len(pivots):] == 0)
+        assert np.all(gf2.unpack(packed[:len(pivots)], n_cols) == reduced)
+        assert np.all(
+            gf2.popcount(packed) == np.sum(gf2.unpack(packed, n_cols), axis=1)
+        )
+
+
+def test_kernel(random_matrices):
+    for matrix in random_matrices:
+        basis = gf2.kernel(matrix)
+        n_cols = matrix.shape[1]
+        assert basis.shape == (n_cols - gf2.rank(matrix), n_cols)
+        assert np.all(matrix.astype(int).dot(basis.T) % 2 == 0)
+        if len(basis) > 0:
+            assert gf2.rank(basis) == len(basis)
+
+
+def test_solve(random_matrices):
+    rng = np.random.default_rng(1)
+    for matrix in random_matrices:
+        x = rng.integers(0, 2, size=(5, matrix.shape[1]))
+        syndromes = x.dot(matrix.T) % 2
+        solutions = gf2.solve(matrix, syndromes)
+        assert np.all(solutions.dot(matrix.T) % 2 == syndromes)
+
+        solution = gf2.solve(csr_matrix(matrix), syndromes[0])
+        assert solution.shape == (matrix.shape[1],)
+        assert np.all(matrix.dot(solution) % 2 == syndromes[0])
+
+
+def test_solve_raises_error_if_no_solution():
+    matrix = np.array([[1, 1, 0], [1, 1, 0]])
+    with pytest.raises(ValueError):
+        gf2.solve(matrix, np.array([1, 0]))
+    with pytest.raises(ValueError):
+        gf2.solve(matrix, np.array([1, 0, 1]))
+
+
+def test_rank_of_toric_3d_code():
+    code = Toric3DCode(6, 6, 6)
+    assert gf2.rank(code.stabilizer_matrix) == code.n - code.k
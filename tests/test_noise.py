@@ -73,6 +73,23 @@ class TestPauliNoise:
             'Should be Z error everywhere'
         )
 
+    def test_generate_coupled_nested(self, code, error_model):
+        error_rates = [0.05, 0.1, 0.2, 0.4]
+        errors = error_model.generate_coupled(
+            code, error_rates, rng=np.random.default_rng(0)
+        )
+        assert errors.shape == (len(error_rates), 2*code.n)
+
+        # The support of the errors grows with the error rate.
+        supports = np.logical_or(errors[:, :code.n], errors[:, code.n:])
+        for i in range(len(error_rates) - 1):
+            assert np.all(supports[i] <= supports[i + 1])
+
+    def test_generate_coupled_extreme_rates(self, code, error_model):
+        errors = error_model.generate_coupled(code, [0, 1])
+        assert np.all(errors[0] == 0)
+        assert bsf_wt(errors[1]) == code.n
+
     def test_raise_error_if_direction_does_not_sum_to_1(self):
         with pytest.raises(ValueError):
             PauliErrorModel(0, 0, 0)
@@ -2,12 +2,16 @@ import os
 import json
 import pytest
 import gzip
+from typing import Dict, List
 import numpy as np
 from panqec.error_models import PauliErrorModel
 from panqec.codes import Toric2DCode
-from panqec.decoders import BeliefPropagationOSDDecoder
+from panqec.decoders import (
+    BeliefPropagationOSDDecoder, MatchingDecoder, ParallelDecoder
+)
 from panqec.simulation import (
-    read_input_json, run_once, DirectSimulation, expand_input_ranges, run_file,
+    read_input_json, read_input_dict, run_once, DirectSimulation,
+    StratifiedSimulation, SplittingSimulation, expand_input_ranges, run_file,
     BatchSimulation
 )
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -108,6 +112,118 @@ class TestSimulationToric2DCode():
         assert set(required_fields).issubset(simulation._results.keys())
 
 
+def test_direct_simulation_timing(tmpdir):
+    code = Toric2DCode(3, 3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = BeliefPropagationOSDDecoder(code, error_model, 0.1)
+    decoder.init_time = 0.5
+    output_file = os.path.join(tmpdir, 'results.json.gz')
+
+    simulation = DirectSimulation(
+        code, error_model, decoder, 0.1, timing=True
+    )
+    simulation.run(5)
+    simulation.save_results(output_file)
+
+    timing = simulation.results['decoder_timing']
+    assert sum(timing['decode']['counts']) == 5
+    # Building the decoder, and initializing ldpc at the first decoding.
+    assert sum(timing['init']['counts']) == 2
+    assert timing['init']['max'] == 0.5
+
+    # Timing does not change the inputs, so previous results are resumed.
+    resumed = DirectSimulation(
+        code, error_model, decoder, 0.1, timing=True
+    )
+    assert resumed._inputs == DirectSimulation(
+        code, error_model, decoder, 0.1
+    )._inputs
+    resumed.load_results(output_file)
+    resumed.load_results(output_file)
+    resumed.run(3)
+    timing = resumed.results['decoder_timing']
+    assert sum(timing['decode']['counts']) == 8
+    assert sum(timing['init']['counts']) == 3
+
+
+def test_shared_decoder_timing_stays_with_its_simulation():
+    code = Toric2DCode(3, 3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = MatchingDecoder(code, error_model, 0.1)
+    timed = DirectSimulation(code, error_model, decoder, 0.1, timing=True)
+    untimed = DirectSimulation(code, error_model, decoder, 0.2)
+
+    for _ in range(3):
+        timed.run(1)
+        untimed.run(1)
+    assert timed.timer.histograms['decode'].count == 3
+    assert decoder.timer is None
+
+
+def test_direct_simulation_stage_times(tmpdir):
+    code = Toric2DCode(3, 3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = MatchingDecoder(code, error_model, 0.1)
+    output_file = os.path.join(tmpdir, 'results.json.gz')
+
+    simulation = DirectSimulation(code, error_model, decoder, 0.1)
+    simulation.run(5)
+    stage_times = dict(simulation.stage_times)
+    assert set(stage_times) == {'generate', 'syndrome', 'decode', 'verify'}
+    assert sum(stage_times.values()) <= simulation.wall_time
+    simulation.save_results(output_file)
+
+    # Stage times keep being accumulated when the results are resumed.
+    resumed = DirectSimulation(code, error_model, decoder, 0.1)
+    resumed.load_results(output_file)
+    resumed.run(1)
+    for stage, duration in stage_times.items():
+        assert resumed.stage_times[stage] > duration
+
+
+def test_direct_simulation_decodes_batches(tmpdir):
+    code = Toric2DCode(4, 4)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = ParallelDecoder(
+        code, error_model, 0.1, 'MatchingDecoder', n_threads=2
+    )
+
+    # The same errors are decoded one at a time, and in batches split
+    # over the threads of the parallel decoder.
+    simulations = []
+    for batch_size in [1, 4]:
+        batch_sim = BatchSimulation(
+            os.path.join(tmpdir, f'results_{batch_size}.json'),
+            verbose=False
+        )
+        batch_sim.append(DirectSimulation(
+            code, error_model, decoder, 0.1, verbose=False,
+            rng=np.random.default_rng(0), batch_size=batch_size
+        ))
+        batch_sim.run(10)
+        simulations.append(batch_sim[0])
+    simulation, batched = simulations
+
+    assert batched.n_results == 10
+    assert set(batched.stage_times) == set(simulation.stage_times)
+    for key in ['effective_error', 'success', 'codespace']:
+        assert np.all(
+            np.array(batched.results[key]) == np.array(simulation.results[key])
+        )
+
+    # The threads of the decoder are shut down with the simulation.
+    assert decoder._executor is None
+    assert batched.get_results()['n_runs'] == 10
+
+
+def test_direct_simulation_invalid_batch_size():
+    code = Toric2DCode(3, 3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = MatchingDecoder(code, error_model, 0.1)
+    with pytest.raises(ValueError):
+        DirectSimulation(code, error_model, decoder, 0.1, batch_size=0)
+
+
 class TestBatchSimulationOneFile():
 
     n_trials: int = 5
@@ -169,6 +285,409 @@ class TestBatchSimulationOneFile():
         assert len(results[0]['results']['codespace']) == self.n_trials
 
 
+def test_batch_simulation_coupled(tmpdir, monkeypatch):
+    out_file = os.path.join(tmpdir, 'results.json.gz')
+    batch_sim = BatchSimulation(
+        output_file=out_file, coupled=True, rng=np.random.default_rng(0),
+        verbose=False
+    )
+    code = Toric2DCode(3, 3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    error_rates = [0.05, 0.1, 0.2]
+    for error_rate in error_rates:
+        decoder = MatchingDecoder(code, error_model, error_rate)
+        batch_sim.append(
+            DirectSimulation(code, error_model, decoder, error_rate)
+        )
+
+    # Record the errors given to each simulation by the batch.
+    errors: Dict[float, List[np.ndarray]] = {p: [] for p in error_rates}
+    for simulation in batch_sim:
+        def run(n_runs, simulation=simulation, run=simulation.run,
+                **kwargs):
+            errors[simulation.error_rate] += list(kwargs['errors'])
+            return run(n_runs, **kwargs)
+        monkeypatch.setattr(simulation, 'run', run)
+
+    n_trials = 40
+    batch_sim.run(n_trials)
+
+    for simulation in batch_sim:
+        assert simulation.n_results == n_trials
+        assert len(simulation.results['success']) == n_trials
+
+    # The errors are nested: every qubit with an error at a lower error
+    # rate also has one at a higher error rate.
+    supports = {
+        p: np.array([
+            np.logical_or(error[:code.n], error[code.n:])
+            for error in errors[p]
+        ])
+        for p in error_rates
+    }
+    assert all(len(supports[p]) == n_trials for p in error_rates)
+    for p_low, p_high in zip(error_rates[:-1], error_rates[1:]):
+        assert np.all(supports[p_high][supports[p_low]])
+        assert supports[p_high].sum() > supports[p_low].sum()
+
+    # Hence the failures at neighbouring error rates are correlated.
+    fails = {
+        simulation.error_rate: ~np.array(simulation.results['success'])
+        for simulation in batch_sim
+    }
+    assert np.corrcoef(fails[0.1], fails[0.2])[0, 1] > 0
+
+
+class TestStratifiedSimulation:
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(3, 3)
+
+    @pytest.fixture
+    def error_model(self):
+        return PauliErrorModel(1/3, 1/3, 1/3)
+
+    def test_sample_error_has_exact_weight(self, code, error_model):
+        decoder = MatchingDecoder(code, error_model, 0.1)
+        simulation = StratifiedSimulation(
+            code, error_model, decoder, [0.01, 0.05, 0.1],
+            rng=np.random.default_rng(0)
+        )
+        for weight in simulation.weights:
+            error = simulation.sample_error(weight)
+            support = np.logical_or(error[:code.n], error[code.n:])
+            assert np.sum(support) == weight
+
+    def test_inputs_store_effective_min_weight(self, code, error_model):
+        decoder = MatchingDecoder(code, error_model, 0.1)
+        simulations = [
+            StratifiedSimulation(
+                code, error_model, decoder, [0.01, 0.1], min_weight=min_weight
+            )
+            for min_weight in [0, 1]
+        ]
+        assert simulations[0].min_weight == 1
+        parameters = simulations[0]._inputs['method']['parameters']
+        assert parameters['min_weight'] == 1
+        assert simulations[0]._inputs == simulations[1]._inputs
+
+    def test_run(self, code, error_model):
+        error_rates = [0.01, 0.05, 0.1]
+        decoder = MatchingDecoder(code, error_model, 0.1)
+        simulation = StratifiedSimulation(
+            code, error_model, decoder, error_rates, max_weight=4,
+            rng=np.random.default_rng(0)
+        )
+        simulation.run(5)
+
+        results = simulation.get_results()
+        assert np.all(results['weights'] == [1, 2, 3, 4])
+        assert len(results['p_est']) == len(error_rates)
+
+        # Single-qubit errors are always corrected on the distance-3 code.
+        assert results['f_est'][0] == 0
+
+        # Logical error rate increases with the physical error rate.
+        assert np.all(np.diff(results['p_est']) >= 0)
+        assert np.all(results['p_tail'] > 0)
+
+    def test_read_input_dict(self, tmpdir):
+        data = {
+            'ranges': {
+                'label': 'stratified',
+                'method': {
+                    'name': 'stratified',
+                    'parameters': {'max_weight': 3}
+                },
+                'code': {
+                    'name': 'Toric2DCode',
+                    'parameters': [{'L_x': 3}, {'L_x': 4}]
+                },
+                'error_model': {
+                    'name': 'PauliErrorModel',
+                    'parameters': {'r_x': 1/3, 'r_y': 1/3, 'r_z': 1/3}
+                },
+                'decoder': {'name': 'MatchingDecoder'},
+                'error_rate': [0.01, 0.02, 0.05]
+            }
+        }
+        output_file = os.path.join(tmpdir, 'results.json')
+        batch_sim = read_input_dict(data, output_file)
+        assert len(batch_sim) == 2
+        for simulation in batch_sim:
+            assert isinstance(simulation, StratifiedSimulation)
+
+        batch_sim.run(2)
+        results_df = batch_sim.get_results_df()
+        assert len(results_df) == 6
+
+
+class TestSplittingSimulation:
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(3, 3)
+
+    @pytest.fixture
+    def error_model(self):
+        return PauliErrorModel(0.2, 0.3, 0.5)
+
+    @pytest.fixture
+    def simulation(self, code, error_model):
+        error_rates = [0.1, 0.2]
+        decoders = [
+            MatchingDecoder(code, error_model, error_rate)
+            for error_rate in error_rates
+        ]
+        return SplittingSimulation(
+            code, error_model, decoders, error_rates, n_init_runs=10,
+            rng=np.random.default_rng(0)
+        )
+
+    def test_incremental_updates_match_full_computation(
+        self, code, error_model, simulation
+    ):
+        simulation.run(50)
+        assert simulation.n_results == 50
+
+        for chain in [chains[0] for chains in simulation.chains]:
+            assert np.all(
+                chain.syndrome == code.measure_syndrome(chain.error)
+            )
+            assert np.isclose(chain.log_p, error_model.error_probability(
+                chain.error, code, chain.error_rate, log_output=True
+            ))
+            assert chain.n_accepted + chain.n_rejected == 50
+
+            # The chain only visits errors that fail when decoded.
+            correction = chain.decoder.decode(chain.syndrome)
+            assert not code.is_success((correction + chain.error) % 2)
+
+        for i_p, chains in enumerate(simulation.chains):
+            log_p_errors = simulation.results['log_p_errors'][i_p]
+            assert len(log_p_errors) == 50
+            assert np.isclose(log_p_errors[-1], chains[0].log_p)
+
+        # The chains' stage times are moved to the results.
+        assert simulation.stage_times['generate'] > 0
+        assert simulation.stage_times['decode'] > 0
+        assert all(
+            len(chain.stage_times) == 0
+            for chains in simulation.chains for chain in chains
+        )
+
+    @pytest.mark.parametrize('n_jobs', [1, 2])
+    def test_multiple_chains(self, code, error_model, n_jobs):
+        error_rates = [0.1, 0.15, 0.2]
+        decoders = [
+            MatchingDecoder(code, error_model, error_rate)
+            for error_rate in error_rates
+        ]
+        simulation = SplittingSimulation(
+            code, error_model, decoders, error_rates, n_init_runs=20,
+            n_chains=3, n_jobs=n_jobs, verbose=False,
+            rng=np.random.default_rng(0)
+        )
+        simulation.run(4)
+        simulation.run(2)
+        assert simulation.n_results == 6
+        assert simulation.get_chain_log_p_errors().shape == (3, 3, 6)
+        assert simulation.stage_times['generate'] > 0
+
+        for chains in simulation.chains:
+            assert len(chains) == 3
+            for chain in chains:
+                assert chain.n_accepted + chain.n_rejected == 6
+                assert np.all(
+                    chain.syndrome == code.measure_syndrome(chain.error)
+                )
+
+        simulation.postprocess()
+        results = simulation.get_results()
+        assert len(results['p_est']) == 3
+        assert len(results['p_se']) == 3
+        assert np.all(np.isfinite(results['p_se']))
+
+    def test_workers_keep_chains_between_runs(self, code, error_model):
+        error_rates = [0.1, 0.15, 0.2]
+        simulations = []
+        for n_jobs in [1, 2]:
+            decoders = [
+                MatchingDecoder(code, error_model, error_rate)
+                for error_rate in error_rates
+            ]
+            simulations.append(SplittingSimulation(
+                code, error_model, decoders, error_rates, n_init_runs=10,
+                n_chains=2, n_jobs=n_jobs, verbose=False,
+                rng=np.random.default_rng(0)
+            ))
+        serial, parallel = simulations
+
+        # One step per run, as done by BatchSimulation.
+        parallel.run(1)
+        processes = [process for process, _, _ in parallel._workers]
+        assert len(processes) == 2
+        for _ in range(5):
+            serial.run(1)
+            parallel.run(1)
+        serial.run(1)
+        assert [process for process, _, _ in parallel._workers] == processes
+
+        # The log-probabilities of the workers' chains are recomputed from
+        # scratch when they are started, so they may differ by rounding.
+        assert np.allclose(
+            parallel.results['log_p_errors'], serial.results['log_p_errors']
+        )
+        for chains, parallel_chains in zip(serial.chains, parallel.chains):
+            for chain, parallel_chain in zip(chains, parallel_chains):
+                assert np.all(chain.error == parallel_chain.error)
+                assert chain.n_accepted == parallel_chain.n_accepted
+
+        parallel.close()
+        assert len(parallel._workers) == 0
+        assert not any(process.is_alive() for process in processes)
+
+        # The chains are given to new workers by the next run.
+        serial.run(1)
+        parallel.run(1)
+        assert np.allclose(
+            parallel.results['log_p_errors'], serial.results['log_p_errors']
+        )
+        parallel.close()
+
+    def test_batch_simulation_closes_workers(
+        self, code, error_model, tmpdir
+    ):
+        error_rates = [0.1, 0.2]
+        decoders = [
+            MatchingDecoder(code, error_model, error_rate)
+            for error_rate in error_rates
+        ]
+        simulation = SplittingSimulation(
+            code, error_model, decoders, error_rates, n_init_runs=10,
+            n_jobs=2, verbose=False, rng=np.random.default_rng(0)
+        )
+        batch_sim = BatchSimulation(
+            os.path.join(tmpdir, 'splitting.json'), verbose=False
+        )
+        batch_sim.append(simulation)
+        batch_sim.run(3)
+
+        assert simulation.n_results == 3
+        assert len(simulation._workers) == 0
+        for chains in simulation.chains:
+            assert chains[0].n_accepted + chains[0].n_rejected == 3
+
+    def test_optimal_c_solves_acceptance_ratio_equation(self, simulation):
+        rng = np.random.default_rng(1)
+        log_p_errors = np.array([
+            rng.normal(-10, 2, size=1000),
+            rng.normal(-14, 3, size=1000),
+        ])
+        c = simulation.compute_optimal_c(log_p_errors)[0]
+
+        log_ratios = log_p_errors[0] - log_p_errors[1]
+        lhs = np.sum(1 / (1 + c * np.exp(log_ratios)))
+        rhs = np.sum(1 / (1 + np.exp(-log_ratios) / c))
+        assert np.isclose(lhs, rhs)
+
+        ratio = simulation.compute_ratios(log_p_errors, [c])[0]
+        assert np.isclose(ratio, c * lhs / rhs)
+
+    def test_estimate_ratios_constant_log_ratio(self, simulation):
+        # Samples whose probabilities differ by a constant factor between
+        # the two error rates give exactly that factor, with no spread.
+        chain_log_p_errors = np.zeros((2, 3, 40))
+        chain_log_p_errors[0] = np.linspace(-20, -10, 120).reshape(3, 40)
+        chain_log_p_errors[1] = chain_log_p_errors[0] - 2
+
+        ratios, ratios_se = simulation.estimate_ratios(chain_log_p_errors)
+        assert ratios.shape == ratios_se.shape == (1,)
+        assert np.isclose(ratios[0], np.exp(-2))
+        assert np.isclose(ratios_se[0], 0)
+
+    def test_estimate_ratios_spread_of_chains(self, simulation):
+        # Each chain alone gives a different constant factor, so that the
+        # standard error is that of the mean of the chains' estimates.
+        chain_log_p_errors = np.zeros((2, 3, 40))
+        chain_log_p_errors[0] = np.linspace(-20, -10, 120).reshape(3, 40)
+        chain_log_p_errors[1] = (
+            chain_log_p_errors[0] - np.array([1, 2, 3])[:, None]
+        )
+
+        _, ratios_se = simulation.estimate_ratios(chain_log_p_errors)
+        chain_ratios = np.exp(-np.array([1, 2, 3]))
+        assert np.isclose(
+            ratios_se[0], np.std(chain_ratios, ddof=1) / np.sqrt(3)
+        )
+
+    def test_resume_keeps_number_of_chains(
+        self, code, error_model, simulation
+    ):
+        simulation.run(5)
+        data = simulation.get_results_to_save()
+        assert 'n_chains' not in data['inputs']['method']['parameters']
+
+        # Files written before several chains were supported have a
+        # single chain and no n_chains in their results.
+        del data['results']['n_chains']
+
+        decoders = [
+            MatchingDecoder(code, error_model, error_rate)
+            for error_rate in [0.1, 0.2]
+        ]
+        resumed = SplittingSimulation(
+            code, error_model, decoders, [0.1, 0.2], n_init_runs=10,
+            n_chains=3, verbose=False
+        )
+        assert resumed._inputs == data['inputs']
+        resumed.load_results_from_dict(data)
+        assert resumed.n_chains == 1
+
+        resumed.run(2)
+        assert resumed.get_chain_log_p_errors().shape == (2, 1, 7)
+
+    def test_resume_chains_from_file(
+        self, code, error_model, simulation, tmpdir
+    ):
+        simulation.run(5)
+        output_file = os.path.join(tmpdir, 'splitting.json.gz')
+        simulation.save_results(output_file)
+
+        decoders = [
+            MatchingDecoder(code, error_model, error_rate)
+            for error_rate in [0.1, 0.2]
+        ]
+        resumed = SplittingSimulation(
+            code, error_model, decoders, [0.1, 0.2], n_init_runs=10
+        )
+        resumed.load_results(output_file)
+        assert resumed.n_results == 5
+
+        for chains, resumed_chains in zip(simulation.chains, resumed.chains):
+            chain, resumed_chain = chains[0], resumed_chains[0]
+            assert np.all(resumed_chain.error == chain.error)
+            assert np.all(resumed_chain.syndrome == chain.syndrome)
+            assert np.isclose(resumed_chain.log_p, chain.log_p)
+            assert resumed_chain.n_accepted == chain.n_accepted
+            assert resumed_chain.n_rejected == chain.n_rejected
+            assert (
+                resumed_chain.rng.bit_generator.state
+                == chain.rng.bit_generator.state
+            )
+
+        # The resumed chains continue exactly where the original ones were.
+        simulation.run(5)
+        resumed.run(5)
+        assert resumed.n_results == 10
+        for i_p in range(2):
+            assert np.allclose(
+                resumed.results['log_p_errors'][i_p],
+                simulation.results['log_p_errors'][i_p]
+            )
+
+
 @pytest.fixture
 def example_ranges():
     input_json = os.path.join(DATA_DIR, 'range_input.json')
@@ -192,6 +711,60 @@ def test_run_file_range_input(tmpdir):
     assert os.path.isfile(output_json)
 
 
+def test_decoders_shared_across_error_rates(tmpdir):
+    input_json = os.path.join(DATA_DIR, 'range_input.json')
+    output_json = os.path.join(tmpdir, 'results.json')
+    batch_sim = read_input_json(input_json, output_json)
+
+    # One decoder per code and error model, shared by the 3 error rates.
+    decoders = {id(simulation.decoder) for simulation in batch_sim}
+    assert len(decoders) == 9
+
+    batch_sim.run(2)
+    for simulation in batch_sim:
+        assert simulation.n_results == 2
+
+    simulation = batch_sim[0]
+    simulation.run(1)
+    assert simulation.decoder.error_rate == simulation.error_rate
+
+
+def test_shared_decoder_in_interleaved_batch(tmpdir):
+    code = Toric2DCode(4, 4)
+    error_model = PauliErrorModel(0.1, 0.1, 0.8)
+    error_rates = [0.05, 0.1, 0.15]
+    shared_decoder = MatchingDecoder(code, error_model, error_rates[0])
+    matcher_x = shared_decoder.matcher_x
+
+    # The same errors are decoded with a shared decoder, and with one
+    # decoder per error rate.
+    batch_sims = []
+    for shared in [True, False]:
+        batch_sim = BatchSimulation(
+            os.path.join(tmpdir, f'results_{shared}.json'), verbose=False
+        )
+        for i, error_rate in enumerate(error_rates):
+            decoder = shared_decoder if shared else MatchingDecoder(
+                code, error_model, error_rate
+            )
+            batch_sim.append(DirectSimulation(
+                code, error_model, decoder, error_rate, verbose=False,
+                rng=np.random.default_rng(i)
+            ))
+        batch_sim.run(10)
+        batch_sims.append(batch_sim)
+
+    # The shared matching graphs are re-weighted in place.
+    assert shared_decoder.matcher_x is matcher_x
+
+    for shared_sim, sim in zip(*batch_sims):
+        assert shared_sim.n_results == sim.n_results == 10
+        assert np.all(
+            np.array(shared_sim.results['effective_error'])
+            == np.array(sim.results['effective_error'])
+        )
+
+
 class TestReadInputJson:
 
     def test_multiple_ranges(self):
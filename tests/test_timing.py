@@ -0,0 +1,69 @@
+import pytest
+import numpy as np
+from panqec.timing import LatencyHistogram, DecoderTimer
+
+
+def test_histogram_quantiles_within_bins():
+    rng = np.random.default_rng(0)
+    durations = 10**rng.uniform(-5, -1, size=1000)
+    histogram = LatencyHistogram(bins_per_decade=20)
+    for duration in durations:
+        histogram.add(duration)
+
+    assert histogram.count == 1000
+    assert np.isclose(histogram.mean, durations.mean())
+    assert histogram.min == durations.min()
+    assert histogram.max == durations.max()
+
+    # Quantiles are accurate up to the width of a bin.
+    for q in [0.1, 0.5, 0.9]:
+        ratio = histogram.quantile(q) / np.quantile(durations, q)
+        assert 10**(-1/20) <= ratio <= 10**(1/20)
+
+
+def test_histogram_out_of_range_durations():
+    histogram = LatencyHistogram(min_time=1e-3, max_time=1)
+    histogram.add(1e-6)
+    histogram.add(100)
+    assert histogram.counts[0] == 1
+    assert histogram.counts[-1] == 1
+    assert histogram.quantile(0) == 1e-6
+    assert histogram.quantile(1) == 100
+    assert np.isnan(LatencyHistogram().quantile(0.5))
+
+
+def test_histogram_dict_round_trip_and_merge():
+    histogram = LatencyHistogram()
+    for duration in [1e-3, 2e-3, 5e-2]:
+        histogram.add(duration)
+
+    data = histogram.to_dict()
+    assert len(data['bins']) == 3
+    loaded = LatencyHistogram.from_dict(data)
+    assert np.all(loaded.counts == histogram.counts)
+    assert loaded.total == histogram.total
+
+    loaded.merge(histogram)
+    assert loaded.count == 6
+    assert loaded.max == 5e-2
+
+    with pytest.raises(ValueError):
+        loaded.merge(LatencyHistogram(bins_per_decade=5))
+
+
+def test_decoder_timer_merge_and_summary():
+    timer = DecoderTimer()
+    with timer.stage('sweep'):
+        pass
+    timer.record('match', 0.5)
+
+    other = DecoderTimer.from_dict(timer.to_dict())
+    other.record('match', 1.5)
+    timer.merge(other)
+
+    summary = timer.summary()
+    assert set(summary.keys()) == {'sweep', 'match'}
+    assert summary['match']['count'] == 3
+    assert summary['match']['total'] == 2.5
+    assert summary['sweep']['count'] == 2
+    assert DecoderTimer.from_dict(None).histograms == {}